@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Meraki custom_analytics 소비자 부하 측정: 카메라 수백 대 × 초당 수천 메시지 합성 스트림
+
+- DedupTable(타이머 휠) vs 만료 항목을 매 tick마다 전체 훑어 지우는 dict 방식: 판단 일치 여부와 메시지당 지연
+- MerakiConsumer.handle 전체(중심 필터 + 중복 억제 + 위경도 변환) 처리량 / p99 지연
+- 기존 전역 last_detection_time(30초) 방식이 놓치는 새 객체 수
+
+시각은 합성 시계(메시지 timestamp)를 쓰므로 실제로 기다리지 않는다.
+
+사용법:
+    python3 benchmark_dedup.py [--cameras 300] [--rate 5000] [--seconds 120] [--ttl 30]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "..", "virtual_detection"))
+
+from dedup_table import DedupTable
+from meraki_consumer import MerakiConsumer
+
+
+class ScanDedup:
+    """비교용: key → 만료 시각 dict, tick이 바뀔 때마다 전체를 훑어 만료 항목 삭제"""
+
+    def __init__(self, ttl, tick=1.0):
+        self.ttl = ttl
+        self.tick = tick
+        self._expiry = {}
+        self._current = None
+
+    def should_report(self, serial, object_id, now):
+        now_tick = int(now // self.tick)
+        if now_tick != self._current:
+            self._current = now_tick
+            for key in [key for key, expiry in self._expiry.items() if expiry <= now_tick]:
+                del self._expiry[key]
+        key = (serial, object_id)
+        expiry = self._expiry.get(key)
+        if expiry is not None and expiry > now_tick:
+            return False
+        self._expiry[key] = now_tick + int(np.ceil(self.ttl / self.tick))
+        return True
+
+    def __len__(self):
+        return len(self._expiry)
+
+
+def make_messages(cameras, rate, seconds, people, seed=0):
+    """
+    카메라마다 화면에 people명 안팎이 오가는 메시지 스트림 (topic, payload, now) 생성.
+    사람은 평균 20초 머무르다 새 object_id로 바뀌고, 박스는 화면을 가로질러 이동한다.
+    """
+    rng = random.Random(seed)
+    serials = [f"Q2XX-{i:04d}-{i * 7 % 10000:04d}" for i in range(cameras)]
+    next_id = [0] * cameras
+    tracks = []  # 카메라별 [object_id, x, dx, leave_at]
+    for cam in range(cameras):
+        tracks.append([])
+        for _ in range(people):
+            next_id[cam] += 1
+            tracks[cam].append([next_id[cam], rng.random(), rng.uniform(-0.05, 0.05), rng.expovariate(1 / 20)])
+
+    total = int(rate * seconds)
+    start_ms = 1_700_000_000_000
+    messages = []
+    for i in range(total):
+        now = i / rate
+        cam = rng.randrange(cameras)
+        outputs = []
+        for track in tracks[cam]:
+            if now >= track[3]:
+                next_id[cam] += 1
+                track[:] = [next_id[cam], rng.random(), rng.uniform(-0.05, 0.05), now + rng.expovariate(1 / 20)]
+            track[1] = min(0.95, max(0.0, track[1] + track[2] * rng.random()))
+            x = track[1]
+            outputs.append({"class": 0, "object_id": track[0], "score": 0.9,
+                            "location": [x, 0.3, x + 0.05, 0.8]})
+        if rng.random() < 0.2:
+            outputs.append({"class": 1, "object_id": -1, "score": 0.5, "location": [0.45, 0.1, 0.55, 0.2]})
+        payload = {"timestamp": start_ms + int(now * 1000), "outputs": outputs}
+        messages.append((f"/merakimv/{serials[cam]}/custom_analytics", payload, now))
+    return messages
+
+
+def percentile(values, q):
+    return float(np.percentile(np.array(values), q)) * 1e6 if values else 0.0
+
+
+def run_dedup(table, keys):
+    latencies = []
+    decisions = []
+    start = time.perf_counter()
+    for serial, object_id, now in keys:
+        t0 = time.perf_counter()
+        decisions.append(table.should_report(serial, object_id, now))
+        latencies.append(time.perf_counter() - t0)
+    return decisions, time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cameras", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=5000, help="전체 메시지 수신률 (msgs/s, 합성 시계)")
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--people", type=int, default=4, help="카메라당 화면에 있는 사람 수")
+    parser.add_argument("--ttl", type=float, default=30)
+    args = parser.parse_args()
+
+    messages = make_messages(args.cameras, args.rate, args.seconds, args.people)
+    print(f"{len(messages)} messages, {args.cameras} cameras, {args.rate:.0f} msgs/s over {args.seconds:.0f}s "
+          f"(synthetic clock)")
+
+    # 1) 중복 억제 표만 비교: 메시지의 모든 객체 (serial, object_id, now)
+    keys = [(topic.split("/")[2], obj["object_id"], now)
+            for topic, payload, now in messages for obj in payload["outputs"] if obj["class"] == 0]
+    wheel_decisions, wheel_elapsed, wheel_lat = run_dedup(DedupTable(ttl=args.ttl), keys)
+    scan = ScanDedup(ttl=args.ttl)
+    scan_decisions, scan_elapsed, scan_lat = run_dedup(scan, keys)
+    print(f"\n{'dedup':<12}{'lookups/s':>12}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for name, elapsed, latencies in (("time wheel", wheel_elapsed, wheel_lat),
+                                     ("full scan", scan_elapsed, scan_lat)):
+        print(f"{name:<12}{len(keys) / elapsed:>12.0f}{percentile(latencies, 50):>10.2f}"
+              f"{percentile(latencies, 99):>10.2f}{max(latencies) * 1e6:>10.0f}")
+    print(f"decisions identical: {wheel_decisions == scan_decisions} "
+          f"({sum(wheel_decisions)} reported of {len(keys)} sightings)")
+
+    # 2) 소비자 전체 경로 (메시지 파싱 이후: 중심 필터 + 중복 억제 + 위경도 변환)
+    consumer = MerakiConsumer(defaults={"lat": 37.7749, "lng": -122.4194, "heading": 90, "fov": 60},
+                              dedup_ttl=args.ttl)
+    latencies = []
+    records = 0
+    cameras_reported = set()
+    start = time.perf_counter()
+    for topic, payload, now in messages:
+        t0 = time.perf_counter()
+        serial, save_data = consumer.handle(topic, payload, now)
+        latencies.append(time.perf_counter() - t0)
+        if save_data:
+            records += len(save_data)
+            cameras_reported.add(serial)
+    elapsed = time.perf_counter() - start
+    print(f"\nconsumer: {len(messages) / elapsed:.0f} msgs/s ({len(messages) / elapsed / args.rate:.1f}x the input "
+          f"rate), p50 {percentile(latencies, 50):.1f} us, p99 {percentile(latencies, 99):.1f} us, "
+          f"max {max(latencies) * 1e6:.0f} us")
+    print(f"consumer: {records} records from {len(cameras_reported)} cameras, {consumer.stats()}")
+
+    # 3) 기존 방식: 어느 카메라든 한 번 알리면 30초 동안 모든 메시지 무시 (메시지당 최대 1명)
+    last_detection_time = -args.ttl
+    legacy = 0
+    low, high = consumer.center_range
+    for topic, payload, now in messages:
+        if now - last_detection_time < args.ttl:
+            continue
+        for obj in payload["outputs"]:
+            if obj["class"] == 0 and low <= (obj["location"][0] + obj["location"][2]) / 2 <= high:
+                legacy += 1
+                last_detection_time = now
+                break
+    print(f"global last_detection_time: {legacy} records "
+          f"(per-camera/object dedup reports {records})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+custom_analytics outputs 처리 비교: 객체별 검사(handle) vs 배열 처리(handle_batch), json vs orjson
+
+카메라마다 분석 프레임률(--fps)로 메시지가 온다고 보고 합성 payload(bytes)를 만든 뒤
+해석 + 클래스/중심 범위 검사 + 중복 억제 + 위경도 변환까지 메시지당 지연과 처리량을 잰다.
+--batch 는 handle_batch에 한 번에 넘기는 메시지 수 (1이면 메시지마다 호출).
+메시지 하나(객체 수십 개)만으로는 배열 변환 비용이 더 크므로 묶음 크기별로 비교한다.
+모든 경로의 결과가 handle()과 완전히 같은지 함께 확인하고, 시간은 --repeat 회 중 가장 빠른 값을 쓴다.
+
+사용법:
+    python3 benchmark_outputs.py [--cameras 100] [--fps 15] [--seconds 20] [--people 8] [--batch 1 8 32 128]
+"""
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "..", "virtual_detection"))
+
+import meraki_consumer
+from meraki_consumer import MerakiConsumer, loads_payload
+from benchmark_dedup import make_messages
+
+DEFAULTS = {"lat": 37.7749, "lng": -122.4194, "heading": 90, "fov": 60}
+
+
+def run(messages, ttl, decode, batch):
+    """batch=0 이면 handle() (객체별), 아니면 handle_batch()에 batch개씩 → (결과, 걸린 시간, 메시지당 지연)"""
+    consumer = MerakiConsumer(defaults=DEFAULTS, dedup_ttl=ttl)
+    # 카메라별 변환 격자는 첫 메시지에서 한 번만 만들므로 측정 전에 미리 생성
+    for topic in {topic for topic, _, _ in messages}:
+        consumer.projector(meraki_consumer.serial_from_topic(topic))
+    results = []
+    latencies = []
+    start = time.perf_counter()
+    step = batch or 1
+    for i in range(0, len(messages), step):
+        chunk = messages[i:i + step]
+        t0 = time.perf_counter()
+        decoded = [(topic, decode(data)) for topic, data, _ in chunk]
+        now = chunk[-1][2]
+        if batch:
+            results.extend(consumer.handle_batch(decoded, now))
+        else:
+            results.extend(consumer.handle(topic, payload, now) for topic, payload in decoded)
+        latencies.append((time.perf_counter() - t0) / len(chunk))
+    return results, time.perf_counter() - start, latencies
+
+
+def reference(messages, ttl, batch):
+    """handle()을 메시지마다 부르되, 묶음 처리와 같게 묶음 마지막 시각으로 중복 판단"""
+    consumer = MerakiConsumer(defaults=DEFAULTS, dedup_ttl=ttl)
+    results = []
+    for i in range(0, len(messages), batch):
+        chunk = messages[i:i + batch]
+        results.extend(consumer.handle(topic, json.loads(data), chunk[-1][2]) for topic, data, _ in chunk)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cameras", type=int, default=100)
+    parser.add_argument("--fps", type=float, default=15, help="카메라당 분석 메시지 수 (초당)")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--people", type=int, default=8, help="카메라당 화면에 있는 사람 수")
+    parser.add_argument("--ttl", type=float, default=30)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rate = args.cameras * args.fps
+    messages = [(topic, json.dumps(payload).encode(), now)
+                for topic, payload, now in make_messages(args.cameras, rate, args.seconds, args.people)]
+    # 합성 메시지(수백만 객체)를 GC 대상에서 빼서 측정 중 전체 GC 멈춤이 섞이지 않게 함
+    gc.collect()
+    gc.freeze()
+    print(f"{len(messages)} messages ({args.cameras} cameras x {args.fps:.0f} fps = {rate:.0f} msgs/s, "
+          f"~{args.people} people each), orjson {'available' if meraki_consumer.orjson else 'not installed'}")
+
+    def stdlib(data):
+        return json.loads(data.decode("utf-8"))
+
+    cases = [("handle + json", stdlib, 0)]
+    cases += [(f"batch {batch} + {'orjson' if meraki_consumer.orjson else 'json'}", loads_payload, batch)
+              for batch in args.batch]
+    references = {}
+    print(f"\n{'path':<22}{'msgs/s':>10}{'x rate':>8}{'us/msg':>9}{'p99 us':>9}{'records':>9}  parity")
+    for name, decode, batch in cases:
+        results, elapsed, latencies = min((run(messages, args.ttl, decode, batch) for _ in range(args.repeat)),
+                                          key=lambda result: result[1])
+        # 기준: 같은 묶음 시각(now)으로 메시지마다 handle()을 부른 결과
+        step = batch or 1
+        if step not in references:
+            references[step] = reference(messages, args.ttl, step)
+        records = sum(len(save_data) for _, save_data in results)
+        print(f"{name:<22}{len(messages) / elapsed:>10.0f}{len(messages) / elapsed / rate:>8.1f}"
+              f"{elapsed / len(messages) * 1e6:>9.1f}{float(np.percentile(latencies, 99)) * 1e6:>9.1f}"
+              f"{records:>9}  {'exact' if results == references[step] else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 import paho.mqtt.client as mqtt
-import json
 import os
+import sys
 import time
-import math
-import requests
+import queue
 import threading
-import subprocess
-from datetime import datetime, timezone
+from meraki_consumer import MerakiConsumer, loads_payload
+from snapshot_scheduler import SnapshotScheduler
+from snapshot_journal import SnapshotJournal
+from rate_limiter import MerakiRateLimiter
 
 # 설정
 API_KEY = "USER_API_KEY"
 DEVICE_SERIAL = "DEVICE_SERIAL_NUMBER"
 MQTT_BROKER = "mqtt.broker.address"
-MQTT_TOPIC = "/merakimv/<DEVICE_SERIAL_NUMBER>/custom_analytics"
+# 모든 카메라의 custom_analytics를 하나의 구독으로 받음 (토픽의 두 번째 항목이 카메라 serial)
+MQTT_TOPIC = "/merakimv/+/custom_analytics"
 MQTT_USER = "USER_NAME"
 MQTT_PASSWORD = "PASSWORD"
 
@@ -22,167 +24,127 @@ CAMERA_HEADING = 90
 CAMERA_FOV = 60
 FIXED_DISTANCE = 10.0
 
+# 감지 후 스냅샷 요청까지 대기 시간 (초), 요청 후 이미지 URL 다운로드까지 대기 시간 (초)
+SNAPSHOT_DELAY = 60
+SNAPSHOT_DOWNLOAD_DELAY = 10
+# 감지 시각이 이 시간(초) 안인 스냅샷 요청은 하나의 generateSnapshot 호출로 합쳐 이미지를 공유
+SNAPSHOT_COALESCE_WINDOW = 5
+# Meraki API 요청 한도 (조직 단위 / 장치 단위 초당 요청 수), 429면 Retry-After만큼 대기
+MERAKI_ORG_RATE = 10
+MERAKI_DEVICE_RATE = 1
+# 끝난 스냅샷 작업 기록을 저널에 남겨두는 기간 (초)
+SNAPSHOT_JOURNAL_RETENTION = 7 * 24 * 3600
+
+# 지면 보정점 [[u, v, lat, lng], ...] (u, v는 0~1 비율 화면 좌표, 4개 이상). None이면 방위각/화각으로 추정
+CAMERA_CALIBRATION = None
+
+# 카메라별 설정 (serial → lat/lng/heading/fov/distance/calibration), 없는 항목은 위 기본값 사용
+CAMERAS = {
+    # "Q2XX-XXXX-XXXX": {"lat": 37.7749, "lng": -122.4194, "heading": 90, "fov": 60},
+}
+# 같은 카메라의 같은 객체(object_id)를 다시 알리지 않는 시간 (초)
+DEDUP_TTL = 30
+# 선택: 밀린 메시지를 최대 OUTPUT_BATCH개씩 모아 outputs를 배열로 한 번에 검사/변환 (워커 스레드 1개, 결과는 같음)
+# 새 객체가 많아 위경도 변환이 잦을 때 유리하고, 대부분 중복으로 걸러지면 객체별 처리와 비슷하다
+# (src/benchmarks/benchmark_outputs.py로 비교). 0이면 MQTT 콜백에서 메시지마다 객체별로 처리
+OUTPUT_BATCH = 0
+# 디버깅용: 수신한 payload를 메시지마다 출력 (메시지가 많으면 출력 자체가 병목이 되므로 기본은 끔)
+PRINT_PAYLOAD = False
+
 base_dir = os.path.dirname(os.path.abspath(__file__))
 output_folder = os.path.join(base_dir, "../../output/")
 json_folder = os.path.join(output_folder, "json")
 image_folder = os.path.join(output_folder, "images")
+# 예약된 스냅샷 작업 저널 (재시작/크래시 후 끝나지 않은 작업을 이어서 처리)
+snapshot_journal_path = os.path.join(output_folder, "snapshot_jobs.sqlite3")
 os.makedirs(json_folder, exist_ok=True)
 os.makedirs(image_folder, exist_ok=True)
 
-last_detection_time = 0  # 최근 감지 시간 저장용 (중복 방지)
-
-# snapshot 다운로드 함수
-def download_snapshot(image_url, image_path, json_path, save_data, max_attempts=5, delay=2):
-    for attempt in range(max_attempts):
-        print(f"[{attempt+1}/{max_attempts}] 스냅샷 다운로드 시도 중...")
-        res = requests.get(image_url)
-
-        if (res.status_code == 200 or res.status_code == 202) and 'image' in res.headers.get("Content-Type", ""):
-            with open(image_path, 'wb') as f:
-                f.write(res.content)
-            with open(json_path, 'w') as f:
-                json.dump(save_data, f, indent=2)
-
-            print(f"[✅ 저장 완료] 이미지: {image_path}")
-            print(f"[✅ 저장 완료] JSON: {json_path}")
-
-            detection_upload_path = os.path.join(base_dir, "../cisco_apis/detection_upload.py")
-            subprocess.Popen(["python3", detection_upload_path, image_path, json_path])
-            return
-        else:
-            print(f"❗ 다운로드 실패(status: {res.status_code}) → {delay}초 후 재시도")
-            time.sleep(delay)
-
-    print("❌ 스냅샷 다운로드 재시도 초과. 이미지 저장 실패.")
-
-# snapshot 요청 함수
-def request_snapshot(timestamp, save_data):
-    ISOTimestamp = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    headers = {
-        "X-Cisco-Meraki-API-Key": API_KEY,
-        "Content-Type": "application/json"
-    }
-    body = {
-        "timestamp": ISOTimestamp,
-        "fullframe": False
-    }
-
-    snapshot_url = f"https://api.meraki.com/api/v1/devices/{DEVICE_SERIAL}/camera/generateSnapshot"
-    print(f">>>>>>>>>>>>>>> {ISOTimestamp}")
-    res = requests.post(snapshot_url, headers=headers, json=body)
-
-    if res.status_code == 200 or res.status_code == 202:
+# Webex 알림은 프로세스 내 notifier 워커가 전송 (위반마다 서브프로세스를 띄우지 않음)
+# WebexNotifier는 웹 서버와 함께 쓰는 저장소 루트의 cisco_common 패키지에 있음
+sys.path.append(os.path.join(base_dir, "..", "..", ".."))
+from cisco_common.webex_notifier import WebexNotifier
+
+webex_creds_path = os.path.join(base_dir, "../../assets/webex_api_key.json")
+try:
+    notifier = WebexNotifier(creds_path=webex_creds_path)
+except (FileNotFoundError, ValueError) as e:
+    print(f"[Webex] notifier disabled: {e}")
+    notifier = None
+
+# 카메라별 중복 억제 + 화면 → 위경도 변환 (변환 격자는 카메라마다 처음 메시지에서 한 번만 계산)
+consumer = MerakiConsumer(CAMERAS, defaults={
+    "lat": CAMERA_LAT, "lng": CAMERA_LNG, "heading": CAMERA_HEADING, "fov": CAMERA_FOV,
+    "distance": FIXED_DISTANCE, "calibration": CAMERA_CALIBRATION,
+}, dedup_ttl=DEDUP_TTL)
+
+# 스냅샷 스케줄러: 이벤트 루프 스레드 1개가 타이머 휠로 예약 작업을 관리하고
+# generateSnapshot 요청/이미지 다운로드는 연결 풀 HTTP 클라이언트로 처리 (작업마다 스레드/타이머 없음)
+# 작업 상태는 SQLite 저널에 기록되며, 시작 시 지난 실행에서 끝나지 않은 작업을 다시 예약
+snapshot_journal = SnapshotJournal(snapshot_journal_path)
+snapshot_journal.purge(SNAPSHOT_JOURNAL_RETENTION)
+meraki_limiter = MerakiRateLimiter(org_rate=MERAKI_ORG_RATE, org_burst=MERAKI_ORG_RATE,
+                                   device_rate=MERAKI_DEVICE_RATE)
+snapshot_scheduler = SnapshotScheduler(
+    API_KEY, DEVICE_SERIAL, image_folder, json_folder, journal=snapshot_journal,
+    limiter=meraki_limiter, coalesce_window=SNAPSHOT_COALESCE_WINDOW,
+    snapshot_delay=SNAPSHOT_DELAY, download_delay=SNAPSHOT_DOWNLOAD_DELAY,
+    request_attempts=5, request_retry_delay=3, download_attempts=5, download_retry_delay=2,
+    on_saved=notifier.notify if notifier is not None else None,
+).start()
+
+# 새로 감지된 객체가 있으면 스냅샷 예약
+def schedule_snapshot(serial, payload, save_data):
+    if not save_data:
+        print(f"🙅 [{serial}] 중심 근처에 새로 감지된 사람 없음")
+        return
+    # SNAPSHOT_DELAY초 후 해당 카메라 스냅샷 예약 (snapshot_scheduler.cancel(job_id)로 취소 가능)
+    job = snapshot_scheduler.submit(payload.get("timestamp"), save_data, serial=serial)
+    print(f"✅ [{serial}] 중심 근처에서 사람 {len(save_data)}명 감지됨 → {SNAPSHOT_DELAY}초 후 스냅샷 예약 (job {job.job_id})")
+
+
+output_queue = queue.Queue()
+
+
+def output_worker():
+    """큐에 쌓인 메시지를 한 번에 꺼내 handle_batch로 처리"""
+    while True:
+        messages = [output_queue.get()]
+        while len(messages) < OUTPUT_BATCH:
+            try:
+                messages.append(output_queue.get_nowait())
+            except queue.Empty:
+                break
         try:
-            snapshot_data = res.json()
-            image_url = snapshot_data.get("url")
-            if not image_url:
-                print("[에러] Snapshot URL 없음")
-                return
+            # 카메라(serial)별 / 객체별로 중복을 판단해 새로 나타난 객체만 남김
+            for (serial, save_data), (_, payload) in zip(consumer.handle_batch(messages, time.time()), messages):
+                schedule_snapshot(serial, payload, save_data)
+        except Exception as e:
+            print(f"[에러] 메시지 처리 중 문제 발생: {e}")
 
-            image_path = os.path.join(image_folder, f"snapshot_{timestamp}.jpg")
-            json_path = os.path.join(json_folder, f"snapshot_{timestamp}.json")
-            print("10초 뒤에 이미지 url 요청")
-            threading.Timer(10, download_snapshot, args=(image_url, image_path, json_path, save_data)).start()
 
-        except Exception as e:
-            print(f"[에러] 응답 파싱 실패: {e}")
-    else:
-        print(f"[에러] 스냅샷 요청 실패: {res.status_code} - {res.text}")
-
-def request_snapshot(timestamp, save_data, max_attempts=5, delay=3):
-    ISOTimestamp = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    headers = {
-        "X-Cisco-Meraki-API-Key": API_KEY,
-        "Content-Type": "application/json"
-    }
-    body = {
-        "timestamp": ISOTimestamp,
-        "fullframe": False
-    }
-
-    snapshot_url = f"https://api.meraki.com/api/v1/devices/{DEVICE_SERIAL}/camera/generateSnapshot"
-
-    for attempt in range(max_attempts):
-        print(f"[{attempt+1}/{max_attempts}] 스냅샷 요청 시도 중... 시간: {ISOTimestamp}")
-        res = requests.post(snapshot_url, headers=headers, json=body)
-
-        if res.status_code == 200 or res.status_code == 202:
-            try:
-                snapshot_data = res.json()
-                image_url = snapshot_data.get("url")
-                if not image_url:
-                    print("[에러] Snapshot 응답에 URL 없음 → 재시도")
-                    time.sleep(delay)
-                    continue
-
-                image_path = os.path.join(image_folder, f"snapshot_{timestamp}.jpg")
-                json_path = os.path.join(json_folder, f"snapshot_{timestamp}.json")
-                threading.Thread(
-                    target=download_snapshot,
-                    args=(image_url, image_path, json_path, save_data),
-                    kwargs={"max_attempts": 5, "delay": 2}
-                ).start()
-                return  # 성공했으면 종료
-
-            except Exception as e:
-                print(f"[에러] 응답 파싱 실패: {e} → 재시도")
-        else:
-            print(f"[에러] 요청 실패: {res.status_code} - {res.text} → 재시도")
-
-        time.sleep(delay)  # 다음 시도까지 대기
-
-    print("❌ 스냅샷 요청 재시도 초과. 요청 실패.")
+if OUTPUT_BATCH:
+    threading.Thread(target=output_worker, daemon=True).start()
+
 
 # MQTT 메시지 수신 시 처리
 def on_message(client, userdata, msg):
-    global last_detection_time
-    payload = json.loads(msg.payload.decode('utf-8'))
-    print(payload)
     try:
-
-        outputs = payload.get("outputs", [])
-        timestamp = payload.get("timestamp")
-        save_data = []
-
-        now = time.time()
-        if now - last_detection_time < 30:
-            return
-
-        for obj in outputs:
-            if obj.get("class") == 0:
-                box = obj.get("location")  # [x1, y1, x2, y2] normalized
-                if not box:
-                    continue
-                x1, y1, x2, y2 = box
-                center_x = (x1 + x2) / 2
-
-                if 0.4 <= center_x <= 0.6:  # 중심 근처 감지 기준
-                    # 위경도 추정
-                    relative_offset = center_x - 0.5
-                    angle_offset = relative_offset * CAMERA_FOV
-                    absolute_angle = CAMERA_HEADING + angle_offset
-                    dx = FIXED_DISTANCE * math.sin(math.radians(absolute_angle))
-                    dy = FIXED_DISTANCE * math.cos(math.radians(absolute_angle))
-                    delta_lat = dy / 111320
-                    delta_lng = dx / (111320 * math.cos(math.radians(CAMERA_LAT)))
-                    lat = CAMERA_LAT + delta_lat
-                    lng = CAMERA_LNG + delta_lng
-
-                    save_data.append({
-                        "object_id": obj.get("object_id"),
-                        "lat": lat,
-                        "lng": lng,
-                        "timestamp": datetime.fromtimestamp(timestamp / 1000).isoformat()
-                    })
-
-                    last_detection_time = now
-
-                    # 60초 후 스냅샷 예약
-                    print("✅ 중심 근처에서 사람 감지됨 → 60초 후 스냅샷 예약")
-                    threading.Timer(60, request_snapshot, args=(timestamp, save_data)).start()
-                    break
-        else:
-            print("🙅 중심 근처에 사람 감지되지 않음")
+        # orjson이 설치되어 있으면 orjson으로 해석 (orjson/json 디코드 오류는 모두 ValueError)
+        payload = loads_payload(msg.payload)
+    except ValueError as e:
+        # 깨진 메시지 하나 때문에 loop_forever가 끝나지 않도록 기록만 하고 버림
+        print(f"[에러] payload 해석 실패 ({msg.topic}): {e}")
+        return
+    if PRINT_PAYLOAD:
+        print(payload)
+    if OUTPUT_BATCH:
+        output_queue.put((msg.topic, payload))
+        return
+    try:
+        # 카메라(serial)별 / 객체별로 중복을 판단해 새로 나타난 객체만 남김
+        serial, save_data = consumer.handle(msg.topic, payload, time.time())
+        schedule_snapshot(serial, payload, save_data)
 
     except Exception as e:
         print(f"[에러] 메시지 처리 중 문제 발생: {e}")
@@ -202,4 +164,10 @@ client.on_message = on_message
 
 print(f"[MQTT] 브로커 연결 중… ({MQTT_BROKER})")
 client.connect(MQTT_BROKER, 1883, 60)
-client.loop_forever()
+try:
+    client.loop_forever()
+finally:
+    print(f"[Snapshot] {snapshot_scheduler.stats()}")
+    print(f"[Dedup] {consumer.stats()}")
+    snapshot_scheduler.stop()
+    snapshot_journal.close()
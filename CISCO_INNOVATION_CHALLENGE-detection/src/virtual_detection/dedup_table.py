@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import math
+import threading
+
+
+# ------------------------------------------------------------------
+# 카메라(serial) × 객체(object_id)별 중복 알림 억제 표: 만료는 타이머 휠로 O(1) 정리
+# ------------------------------------------------------------------
+class DedupTable:
+    """
+    should_report(serial, object_id, now)는 처음 보는 객체(또는 ttl이 지난 객체)면 True를 돌려주고
+    ttl초 동안 같은 객체를 다시 알리지 않는다. 같은 카메라의 다른 객체나 다른 카메라는 서로 영향이 없다.
+    표는 key → 만료 tick 정수 하나만 보관하고, tick초 단위 버킷(원형 배열)에 key를 넣어 두었다가
+    시각이 지나면 해당 버킷만 비운다 (전체 표를 훑는 주기 정리 없음).
+    now는 호출자가 넘기는 시각(초)이라 실시간/재생/벤치마크 모두 같은 방식으로 동작한다.
+    """
+
+    def __init__(self, ttl=30.0, tick=1.0):
+        self.ttl = ttl
+        self.tick = tick
+        self.ttl_ticks = math.ceil(ttl / tick)
+        self.slots = self.ttl_ticks + 2  # 만료 tick이 한 바퀴 안에 들어오도록
+        self._buckets = [[] for _ in range(self.slots)]
+        self._expiry = {}  # (serial, object_id) -> 만료 tick
+        self._current = None
+        self._lock = threading.Lock()
+        self.reported = 0
+        self.suppressed = 0
+        self.evicted = 0
+
+    def _advance(self, now_tick):
+        if self._current is None:
+            self._current = now_tick
+            return
+        if now_tick <= self._current:
+            return
+        # 시계가 한 바퀴 이상 건너뛰면 모든 버킷을 한 번씩만 비움
+        if now_tick - self._current >= self.slots:
+            indexes = range(self.slots)
+        else:
+            indexes = [tick % self.slots for tick in range(self._current + 1, now_tick + 1)]
+        for index in indexes:
+            bucket = self._buckets[index]
+            if not bucket:
+                continue
+            self._buckets[index] = []
+            for key in bucket:
+                # 다시 등록된 key는 다른 버킷에 새 만료 tick으로 들어가 있으므로 건드리지 않음
+                expiry = self._expiry.get(key)
+                if expiry is not None and expiry <= now_tick:
+                    del self._expiry[key]
+                    self.evicted += 1
+        self._current = now_tick
+
+    def _check(self, key, now_tick):
+        expiry = self._expiry.get(key)
+        if expiry is not None and expiry > now_tick:
+            self.suppressed += 1
+            return False
+        expiry = now_tick + self.ttl_ticks
+        self._expiry[key] = expiry
+        self._buckets[expiry % self.slots].append(key)
+        self.reported += 1
+        return True
+
+    def should_report(self, serial, object_id, now):
+        now_tick = int(now // self.tick)
+        with self._lock:
+            self._advance(now_tick)
+            return self._check((serial, object_id), now_tick)
+
+    def should_report_many(self, keys, now):
+        """[(serial, object_id), ...] 를 순서대로 should_report() 한 결과 목록 (잠금/시계 진행은 한 번)"""
+        now_tick = int(now // self.tick)
+        with self._lock:
+            self._advance(now_tick)
+            return [self._check(key, now_tick) for key in keys]
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def stats(self):
+        with self._lock:
+            serials = len({serial for serial, _ in self._expiry})
+            return {"entries": len(self._expiry), "cameras": serials, "reported": self.reported,
+                    "suppressed": self.suppressed, "evicted": self.evicted}
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+로컬 Meraki 대체 서버: generateSnapshot 엔드포인트와 스냅샷 이미지 URL을 흉내 냄
+
+    POST /api/v1/devices/<serial>/camera/generateSnapshot → 202 {"url": ..., "expiry": ...}
+    GET  /snapshots/<id>.jpg → 발급 후 ready_after초 전까지 404, 이후 image/jpeg
+
+fail_every=N 이면 N번째 요청마다 generateSnapshot이 503을 돌려줘 재시도 경로를 확인할 수 있다.
+(같은 timestamp 요청은 한 번만 실패시켜, 재시도하면 반드시 성공)
+rate_limit=R 이면 generateSnapshot을 초당 R건까지만 받고 넘으면 429 + Retry-After를 돌려준다.
+
+단독 실행 시 SnapshotScheduler를 이 서버에 붙여 작업 수천 개를 짧은 지연으로 돌려보고 처리량과 결과를 출력한다.
+--journal 은 SQLite 저널을 쓰고, --restart-after 는 중간에 스케줄러를 멈춘 뒤 저널에서 복구한다:
+    python3 fake_meraki.py [--jobs 2000] [--cameras 1] [--cancel 0.1] [--fail-every 7] [--journal] [--restart-after 0.5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 가장 작은 형태의 JPEG (SOI ... EOI), 다운로드 확인용
+FAKE_JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00\xff\xd9"
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 keep-alive 연결을 닫을 때의 연결 끊김은 무시
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeMerakiServer:
+    def __init__(self, host="127.0.0.1", port=0, ready_after=0.0, fail_every=0, rate_limit=0):
+        self.ready_after = ready_after
+        self.fail_every = fail_every
+        self.rate_limit = rate_limit
+        self._window = []  # 최근 1초 동안 받은 generateSnapshot 시각
+        self.rate_limited = 0
+        self._issued = {}  # snapshot id -> 발급 시각
+        self._failed = set()  # 이미 한 번 실패시킨 timestamp
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.snapshot_requests = 0
+        self.image_requests = 0
+        self.images_served = 0
+        self._server = _QuietServer((host, port), self._handler())
+        self.base_url = f"http://{host}:{self._server.server_port}"
+
+    def _handler(self):
+        fake = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive (클라이언트 연결 재사용 확인)
+
+            def _reply(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                timestamp = json.loads(self.rfile.read(length) or b"{}").get("timestamp")
+                if not self.path.endswith("/camera/generateSnapshot"):
+                    self._reply(404, b"not found", "text/plain")
+                    return
+                with fake._lock:
+                    fake.snapshot_requests += 1
+                    now = time.monotonic()
+                    fake._window = [t for t in fake._window if now - t < 1.0]
+                    limited = fake.rate_limit and len(fake._window) >= fake.rate_limit
+                    if limited:
+                        fake.rate_limited += 1
+                    else:
+                        fake._window.append(now)
+                if limited:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Type", "application/json")
+                    body = b'{"errors": ["API rate limit exceeded"]}'
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                with fake._lock:
+                    fail = (fake.fail_every and fake.snapshot_requests % fake.fail_every == 0
+                            and timestamp not in fake._failed)
+                    if fail:
+                        fake._failed.add(timestamp)
+                    snapshot_id = next(fake._ids)
+                    if not fail:
+                        fake._issued[snapshot_id] = time.monotonic()
+                if fail:
+                    self._reply(503, b'{"errors": ["unavailable"]}', "application/json")
+                    return
+                body = json.dumps({"url": f"{fake.base_url}/snapshots/{snapshot_id}.jpg",
+                                   "expiry": "2099-01-01T00:00:00Z"}).encode()
+                self._reply(202, body, "application/json")
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.image_requests += 1
+                    issued = None
+                    if self.path.startswith("/snapshots/") and self.path.endswith(".jpg"):
+                        issued = fake._issued.get(int(self.path[len("/snapshots/"):-4] or 0))
+                    ready = issued is not None and time.monotonic() - issued >= fake.ready_after
+                    if ready:
+                        fake.images_served += 1
+                if ready:
+                    self._reply(200, FAKE_JPEG, "image/jpeg")
+                else:
+                    self._reply(404, b"not ready", "text/plain")
+
+            def log_message(self, *args):
+                pass
+
+        return _Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {"snapshot_requests": self.snapshot_requests, "rate_limited": self.rate_limited,
+                    "image_requests": self.image_requests, "images_served": self.images_served}
+
+
+def main():
+    from snapshot_scheduler import SnapshotScheduler
+    from snapshot_journal import SnapshotJournal
+    from rate_limiter import MerakiRateLimiter
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--cancel", type=float, default=0.1, help="제출 직후 취소할 작업 비율")
+    parser.add_argument("--fail-every", type=int, default=7)
+    parser.add_argument("--snapshot-delay", type=float, default=1.0)
+    parser.add_argument("--download-delay", type=float, default=0.2)
+    parser.add_argument("--cameras", type=int, default=1, help="작업을 나눠 줄 카메라(serial) 수")
+    parser.add_argument("--spacing-ms", type=int, default=50, help="작업 간 감지 시각 간격 (밀리초)")
+    parser.add_argument("--coalesce-window", type=float, default=0.0,
+                        help="이 시간(초) 안의 감지는 스냅샷 요청 하나로 합침")
+    parser.add_argument("--server-rate-limit", type=int, default=0, help="대체 서버의 초당 허용 요청 수 (0이면 무제한)")
+    parser.add_argument("--org-rate", type=float, default=1000.0, help="클라이언트 조직 단위 초당 요청 수")
+    parser.add_argument("--device-rate", type=float, default=1000.0, help="클라이언트 장치 단위 초당 요청 수")
+    parser.add_argument("--journal", action="store_true", help="SQLite 저널 사용 (임시 폴더)")
+    parser.add_argument("--restart-after", type=float, default=None,
+                        help="이 시간(초) 뒤 스케줄러를 멈추고 같은 저널로 새로 시작해 복구 확인 (--journal 필요)")
+    args = parser.parse_args()
+    if args.restart_after is not None:
+        args.journal = True
+
+    server = FakeMerakiServer(ready_after=0.3, fail_every=args.fail_every,
+                              rate_limit=args.server_rate_limit).start()
+    limiter = MerakiRateLimiter(org_rate=args.org_rate, org_burst=max(1, int(args.org_rate)),
+                                device_rate=args.device_rate, device_burst=max(1, int(args.device_rate)))
+    out_dir = tempfile.mkdtemp(prefix="snapshots_")
+    saved = []
+
+    def new_scheduler(journal):
+        return SnapshotScheduler("FAKE_KEY", "FAKE-SERIAL", os.path.join(out_dir, "images"),
+                                 os.path.join(out_dir, "json"), base_url=f"{server.base_url}/api/v1",
+                                 snapshot_delay=args.snapshot_delay, download_delay=args.download_delay,
+                                 request_retry_delay=0.1, download_retry_delay=0.2, tick=0.05,
+                                 on_saved=lambda data, path: saved.append((data, path)),
+                                 keep_finished=args.jobs, journal=journal, limiter=limiter,
+                                 coalesce_window=args.coalesce_window).start()
+
+    journal_path = os.path.join(out_dir, "snapshot_jobs.sqlite3")
+    journal = SnapshotJournal(journal_path) if args.journal else None
+    scheduler = new_scheduler(journal)
+    start = time.monotonic()
+    base_ts = int(time.time() * 1000)
+    jobs = [scheduler.submit(base_ts + i * args.spacing_ms, [{"object_id": i}], serial=f"FAKE-SERIAL-{i % args.cameras}")
+            for i in range(args.jobs)]
+    submit_elapsed = time.monotonic() - start
+    cancel_every = round(1 / args.cancel) if args.cancel else 0
+    cancelled = [job.job_id for i, job in enumerate(jobs) if cancel_every and i % cancel_every == 0]
+    for job_id in cancelled:
+        scheduler.cancel(job_id)
+    print(f"submitted {len(jobs)} jobs in {submit_elapsed * 1000:.0f} ms "
+          f"({len(jobs) / submit_elapsed:.0f} jobs/s{', journaled' if journal else ''}), "
+          f"cancelled {len(cancelled)}")
+
+    def wait_finished(sched, expected):
+        # 작업은 이벤트 루프에서 등록되므로 expected개가 모두 보일 때까지 함께 기다림
+        while len(sched.jobs) < expected or not all(job.finished for job in list(sched.jobs.values())):
+            time.sleep(0.05)
+
+    if args.restart_after is not None:
+        time.sleep(args.restart_after)
+        scheduler.stop()  # 진행 중 작업을 끊고 종료 (크래시 상황)
+        journal.close()
+        print(f"restart: journal before recovery {SnapshotJournal(journal_path).counts()}")
+        recovery_start = time.monotonic()
+        journal = SnapshotJournal(journal_path)
+        scheduler = new_scheduler(journal)
+        print(f"recovered {scheduler.recovered} jobs in {(time.monotonic() - recovery_start) * 1000:.0f} ms")
+        wait_finished(scheduler, scheduler.recovered)
+    else:
+        wait_finished(scheduler, len(jobs))
+    elapsed = time.monotonic() - start
+    scheduler.stop()
+    server.stop()
+
+    stats = scheduler.stats()
+    print(f"finished in {elapsed:.2f}s ({len(jobs) / elapsed:.0f} jobs/s end to end): {stats}")
+    print(f"server: {server.stats()}")
+    expected_done = len(jobs) - len(cancelled)
+    # 취소되지 않은 감지는 모두 정확히 한 번 알림에 포함되어야 함 (합쳐진 경우 같은 이미지에 여러 감지)
+    notified = sorted(det["object_id"] for data, _ in saved for det in data)
+    cancelled_ids = {jobs[i].job_id for i in range(len(jobs)) if jobs[i].job_id in set(cancelled)}
+    expected_ids = sorted(i for i, job in enumerate(jobs) if job.job_id not in cancelled_ids)
+    print(f"notifications: {len(saved)} images for {len(notified)} detections")
+    ok = notified == expected_ids
+    if journal is not None:
+        counts = journal.counts()
+        print(f"journal: {counts}")
+        ok = ok and counts.get("done") == expected_done and counts.get("cancelled") == len(cancelled)
+        journal.close()
+    else:
+        ok = (ok and stats["done"] == expected_done and stats["cancelled"] == len(cancelled)
+              and all(scheduler.get(job_id).status == "cancelled" for job_id in cancelled))
+    print("OK" if ok else "MISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
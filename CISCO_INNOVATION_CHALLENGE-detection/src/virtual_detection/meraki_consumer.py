@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import threading
+from itertools import chain
+from datetime import datetime
+
+import numpy as np
+
+from dedup_table import DedupTable
+
+# 위경도 변환은 웹 서버와 함께 쓰는 저장소 루트의 cisco_common 패키지에 있음
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from cisco_common.geo import CameraProjector
+
+try:
+    import orjson  # 선택: 설치되어 있으면 메시지 JSON 해석에 사용
+except ImportError:
+    orjson = None
+
+# location이 없는 객체 자리 (중심 좌표가 NaN이라 어떤 범위 검사도 통과하지 않음)
+_NO_BOX = (np.nan, np.nan, np.nan, np.nan)
+
+
+def loads_payload(data):
+    """MQTT payload(bytes) → dict. orjson이 있으면 orjson, 없으면 표준 json"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def detected_at(timestamp):
+    """메시지 timestamp(에포크 밀리초) → ISO 문자열. 숫자가 아니거나 범위를 벗어나면 None"""
+    try:
+        return datetime.fromtimestamp(timestamp / 1000).isoformat()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def _valid_object(obj):
+    """outputs 항목 검사: dict이고 location이 비어 있거나 숫자 4개 [x1, y1, x2, y2]"""
+    if not isinstance(obj, dict):
+        return False
+    box = obj.get("location")
+    return (not box or (type(box) in (list, tuple) and len(box) == 4
+                        and all(type(value) in (int, float) for value in box)))
+
+
+def serial_from_topic(topic):
+    """'/merakimv/<serial>/custom_analytics' → serial"""
+    parts = topic.split("/")
+    return parts[2] if len(parts) > 2 else None
+
+
+# ------------------------------------------------------------------
+# 여러 카메라의 custom_analytics 메시지 → 새로 나타난 객체의 위경도 기록
+# ------------------------------------------------------------------
+class MerakiConsumer:
+    """
+    와일드카드 토픽('/merakimv/+/custom_analytics')으로 받은 메시지를 카메라(serial)별로 처리한다.
+    중복 억제는 전역 마지막 감지 시각 하나가 아니라 (serial, object_id)마다 dedup_ttl초로 따로 판단하므로
+    한 카메라의 감지가 다른 카메라나 같은 화면의 다른 사람을 가리지 않는다.
+    카메라 설정은 cameras[serial] (없는 키는 defaults) 에서 읽고, 위경도 변환 격자는 카메라마다 한 번만 만든다.
+    handle()은 객체를 하나씩 검사하고, handle_batch()는 여러 메시지의 outputs를 배열로 모아
+    클래스/중심 범위 검사와 위경도 변환을 한 번에 처리한다 (결과는 handle()을 차례로 부른 것과 같음).
+    """
+
+    def __init__(self, cameras=None, defaults=None, dedup_ttl=30.0, target_class=0, center_range=(0.4, 0.6)):
+        self.cameras = cameras or {}
+        self.defaults = defaults or {}
+        self.target_class = target_class
+        self.center_range = center_range
+        self.dedup = DedupTable(ttl=dedup_ttl)
+        self._projectors = {}
+        self._lock = threading.Lock()
+
+    def projector(self, serial):
+        projector = self._projectors.get(serial)
+        if projector is None:
+            with self._lock:
+                projector = self._projectors.get(serial)
+                if projector is None:
+                    config = {**self.defaults, **self.cameras.get(serial, {})}
+                    projector = CameraProjector(config["lat"], config["lng"], config.get("heading", 90.0),
+                                                config.get("fov", 60.0), config.get("distance", 10.0),
+                                                calibration=config.get("calibration"))
+                    self._projectors[serial] = projector
+        return projector
+
+    def _checked(self, serial, payload):
+        """
+        메시지 검사 → (감지 시각 ISO 문자열, outputs). timestamp가 숫자가 아니거나 outputs의 location이
+        비어 있지도 숫자 4개도 아니면 로그를 남기고 None (중복 억제 표를 건드리기 전에 메시지 단위로 버림)
+        """
+        timestamp = detected_at(payload.get("timestamp"))
+        outputs = payload.get("outputs", [])
+        if timestamp is None:
+            reason = f"invalid timestamp {payload.get('timestamp')!r}"
+        elif not isinstance(outputs, list) or not all(map(_valid_object, outputs)):
+            reason = "malformed outputs"
+        else:
+            return timestamp, outputs
+        print(f"[MerakiConsumer] {serial}: {reason}, message skipped")
+        return None
+
+    def handle(self, topic, payload, now):
+        """
+        메시지 하나 처리 → (serial, save_data). save_data는 중심 근처에 새로 나타난 객체 기록 목록
+        (없으면 빈 목록). 한 메시지에 새 객체가 여럿이면 모두 기록한다 (첫 객체만 알리지 않음).
+        now는 중복 판단 기준 시각(초). 잘못된 메시지는 중복 억제 표를 건드리지 않고 버린다.
+        """
+        serial = serial_from_topic(topic)
+        checked = self._checked(serial, payload)
+        if checked is None:
+            return serial, []
+        timestamp, outputs = checked
+        low, high = self.center_range
+        candidates = []
+        boxes = []
+        for obj in outputs:
+            if obj.get("class") != self.target_class:
+                continue
+            box = obj.get("location")  # [x1, y1, x2, y2] normalized
+            if not box:
+                continue
+            center_x = (box[0] + box[2]) / 2
+            if not low <= center_x <= high:  # 중심 근처 감지 기준
+                continue
+            if not self.dedup.should_report(serial, obj.get("object_id"), now):
+                continue
+            candidates.append(obj)
+            boxes.append(box)
+        if not candidates:
+            return serial, []
+
+        # 위경도 추정 (박스 좌표가 0~1 비율이므로 화면 크기 1 × 1 기준, 메시지의 객체를 한 번에 변환)
+        lats, lngs = self.projector(serial).project_boxes(np.array(boxes, dtype=np.float64), 1.0, 1.0)
+        save_data = [{
+            "camera": serial,
+            "object_id": obj.get("object_id"),
+            "lat": float(lat),
+            "lng": float(lng),
+            "timestamp": timestamp,
+        } for obj, lat, lng in zip(candidates, lats, lngs)]
+        return serial, save_data
+
+    def handle_batch(self, messages, now):
+        """
+        [(topic, payload), ...] 를 한 번에 처리 → 메시지마다 (serial, save_data) 목록.
+        중복 판단은 메시지 순서 / outputs 순서 그대로 하므로 handle()을 차례로 부른 것과 결과가 같다.
+        잘못된 메시지는 먼저 걸러 (serial, [])로 두고, 배열은 올바른 메시지로만 만든다.
+        """
+        results = [(serial_from_topic(topic), []) for topic, _ in messages]
+        valid = []  # (결과 번호, serial, 감지 시각, outputs)
+        for index, (_, payload) in enumerate(messages):
+            serial = results[index][0]
+            checked = self._checked(serial, payload)
+            if checked is not None:
+                valid.append((index, serial, *checked))
+        objects = [obj for *_, outputs in valid for obj in outputs]
+        if not objects:
+            return results
+
+        # outputs → 배열 (클래스 [N], 박스 [N, 4]), 올바른 메시지 중 번호 [N]
+        # (중첩 리스트를 np.array로 바꾸는 것보다 평탄화해 fromiter로 채우는 편이 훨씬 빠름)
+        target = self.target_class
+        classes = np.fromiter((obj.get("class") == target for obj in objects), dtype=bool, count=len(objects))
+        boxes = np.fromiter(chain.from_iterable(obj.get("location") or _NO_BOX for obj in objects),
+                            dtype=np.float64, count=4 * len(objects)).reshape(-1, 4)
+        owner = np.repeat(np.arange(len(valid)), [len(outputs) for *_, outputs in valid])
+        center_x = (boxes[:, 0] + boxes[:, 2]) / 2
+        low, high = self.center_range
+        # NaN(위치 없음)은 비교가 모두 False라 자동으로 빠짐
+        candidates = np.flatnonzero(classes & (center_x >= low) & (center_x <= high))
+        if len(candidates) == 0:
+            return results
+
+        owners = owner.tolist()
+        candidates = candidates.tolist()
+        reports = self.dedup.should_report_many(
+            [(valid[owners[index]][1], objects[index].get("object_id")) for index in candidates], now)
+        kept = [index for index, report in zip(candidates, reports) if report]
+        if not kept:
+            return results
+
+        # 카메라마다 변환 격자가 다르므로 serial별로 묶어 한 번씩 변환
+        kept = np.array(kept)
+        lats = np.empty(len(kept))
+        lngs = np.empty(len(kept))
+        by_serial = {}
+        for position, index in enumerate(kept.tolist()):
+            by_serial.setdefault(valid[owners[index]][1], []).append(position)
+        for serial, positions in by_serial.items():
+            lats[positions], lngs[positions] = self.projector(serial).project_boxes(boxes[kept[positions]], 1.0, 1.0)
+
+        for position, index in enumerate(kept.tolist()):
+            message, serial, timestamp, _ = valid[owners[index]]
+            results[message][1].append({
+                "camera": serial,
+                "object_id": objects[index].get("object_id"),
+                "lat": float(lats[position]),
+                "lng": float(lngs[position]),
+                "timestamp": timestamp,
+            })
+        return results
+
+    def stats(self):
+        return {"projectors": len(self._projectors), **self.dedup.stats()}
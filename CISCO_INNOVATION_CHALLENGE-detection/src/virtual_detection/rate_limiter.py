@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value, default):
+    """Retry-After 헤더(초 또는 HTTP 날짜) → 대기 초. 없거나 해석할 수 없으면 default"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    rate(초당 요청) / burst(연속 허용 수) 토큰 버킷. 토큰 수 대신 다음 요청 가능 시각(TAT)만 보관하므로
+    요청 시점에 '언제 보내면 되는지'를 바로 계산해 예약할 수 있다 (GCRA).
+    """
+
+    def __init__(self, rate, burst=1):
+        self.interval = 1.0 / rate
+        self.tolerance = (max(1, burst) - 1) * self.interval
+        self._tat = 0.0
+
+    def earliest(self, now):
+        return max(now, self._tat - self.tolerance)
+
+    def consume(self, at):
+        self._tat = max(self._tat, at) + self.interval
+
+
+# ------------------------------------------------------------------
+# Meraki API 요청 제한: 조직 단위 + 장치(serial) 단위 토큰 버킷, 429 Retry-After 반영
+# ------------------------------------------------------------------
+class MerakiRateLimiter:
+    """
+    reserve(serial)은 두 버킷을 모두 만족하는 가장 이른 전송 시각을 예약하고 그때까지의 대기 초를 돌려준다.
+    (스레드 안전: 여러 카메라의 스케줄러 이벤트 루프가 하나의 limiter를 공유해 조직 한도를 함께 지킴)
+    429를 받으면 retry_after()로 조직 전체 요청을 Retry-After 동안 멈춘다.
+    같은 카메라의 스냅샷 요청을 하나로 합쳐 아낀 요청 수는 record_saved()로 집계한다.
+    """
+
+    def __init__(self, org_rate=10.0, org_burst=10, device_rate=1.0, device_burst=2):
+        self.org = TokenBucket(org_rate, org_burst)
+        self.device_rate = device_rate
+        self.device_burst = device_burst
+        self._devices = {}
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waited = 0.0       # 요청 전에 기다린 시간 합계 (초)
+        self.max_wait = 0.0
+        self.throttled = 0      # 받은 429 수
+        self.saved = 0          # 합치기로 보내지 않은 요청 수
+
+    def reserve(self, serial):
+        with self._lock:
+            now = time.monotonic()
+            device = self._devices.get(serial)
+            if device is None:
+                device = self._devices[serial] = TokenBucket(self.device_rate, self.device_burst)
+            at = max(self.org.earliest(now), device.earliest(now), self._blocked_until)
+            self.org.consume(at)
+            device.consume(at)
+            wait = at - now
+            self.requests += 1
+            self.waited += wait
+            self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def blocked_for(self):
+        """Retry-After로 아직 막혀 있는 남은 시간 (예약 후 429가 온 경우 다시 확인용, 대기 시간에 합산)"""
+        with self._lock:
+            wait = max(0.0, self._blocked_until - time.monotonic())
+            self.waited += wait
+            return wait
+
+    def retry_after(self, seconds):
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def record_saved(self, count=1):
+        with self._lock:
+            self.saved += count
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "saved": self.saved, "throttled": self.throttled,
+                    "wait_total_s": round(self.waited, 3), "wait_max_s": round(self.max_wait, 3),
+                    "wait_avg_s": round(self.waited / self.requests, 3) if self.requests else 0.0}
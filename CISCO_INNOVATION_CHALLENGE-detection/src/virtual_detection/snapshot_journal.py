@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import json
+import time
+import sqlite3
+import itertools
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_jobs (
+    job_id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    serial            TEXT    NOT NULL,
+    timestamp         INTEGER NOT NULL,
+    save_data         TEXT    NOT NULL,
+    status            TEXT    NOT NULL,
+    due_at            REAL    NOT NULL,
+    request_attempts  INTEGER NOT NULL DEFAULT 0,
+    download_attempts INTEGER NOT NULL DEFAULT 0,
+    image_url         TEXT,
+    image_path        TEXT,
+    error             TEXT,
+    created_at        REAL    NOT NULL,
+    updated_at        REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshot_jobs_status ON snapshot_jobs (status, due_at);
+"""
+
+# 재시작 후 다시 예약하지 않는 상태
+_FINISHED = ("done", "failed", "cancelled")
+
+
+# ------------------------------------------------------------------
+# 스냅샷 작업 저널: 예약 시각 / 시도 횟수 / 결과를 SQLite에 기록해 재시작 후에도 이어서 처리
+# ------------------------------------------------------------------
+class SnapshotJournal:
+    """
+    add()/update()는 커밋하지 않고 쌓아두며, 스케줄러가 이벤트 루프 스레드에서 루프 한 바퀴마다
+    commit()으로 한 번에 반영한다 (MQTT 콜백 스레드에서는 SQLite에 쓰지 않음).
+    커밋 전에 죽으면 마지막 변경만 사라진다: 상태 변경이면 작업은 이전 상태에서 다시 실행되고,
+    방금 추가한 작업이면 그 작업이 저널에 남지 않는다.
+    job_id는 next_id()가 저널의 최대 id 다음부터 발급하므로 어느 스레드에서든 바로 얻을 수 있다.
+    due_at은 벽시계(에포크 초) 기준이라 재시작 후에도 남은 대기 시간을 계산할 수 있다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        # 삭제(purge)된 id도 다시 쓰지 않도록 AUTOINCREMENT 시퀀스와 현재 최대 id 중 큰 값 다음부터 발급
+        last_id = self._conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(job_id) FROM snapshot_jobs), 0),"
+            " COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'snapshot_jobs'), 0))").fetchone()[0]
+        self._ids = itertools.count(last_id + 1)
+
+    def next_id(self):
+        """새 작업의 job_id (스레드 안전, 재시작 후에도 겹치지 않음)"""
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, job, due_at):
+        """새 작업(job.job_id는 next_id()로 발급)을 기록 (commit() 전까지 보류)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO snapshot_jobs (job_id, serial, timestamp, save_data, status, due_at, created_at,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.serial, job.timestamp, json.dumps(job.save_data, ensure_ascii=False), job.status,
+                 due_at, now, now))
+
+    def update(self, job, due_at=None):
+        """job의 상태/시도 횟수/결과를 기록 (commit() 전까지 보류)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE snapshot_jobs SET status = ?, due_at = COALESCE(?, due_at), request_attempts = ?,"
+                " download_attempts = ?, image_url = ?, image_path = ?, error = ?, updated_at = ?"
+                " WHERE job_id = ?",
+                (job.status, due_at, job.request_attempts, job.download_attempts, job.image_url,
+                 job.image_path, job.error, time.time(), job.job_id))
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def pending(self):
+        """끝나지 않은 작업 목록 (due_at 순). 재시작 시 복구용"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, serial, timestamp, save_data, status, due_at, request_attempts,"
+                " download_attempts, image_url FROM snapshot_jobs WHERE status NOT IN (?, ?, ?) ORDER BY due_at",
+                _FINISHED).fetchall()
+        return [{"job_id": row[0], "serial": row[1], "timestamp": row[2], "save_data": json.loads(row[3]),
+                 "status": row[4], "due_at": row[5], "request_attempts": row[6], "download_attempts": row[7],
+                 "image_url": row[8]} for row in rows]
+
+    def get(self, job_id):
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM snapshot_jobs WHERE job_id = ?", (job_id,))
+            row = cur.fetchone()
+            columns = [d[0] for d in cur.description]
+        if row is None:
+            return None
+        record = dict(zip(columns, row))
+        record["save_data"] = json.loads(record["save_data"])
+        return record
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM snapshot_jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def purge(self, older_than):
+        """older_than초보다 오래 전에 끝난 작업 삭제, 삭제한 행 수 반환"""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM snapshot_jobs WHERE status IN (?, ?, ?) AND updated_at < ?",
+                _FINISHED + (time.time() - older_than,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+import os
+import json
+import math
+import time
+import asyncio
+import itertools
+import threading
+from collections import deque
+from datetime import datetime, timezone
+import aiohttp
+from rate_limiter import MerakiRateLimiter, parse_retry_after
+
+MERAKI_API_URL = "https://api.meraki.com/api/v1"
+
+
+# ------------------------------------------------------------------
+# 해시 타이머 휠: 예약 작업 수천 개를 asyncio 태스크 하나로 관리 (작업마다 스레드/타이머 없음)
+# ------------------------------------------------------------------
+class TimerHandle:
+    __slots__ = ("target", "callback", "args", "cancelled")
+
+    def __init__(self, target, callback, args):
+        self.target = target  # 실행할 절대 tick 번호
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel:
+    """
+    tick초 단위 슬롯 slots개로 된 원형 버킷. 예약/취소는 O(1)이고, 매 tick마다 현재 슬롯만 검사한다.
+    slots × tick보다 긴 지연은 target tick 비교로 다음 바퀴까지 남겨둔다.
+    이벤트 루프 스레드에서만 사용한다.
+    """
+
+    def __init__(self, tick=0.5, slots=512):
+        self.tick = tick
+        self.slots = slots
+        self._buckets = [[] for _ in range(slots)]
+        self._current = 0
+        self.pending = 0
+
+    def schedule(self, delay, callback, *args):
+        target = self._current + max(1, math.ceil(delay / self.tick))
+        handle = TimerHandle(target, callback, args)
+        self._buckets[target % self.slots].append(handle)
+        self.pending += 1
+        return handle
+
+    def cancel(self, handle):
+        if handle is not None and not handle.cancelled:
+            handle.cancelled = True
+            self.pending -= 1
+
+    def _advance(self):
+        self._current += 1
+        index = self._current % self.slots
+        due, keep = [], []
+        for handle in self._buckets[index]:
+            if handle.cancelled:
+                continue
+            (due if handle.target <= self._current else keep).append(handle)
+        self._buckets[index] = keep
+        for handle in due:
+            handle.cancelled = True  # 실행된 핸들은 다시 취소되지 않도록
+            self.pending -= 1
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"[TimerWheel] callback failed: {e}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            # 루프가 늦어졌으면 밀린 tick을 모두 처리
+            while loop.time() >= next_tick:
+                self._advance()
+                next_tick += self.tick
+
+
+# ------------------------------------------------------------------
+# 스냅샷 작업: 상태 조회 / 취소 가능
+# ------------------------------------------------------------------
+class SnapshotJob:
+    SCHEDULED = "scheduled"      # generateSnapshot 요청 대기
+    REQUESTING = "requesting"    # generateSnapshot 요청 중
+    WAITING = "waiting"          # 이미지 URL 발급됨, 다운로드 대기
+    COALESCED = "coalesced"      # 같은 카메라의 다른 작업(리더) 스냅샷을 함께 사용
+    DOWNLOADING = "downloading"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    FINISHED = (DONE, FAILED, CANCELLED)
+
+    def __init__(self, job_id, timestamp, save_data, serial):
+        self.job_id = job_id
+        self.serial = serial  # 카메라 serial
+        self.timestamp = timestamp  # 감지 시각 (에포크 밀리초)
+        self.save_data = save_data
+        self.status = self.SCHEDULED
+        self.request_attempts = 0
+        self.download_attempts = 0
+        self.rate_limited = 0  # 429로 다시 예약된 횟수 (request_attempts에는 포함하지 않음)
+        self.image_url = None
+        self.image_path = None
+        self.error = None
+        self.due_at = None  # 다음 단계 실행 예정 시각 (에포크 초)
+        self._timer = None
+        self._task = None
+        self._group = None
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED
+
+    def info(self):
+        return {"job_id": self.job_id, "serial": self.serial, "timestamp": self.timestamp, "status": self.status,
+                "request_attempts": self.request_attempts, "download_attempts": self.download_attempts,
+                "rate_limited": self.rate_limited, "image_path": self.image_path, "error": self.error}
+
+
+class _SnapshotGroup:
+    """하나의 generateSnapshot 호출(leader)을 함께 쓰는 같은 카메라의 작업 묶음"""
+
+    def __init__(self, leader):
+        self.leader = leader
+        self.followers = []
+        leader._group = self
+
+
+def _as_list(save_data):
+    return save_data if isinstance(save_data, list) else [save_data]
+
+
+# ------------------------------------------------------------------
+# Meraki 스냅샷 스케줄러: 이벤트 루프 1개 + 연결 풀 HTTP 클라이언트 + 타이머 휠
+# ------------------------------------------------------------------
+class SnapshotScheduler:
+    """
+    submit()은 MQTT 콜백 등 어느 스레드에서든 호출할 수 있고 SnapshotJob을 바로 돌려준다.
+    작업 등록(jobs, 타이머 휠)은 이벤트 루프 스레드에서만 하므로 submit()은 작업을 루프에 넘기기만 한다.
+    카메라 여러 대의 작업을 하나의 이벤트 루프에서 처리한다 (serial을 주지 않으면 생성 시 serial 사용).
+    snapshot_delay초 뒤 generateSnapshot을 요청하고, 발급된 URL을 download_delay초 뒤 내려받는다.
+    실패하면 sleep 대신 타이머 휠에 재시도를 예약한다.
+    저장이 끝나면 on_saved(save_data, image_path)를 호출한다 (Webex notifier 등).
+    base_url을 바꾸면 로컬 대체 서버(fake_meraki.py)로 동작을 확인할 수 있다.
+    journal(SnapshotJournal)을 주면 작업 상태를 SQLite에 기록하고, start() 시 끝나지 않은 작업을
+    남은 대기 시간(이미 지났으면 바로)으로 다시 예약한다.
+    generateSnapshot 호출은 limiter(조직/장치 토큰 버킷)가 허용하는 시각까지 기다렸다 보내고,
+    429면 Retry-After만큼 조직 전체 요청을 멈춘다. 429는 시도 횟수에 넣지 않지만 rate_limit_attempts번을
+    넘으면 작업을 실패로 끝내 묶음(coalescing group)을 계속 붙잡고 있지 않게 한다.
+    감지 시각이 진행 중인 요청(리더)과 coalesce_window초 이내인 작업은 API를 다시 부르지 않고
+    리더의 스냅샷을 함께 사용한다 (이미지 1장 + 모든 감지를 담은 JSON, on_saved 1회).
+    """
+
+    def __init__(self, api_key, serial, image_folder, json_folder, base_url=MERAKI_API_URL,
+                 snapshot_delay=60.0, download_delay=10.0, request_attempts=5, request_retry_delay=3.0,
+                 download_attempts=5, download_retry_delay=2.0, max_connections=16, timeout=10.0,
+                 on_saved=None, tick=0.5, keep_finished=1000, journal=None, limiter=None,
+                 coalesce_window=0.0, rate_limit_attempts=20):
+        self.api_key = api_key
+        self.serial = serial  # submit()에 serial을 주지 않았을 때의 카메라
+        self.image_folder = image_folder
+        self.json_folder = json_folder
+        self.base_url = base_url.rstrip("/")
+        self.snapshot_delay = snapshot_delay
+        self.download_delay = download_delay
+        self.request_attempts = request_attempts
+        self.request_retry_delay = request_retry_delay
+        self.download_attempts = download_attempts
+        self.download_retry_delay = download_retry_delay
+        self.rate_limit_attempts = rate_limit_attempts
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.on_saved = on_saved
+        self.keep_finished = keep_finished
+        self.journal = journal
+        self.limiter = limiter or MerakiRateLimiter()
+        self.coalesce_window = coalesce_window
+        self._groups = {}  # serial -> 새 작업이 합류할 수 있는 현재 묶음
+        self._journal_flush_pending = False
+        self.recovered = 0
+        os.makedirs(image_folder, exist_ok=True)
+        os.makedirs(json_folder, exist_ok=True)
+
+        self.wheel = TimerWheel(tick=tick)
+        self.jobs = {}
+        self._finished = deque()  # 완료된 job_id (keep_finished개까지만 조회용으로 보관)
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._session = None
+        self._closed = None
+        self._ready = threading.Event()
+        self._thread = None
+        self.counts = {status: 0 for status in SnapshotJob.FINISHED}
+
+    # ---- 수명 주기 ----
+    def start(self):
+        self._thread = threading.Thread(target=self._run_loop, name="snapshot-scheduler", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self.journal is not None:
+            self._recover()
+        return self
+
+    def _recover(self):
+        """저널에서 끝나지 않은 작업을 읽어 다시 예약 (URL이 발급된 작업은 다운로드부터)"""
+        now = time.time()
+        for row in self.journal.pending():
+            job = SnapshotJob(row["job_id"], row["timestamp"], row["save_data"], row["serial"])
+            job.request_attempts = row["request_attempts"]
+            job.download_attempts = row["download_attempts"]
+            job.image_url = row["image_url"]
+            if job.image_url:
+                job.status, step = SnapshotJob.WAITING, self._download
+            else:
+                step = self._request
+            self._loop.call_soon_threadsafe(self._register, job, max(0.0, row["due_at"] - now), step)
+            self.recovered += 1
+        if self.recovered:
+            print(f"[Snapshot] recovered {self.recovered} pending jobs from {self.journal.path}")
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        self._closed = asyncio.Event()
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        async with aiohttp.ClientSession(connector=connector,
+                                         timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            self._session = session
+            wheel_task = asyncio.create_task(self.wheel.run())
+            self._ready.set()
+            await self._closed.wait()
+            wheel_task.cancel()
+            tasks = [job._task for job in self.jobs.values() if job._task is not None and not job._task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(wheel_task, *tasks, return_exceptions=True)
+            self._flush_journal()
+
+    def stop(self):
+        """대기/진행 중인 작업을 모두 취소하고 이벤트 루프 종료"""
+        if self._loop is None or self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._closed.set)
+        self._thread.join()
+        self._thread = None
+
+    # ---- 외부 API (스레드 안전) ----
+    def submit(self, timestamp, save_data, delay=None, serial=None):
+        delay = self.snapshot_delay if delay is None else delay
+        serial = serial or self.serial
+        # job_id는 재시작 후에도 겹치지 않도록 저널이 발급 (저널 기록/커밋은 이벤트 루프에서 다른 변경과 함께)
+        job_id = self.journal.next_id() if self.journal is not None else next(self._ids)
+        job = SnapshotJob(job_id, timestamp, save_data, serial)
+        self._loop.call_soon_threadsafe(self._register, job, delay, self._request, True)
+        return job
+
+    def cancel(self, job_id):
+        """
+        작업 취소 요청. 이미 끝난 작업이면 False.
+        루프가 아직 등록하지 않은 방금 submit한 작업도 요청 순서대로 처리되므로 취소된다
+        (없는 job_id는 루프에서 무시됨).
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and job.finished:
+            return False
+        self._loop.call_soon_threadsafe(self._cancel_id, job_id)
+        return True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        active = {}
+        for job in list(self.jobs.values()):
+            if not job.finished:
+                active[job.status] = active.get(job.status, 0) + 1
+        return {"active": active, "timers": self.wheel.pending, "recovered": self.recovered, **self.counts,
+                "limiter": self.limiter.stats()}
+
+    # ---- 이벤트 루프 내부 ----
+    def _register(self, job, delay, step, new=False):
+        self.jobs[job.job_id] = job
+        if new and self.journal is not None:
+            self.journal.add(job, time.time() + delay)  # 커밋은 _persist가 예약하는 루프 한 바퀴 끝의 commit()
+        self._enqueue(job, delay, step)
+
+    def _enqueue(self, job, delay, step):
+        """새(또는 복구된) 작업: 진행 중인 같은 카메라 요청에 합류하거나, 새 묶음의 리더로 예약"""
+        group = self._groups.get(job.serial)
+        if (self.coalesce_window and step == self._request and group is not None
+                and abs(job.timestamp - group.leader.timestamp) <= self.coalesce_window * 1000):
+            job.status = SnapshotJob.COALESCED
+            job.due_at = group.leader.due_at
+            job._group = group
+            group.followers.append(job)
+            self.limiter.record_saved()
+            self._persist(job)
+            return
+        self._groups[job.serial] = _SnapshotGroup(job)
+        self._schedule(job, delay, step)
+
+    def _close_group(self, group):
+        """묶음이 더 이상 새 작업을 받지 않도록 함"""
+        if self._groups.get(group.leader.serial) is group:
+            del self._groups[group.leader.serial]
+
+    def _promote(self, group):
+        """리더가 취소되면 첫 번째 합류 작업이 이어받음 (발급된 URL이 있으면 다운로드부터)"""
+        accepting = self._groups.get(group.leader.serial) is group
+        self._close_group(group)
+        if not group.followers:
+            return
+        old, leader = group.leader, group.followers.pop(0)
+        new_group = _SnapshotGroup(leader)
+        new_group.followers = group.followers
+        for follower in new_group.followers:
+            follower._group = new_group
+        if accepting:
+            self._groups[leader.serial] = new_group
+        delay = max(0.0, (old.due_at or 0.0) - time.time())
+        if old.image_url:
+            leader.image_url, leader.status = old.image_url, SnapshotJob.WAITING
+            self._schedule(leader, delay, self._download)
+        else:
+            leader.status = SnapshotJob.SCHEDULED
+            self.limiter.record_saved(-1)  # 이어받은 작업은 직접 요청
+            self._schedule(leader, delay, self._request)
+
+    def _schedule(self, job, delay, step):
+        if not job.finished:
+            job.due_at = time.time() + delay
+            job._timer = self.wheel.schedule(delay, self._launch, job, step)
+            self._persist(job)
+
+    def _persist(self, job):
+        if self.journal is None:
+            return
+        self.journal.update(job, job.due_at)
+        # 같은 루프 반복에서 생긴 변경은 한 번에 커밋
+        if not self._journal_flush_pending:
+            self._journal_flush_pending = True
+            asyncio.get_running_loop().call_soon(self._flush_journal)
+
+    def _flush_journal(self):
+        self._journal_flush_pending = False
+        if self.journal is not None:
+            self.journal.commit()
+
+    def _launch(self, job, step):
+        job._timer = None
+        if not job.finished:
+            job._task = asyncio.get_running_loop().create_task(step(job))
+
+    def _cancel_id(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            self._cancel(job)
+
+    def _cancel(self, job):
+        if job.finished:
+            return
+        group = job._group
+        if group is not None and group.leader is not job:
+            group.followers.remove(job)
+            job._group = None
+        self.wheel.cancel(job._timer)
+        if job._task is not None and not job._task.done():
+            job._task.cancel()
+        self._finish(job, SnapshotJob.CANCELLED)
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job._timer = job._task = None
+        self._persist(job)
+        self.counts[status] += 1
+        self._finished.append(job.job_id)
+        while len(self._finished) > self.keep_finished:
+            self.jobs.pop(self._finished.popleft(), None)
+        group = job._group
+        if group is None or group.leader is not job:
+            return
+        job._group = None
+        if status == SnapshotJob.CANCELLED:
+            self._promote(group)
+            return
+        # 리더의 결과(이미지 경로 또는 실패)를 합류한 작업에 그대로 반영
+        self._close_group(group)
+        for follower in group.followers:
+            follower._group = None
+            follower.image_path = job.image_path
+            self._finish(follower, status, error)
+
+    def _retry(self, job, attempts, max_attempts, delay, step, error):
+        if attempts >= max_attempts:
+            print(f"❌ [snapshot {job.job_id}] 재시도 초과: {error}")
+            self._finish(job, SnapshotJob.FAILED, error)
+            return
+        print(f"❗ [snapshot {job.job_id}] {error} → {delay}초 후 재시도 ({attempts}/{max_attempts})")
+        job.error = error
+        self._schedule(job, delay, step)
+
+    async def _wait_for_limiter(self, serial):
+        wait = self.limiter.reserve(serial)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.limiter.blocked_for()  # 기다리는 동안 429로 막혔으면 추가 대기
+
+    async def _request(self, job):
+        await self._wait_for_limiter(job.serial)
+        job.status = SnapshotJob.REQUESTING
+        job.request_attempts += 1
+        iso_timestamp = datetime.fromtimestamp(job.timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        url = f"{self.base_url}/devices/{job.serial}/camera/generateSnapshot"
+        headers = {"X-Cisco-Meraki-API-Key": self.api_key, "Content-Type": "application/json"}
+        error = None
+        retry_delay = self.request_retry_delay
+        try:
+            async with self._session.post(url, headers=headers,
+                                          json={"timestamp": iso_timestamp, "fullframe": False}) as res:
+                if res.status == 429:
+                    # 요청 제한: 조직 전체를 Retry-After 동안 멈추고, 시도 횟수에는 포함하지 않음
+                    # (대신 429 재예약 횟수는 rate_limit_attempts로 따로 제한)
+                    retry_after = parse_retry_after(res.headers.get("Retry-After"), self.request_retry_delay)
+                    self.limiter.retry_after(retry_after)
+                    job.request_attempts -= 1
+                    job.rate_limited += 1
+                    job.status = SnapshotJob.SCHEDULED
+                    self._retry(job, job.rate_limited, self.rate_limit_attempts, retry_after, self._request,
+                                "generateSnapshot status 429")
+                    return
+                if res.status in (200, 202):
+                    image_url = (await res.json(content_type=None) or {}).get("url")
+                    if image_url:
+                        job.image_url = image_url
+                        job.status = SnapshotJob.WAITING
+                        self._schedule(job, self.download_delay, self._download)
+                        return
+                    error = "snapshot response has no url"
+                else:
+                    error = f"generateSnapshot status {res.status}"
+                    retry_delay = parse_retry_after(res.headers.get("Retry-After"), retry_delay)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error = f"generateSnapshot error: {e!r}"
+        job.status = SnapshotJob.SCHEDULED
+        self._retry(job, job.request_attempts, self.request_attempts, retry_delay, self._request, error)
+
+    async def _download(self, job):
+        job.status = SnapshotJob.DOWNLOADING
+        job.download_attempts += 1
+        error = None
+        retry_delay = self.download_retry_delay
+        try:
+            async with self._session.get(job.image_url) as res:
+                # 이미지가 아직 준비되지 않았으면 이미지가 아닌 응답(202/404 등)이 옴
+                if res.status in (200, 202) and "image" in res.headers.get("Content-Type", ""):
+                    content = await res.read()
+                    # 저장 시작 후 들어온 감지는 새 요청으로 (JSON/알림에 빠지지 않도록 묶음을 닫음)
+                    group = job._group
+                    if group is not None:
+                        self._close_group(group)
+                    save_data = _as_list(job.save_data)
+                    if group is not None:
+                        for follower in group.followers:
+                            save_data = save_data + _as_list(follower.save_data)
+                    image_path = await asyncio.get_running_loop().run_in_executor(
+                        None, self._save, job, content, save_data)
+                    job.image_path = image_path
+                    self._finish(job, SnapshotJob.DONE)
+                    print(f"[✅ 저장 완료] 이미지: {image_path}")
+                    if self.on_saved is not None:
+                        self.on_saved(save_data, image_path)
+                    return
+                error = f"snapshot download status {res.status}"
+                retry_delay = parse_retry_after(res.headers.get("Retry-After"), retry_delay)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            error = f"snapshot download error: {e!r}"
+        job.status = SnapshotJob.WAITING
+        self._retry(job, job.download_attempts, self.download_attempts, retry_delay, self._download, error)
+
+    def _save(self, job, content, save_data):
+        # 여러 카메라가 같은 밀리초에 감지할 수 있으므로 파일명에 serial 포함
+        image_path = os.path.join(self.image_folder, f"snapshot_{job.serial}_{job.timestamp}.jpg")
+        json_path = os.path.join(self.json_folder, f"snapshot_{job.serial}_{job.timestamp}.json")
+        with open(image_path, "wb") as f:
+            f.write(content)
+        with open(json_path, "w") as f:
+            json.dump(save_data, f, indent=2)
+        return image_path
@@ -3,6 +3,7 @@ import cv2
 import torch
 import json
 import os
+import sys
 import time
 import threading
 from glob import glob
@@ -10,12 +11,16 @@ from ultralytics import YOLO
 from datetime import datetime
 import tkinter as tk
 from PIL import Image, ImageTk
-import subprocess
 import queue
-import math
+import numpy as np
 
 # 기본 경로 및 모델 로드
 base_dir = os.path.dirname(os.path.abspath(__file__))
+# 위경도 변환과 WebexNotifier는 웹 서버와 함께 쓰는 저장소 루트의 cisco_common 패키지에 있음
+sys.path.append(os.path.join(base_dir, "..", "..", ".."))
+from cisco_common.geo import CameraProjector
+from cisco_common.webex_notifier import WebexNotifier
+
 model_path = os.path.join(base_dir, "../../models/model.pt")
 model = YOLO(model_path)
 
@@ -33,6 +38,14 @@ image_folder = os.path.join(output_folder, "images")
 os.makedirs(json_folder, exist_ok=True)
 os.makedirs(image_folder, exist_ok=True)
 
+# Webex 알림은 프로세스 내 notifier 워커가 전송 (위반마다 서브프로세스를 띄우지 않음)
+webex_creds_path = os.path.join(base_dir, "../../assets/webex_api_key.json")
+try:
+    notifier = WebexNotifier(creds_path=webex_creds_path)
+except (FileNotFoundError, ValueError) as e:
+    print(f"[Webex] notifier disabled: {e}")
+    notifier = None
+
 # Tkinter 및 디스플레이 큐 (메인 스레드에서의 GUI 업데이트를 위해)
 gui_queue = queue.Queue()
 display_queue = queue.Queue()
@@ -46,6 +59,10 @@ CAMERA_LNG = -122.4194
 CAMERA_HEADING = 90
 CAMERA_FOV = 60
 FIXED_DISTANCE = 10.0
+# 지면 보정점 [[u, v, lat, lng], ...] (u, v는 0~1 비율 화면 좌표, 4개 이상). None이면 방위각/화각으로 추정
+CAMERA_CALIBRATION = None
+projector = CameraProjector(CAMERA_LAT, CAMERA_LNG, CAMERA_HEADING, CAMERA_FOV, FIXED_DISTANCE,
+                            calibration=CAMERA_CALIBRATION)
 
 
 def process_queue(root):
@@ -116,30 +133,21 @@ def save_if_overlap(results, frame):
 
     height, width, _ = im.shape
 
-    # 키보드와 블록이 겹치는지 체크하고, 겹치면 좌표 계산 후 detection 데이터 생성
-    for kb_cls, kb_cls_name, kb_conf, kb_box in kb_boxes:
-        for block_box in block_boxes:
-            if boxes_overlap(kb_box, block_box):
-                x1, y1, x2, y2 = kb_box
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                relative_offset = (center_x - width / 2) / (width / 2)
-                angle_offset = relative_offset * (CAMERA_FOV / 2)
-                absolute_angle = CAMERA_HEADING + angle_offset
-                dx = FIXED_DISTANCE * math.sin(math.radians(absolute_angle))
-                dy = FIXED_DISTANCE * math.cos(math.radians(absolute_angle))
-                delta_lat = dy / 111320
-                delta_lng = dx / (111320 * math.cos(math.radians(CAMERA_LAT)))
-                lat = CAMERA_LAT + delta_lat
-                lng = CAMERA_LNG + delta_lng
-                detection = {
-                    "object_id": 1008,
-                    "lat": lat,
-                    "lng": lng,
-                    "timestamp": datetime.now().isoformat()
-                }
-                save_data.append(detection)
-                break
+    # 블록과 겹치는 키보드 박스를 먼저 모은 뒤, 위경도는 한 번에 변환해 detection 데이터 생성
+    overlap_boxes = [
+        kb_box for _, _, _, kb_box in kb_boxes
+        if any(boxes_overlap(kb_box, block_box) for block_box in block_boxes)
+    ]
+    if overlap_boxes:
+        lats, lngs = projector.project_boxes(np.array(overlap_boxes), width, height)
+        for lat, lng in zip(lats, lngs):
+            detection = {
+                "object_id": 1008,
+                "lat": float(lat),
+                "lng": float(lng),
+                "timestamp": datetime.now().isoformat()
+            }
+            save_data.append(detection)
 
     # 모든 박스에 대해 테두리 및 레이블 표시
     for r in results:
@@ -165,9 +173,9 @@ def save_if_overlap(results, frame):
         print("Saved JSON data:")
         print(json.dumps(save_data, indent=2))
         show_image_with_tkinter(im, f"Saved Detection {timestamp_str}", 3000)
-        detection_upload_path = os.path.join(base_dir, "../cisco_apis/detection_upload.py")
-        cmd = ["python3", detection_upload_path, image_path, json_path]
-        subprocess.Popen(cmd)
+        # 큐에 넣고 바로 반환 (전송/재시도는 notifier 워커가 처리)
+        if notifier is not None:
+            notifier.notify(save_data, image_path)
 
 
 def detect_objects_in_video(video_path):
@@ -236,3 +244,5 @@ if __name__ == "__main__":
 
     # Tkinter 이벤트 루프 실행 (메인 스레드)
     root.mainloop()
+    if notifier is not None:
+        notifier.close()  # 대기 중인 알림을 마저 보낸 뒤 종료
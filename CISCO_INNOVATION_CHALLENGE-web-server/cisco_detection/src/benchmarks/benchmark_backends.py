@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+추론 백엔드 비교: PyTorch 기준 박스 일치도(parity) + 지연 시간/FPS 표
+
+사용법:
+    python3 benchmark_backends.py [--backends pytorch onnx openvino int8] [--frames 100] [--batch 1]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "..", "virtual_detection"))
+
+from inference_backend import load_model, BACKENDS
+from box_utils import extract_boxes, iou_matrix
+
+
+def read_frames(video_path, num_frames):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_backend(model, frames, batch):
+    # 첫 호출(그래프 컴파일/메모리 할당)은 측정에서 제외
+    model(frames[:batch], verbose=False)
+    latencies = []
+    outputs = []
+    for i in range(0, len(frames), batch):
+        chunk = frames[i:i + batch]
+        start = time.perf_counter()
+        results = model(chunk, verbose=False)
+        latencies.append((time.perf_counter() - start) / len(chunk) * 1000)
+        outputs.extend(extract_boxes([r]) for r in results)
+    return np.array(latencies), outputs
+
+
+def parity(baseline, candidate, iou_threshold=0.5):
+    """기준 박스 중 같은 클래스·IoU>=threshold 박스가 있는 비율과 매칭된 박스의 평균 IoU"""
+    matched, total, ious = 0, 0, []
+    for (b_cls, _, b_xyxy), (c_cls, _, c_xyxy) in zip(baseline, candidate):
+        total += len(b_cls)
+        if not len(b_cls) or not len(c_cls):
+            continue
+        iou = iou_matrix(b_xyxy, c_xyxy)
+        iou[b_cls[:, None] != c_cls[None, :]] = 0.0
+        best = iou.max(axis=1)
+        matched += int((best >= iou_threshold).sum())
+        ious.extend(best[best >= iou_threshold].tolist())
+    recall = matched / total if total else 1.0
+    return recall, float(np.mean(ious)) if ious else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(base_dir, "../../models/model.pt"))
+    parser.add_argument("--video", default=os.path.join(base_dir, "../test_assets/example_video.mp4"))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.video}")
+
+    backends = ["pytorch"] + [b for b in args.backends if b != "pytorch"]
+    baseline = None
+    rows = []
+    for backend in backends:
+        model = load_model(args.model, backend)
+        latencies, outputs = run_backend(model, frames, args.batch)
+        if baseline is None:
+            baseline = outputs
+        recall, mean_iou = parity(baseline, outputs)
+        rows.append((backend, np.percentile(latencies, 50), np.percentile(latencies, 95),
+                     1000 / latencies.mean(), recall, mean_iou))
+
+    print(f"\n{len(frames)} frames, batch={args.batch}")
+    print(f"{'backend':>10} {'p50 ms':>8} {'p95 ms':>8} {'FPS':>7} {'box match':>10} {'mean IoU':>9}")
+    print("-" * 58)
+    for backend, p50, p95, fps, recall, mean_iou in rows:
+        print(f"{backend:>10} {p50:>8.1f} {p95:>8.1f} {fps:>7.1f} {recall:>9.1%} {mean_iou:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
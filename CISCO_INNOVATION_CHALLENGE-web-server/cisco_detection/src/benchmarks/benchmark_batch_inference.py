@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+배치 추론 엔진 벤치마크: 스트림 수(N)에 따른 전체 처리 FPS 측정
+
+사용법:
+    python3 benchmark_batch_inference.py [--video PATH] [--streams 1 2 4 8 16] [--frames 100]
+"""
+import os
+import sys
+import argparse
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "..", "virtual_detection"))
+
+from ultralytics import YOLO
+from batch_inference import BatchInferenceEngine, VideoStream
+
+
+class _LimitedStream(VideoStream):
+    """정해진 프레임 수만 읽고 종료하는 스트림 (영상 길이와 무관하게 비교하기 위함)"""
+
+    def __init__(self, name, video_path, on_result, max_frames):
+        super().__init__(name, video_path, on_result)
+        self.max_frames = max_frames
+
+    def read(self):
+        if self.frame_count >= self.max_frames:
+            self.finished = True
+            return None
+        return super().read()
+
+
+def run_once(model, video_path, num_streams, frames_per_stream, max_batch):
+    engine = BatchInferenceEngine(model, max_batch=max_batch)
+    for i in range(num_streams):
+        engine.add_stream(_LimitedStream(f"stream{i}", video_path,
+                                         lambda frame, results, ts: None, frames_per_stream))
+    frames, elapsed = engine.run()
+    return frames, elapsed, engine.ticks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(base_dir, "../../models/model.pt"))
+    parser.add_argument("--video", default=os.path.join(base_dir, "../test_assets/example_video.mp4"))
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--frames", type=int, default=100, help="스트림당 처리할 프레임 수")
+    parser.add_argument("--max-batch", type=int, default=16)
+    args = parser.parse_args()
+
+    model = YOLO(args.model)
+    # 첫 호출의 초기화 비용이 결과에 섞이지 않도록 워밍업
+    run_once(model, args.video, 1, 5, 1)
+
+    print(f"{'streams':>8} {'frames':>8} {'ticks':>6} {'seconds':>9} {'agg FPS':>9} {'FPS/stream':>11}")
+    print("-" * 56)
+    for n in args.streams:
+        frames, elapsed, ticks = run_once(model, args.video, n, args.frames, args.max_batch)
+        fps = frames / elapsed if elapsed > 0 else 0.0
+        print(f"{n:>8} {frames:>8} {ticks:>6} {elapsed:>9.2f} {fps:>9.1f} {fps / n:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+save_if_overlap 후처리 마이크로벤치마크: 프레임당 수백 개 박스 기준
+    - 기존 방식: 박스마다 .item() 호출 + K×B 이중 루프 + 박스별 위경도 계산
+    - 벡터화 방식: extract_boxes → overlap_matrix → CameraProjector 격자 조회
+
+사용법:
+    python3 benchmark_overlap.py [--boxes 100 300 600] [--repeat 50]
+"""
+import os
+import sys
+import math
+import time
+import argparse
+import numpy as np
+import torch
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "..", "virtual_detection"))
+sys.path.append(os.path.join(base_dir, "..", "..", "..", ".."))  # 저장소 루트 (cisco_common)
+
+from ultralytics.engine.results import Boxes
+from box_utils import boxes_overlap, extract_boxes, overlap_matrix, KB_CLASS, BLOCK_CLASS
+from cisco_common.geo import CameraProjector
+
+WIDTH, HEIGHT = 1920, 1080
+BASE_LAT, BASE_LNG = 37.7749, -122.4194
+HEADING, FOV, DISTANCE = 90, 60, 10.0
+PROJECTOR = CameraProjector(BASE_LAT, BASE_LNG, HEADING, FOV, DISTANCE)  # 카메라당 한 번 생성
+
+
+class _FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_results(num_boxes, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, [WIDTH - 200, HEIGHT - 200], size=(num_boxes, 2))
+    wh = rng.uniform(20, 200, size=(num_boxes, 2))
+    conf = rng.uniform(0.25, 1.0, size=(num_boxes, 1))
+    cls = rng.integers(0, 2, size=(num_boxes, 1))
+    data = np.hstack([xy, xy + wh, conf, cls]).astype(np.float32)
+    return [_FakeResult(Boxes(torch.from_numpy(data), (HEIGHT, WIDTH)))]
+
+
+def loop_version(results):
+    kb_boxes, block_boxes, out = [], [], []
+    for r in results:
+        for box in r.boxes:
+            cls = int(box.cls.item())
+            x1, y1, x2, y2 = [int(x.item()) for x in box.xyxy[0]]
+            if cls == KB_CLASS:
+                kb_boxes.append((x1, y1, x2, y2))
+            elif cls == BLOCK_CLASS:
+                block_boxes.append((x1, y1, x2, y2))
+    for kb_box in kb_boxes:
+        for block_box in block_boxes:
+            if boxes_overlap(kb_box, block_box):
+                center_x = (kb_box[0] + kb_box[2]) / 2
+                relative_offset = (center_x - WIDTH / 2) / (WIDTH / 2)
+                absolute_angle = HEADING + relative_offset * (FOV / 2)
+                dx = DISTANCE * math.sin(math.radians(absolute_angle))
+                dy = DISTANCE * math.cos(math.radians(absolute_angle))
+                out.append((BASE_LAT + dy / 111320,
+                            BASE_LNG + dx / (111320 * math.cos(math.radians(BASE_LAT)))))
+                break
+    return out
+
+
+def vectorized_version(results):
+    cls, conf, xyxy = extract_boxes(results)
+    kb_boxes = xyxy[cls == KB_CLASS]
+    block_boxes = xyxy[cls == BLOCK_CLASS]
+    if not (len(kb_boxes) and len(block_boxes)):
+        return []
+    violating = kb_boxes[overlap_matrix(kb_boxes, block_boxes).any(axis=1)]
+    lats, lngs = PROJECTOR.project_boxes(violating, WIDTH, HEIGHT)
+    return list(zip(lats.tolist(), lngs.tolist()))
+
+
+def timeit(fn, results, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(results)
+    return (time.perf_counter() - start) / repeat * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", type=int, nargs="+", default=[100, 300, 600])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>6} {'violations':>10} {'loop ms':>9} {'vector ms':>10} {'speedup':>8}")
+    print("-" * 48)
+    for n in args.boxes:
+        results = make_results(n)
+        loop_ms, loop_out = timeit(loop_version, results, args.repeat)
+        vec_ms, vec_out = timeit(vectorized_version, results, args.repeat)
+        assert np.allclose(loop_out, vec_out), "vectorized result differs from loop result"
+        print(f"{n:>6} {len(vec_out):>10} {loop_ms:>9.3f} {vec_ms:>10.3f} {loop_ms / vec_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+재생(replay) 벤치마크: 영상 파일/폴더를 감지 파이프라인에 화면 없이 흘려 처리량 변화를 측정
+
+MQTT / DB(Camera) / Webex 는 스텁으로 바꾸고, 겹침 검사는 같은 입력이면 같은 이벤트가 나오도록
+기본적으로 동기 실행한다 (--async-postprocess 로 실제 워커 풀 사용).
+결과(FPS, 프레임별 지연 분포, CPU%, 최대 RSS, 발생 이벤트 수, 클립 버퍼 크기)는 JSON으로 저장하고
+--baseline 을 주면 저장된 기준 결과와 비교한다.
+
+사용법:
+    python3 benchmark_replay.py [--input PATH_OR_DIR] [--output result.json]
+                                [--baseline baseline.json] [--tolerance 0.05]
+"""
+import os
+import sys
+import json
+import time
+import queue
+import platform
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from glob import glob
+from datetime import datetime
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "..", "virtual_detection"))
+
+import metrics
+import virtual_detection
+from artifact_writer import ArtifactWriter
+from clip_recorder import ClipRecorder
+from camera_registry import CameraRegistry
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+# ------------------------------------------------------------------
+# 외부 연동 스텁: 호출 내용만 기록
+# ------------------------------------------------------------------
+class StubMqttClient:
+    def __init__(self):
+        self.published = []
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload):
+        with self._lock:
+            self.published.append((topic, payload))
+
+
+class StubNotifier:
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.dropped = 0
+        self.notified = 0
+        self._lock = threading.Lock()
+
+    def notify(self, detections, image_path):
+        with self._lock:
+            self.notified += 1
+        return True
+
+    def stats(self):
+        return {"notified": self.notified}
+
+
+class InlineExecutor:
+    """CoalescingExecutor와 같은 인터페이스로 호출 스레드에서 바로 실행 (합치기/버리기 없음)"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.executed = 0
+
+    def submit(self, key, *args):
+        start = time.perf_counter()
+        self.fn(*args)
+        metrics.observe("postprocess", key, time.perf_counter() - start)
+        self.executed += 1
+        return True
+
+    def stats(self):
+        return {"executed": self.executed, "pending": 0}
+
+
+def collect_inputs(path):
+    if os.path.isdir(path):
+        return sorted(p for p in glob(os.path.join(path, "*")) if p.lower().endswith(VIDEO_EXTENSIONS))
+    return [path]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def peak_rss_mb():
+    # Linux는 KB, macOS는 byte 단위
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=base_dir,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_replay(video_paths, backend, infer_fps, async_postprocess):
+    runtime = virtual_detection.runtime
+    runtime.backend = backend
+    virtual_detection.POPUP_ENABLED = False
+    metrics.REGISTRY.window = 1_000_000  # 분포 계산을 위해 모든 표본 보관
+
+    mqtt_stub = StubMqttClient()
+    notifier_stub = StubNotifier()
+    output_dir = tempfile.mkdtemp(prefix="replay_")
+    writer = ArtifactWriter(os.path.join(output_dir, "images"), os.path.join(output_dir, "json"))
+    runtime.provide("mqtt_client", mqtt_stub)
+    runtime.provide("notifier", notifier_stub)
+    runtime.provide("artifact_writer", writer)
+    clip_recorder = None
+    if virtual_detection.CLIP_ENABLED:
+        clip_recorder = ClipRecorder(os.path.join(output_dir, "clips"),
+                                     pre_seconds=virtual_detection.CLIP_PRE_SECONDS,
+                                     post_seconds=virtual_detection.CLIP_POST_SECONDS,
+                                     fps=virtual_detection.CLIP_FPS, width=virtual_detection.CLIP_WIDTH,
+                                     jpeg_quality=virtual_detection.CLIP_JPEG_QUALITY,
+                                     max_bytes_per_stream=virtual_detection.CLIP_MAX_BYTES_PER_STREAM)
+    runtime.provide("clip_recorder", clip_recorder)
+    runtime.provide("camera_registry", CameraRegistry(lambda serial: None,
+                                                      defaults=virtual_detection.default_camera_settings()))
+    if not async_postprocess:
+        runtime.provide("overlap_executor", InlineExecutor(virtual_detection.save_if_overlap))
+
+    runtime.prepare("model")  # 모델 로드/워밍업은 측정 구간에서 제외
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    frames, elapsed = virtual_detection.run_streams(video_paths, infer_fps=infer_fps,
+                                                    display=lambda name, annotated: annotated.release(),
+                                                    should_stop=lambda: False)
+    # 겹침 검사 풀 / writer / 클립 기록기는 run_streams가 끝날 때 모두 비우고 닫음
+    clip_stats = None
+    if clip_recorder is not None:
+        clip_stats = clip_recorder.stats()
+        clip_stats["buffer_bytes_per_stream"] = {name: stream["bytes"]
+                                                 for name, stream in clip_stats.pop("streams").items()}
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_seconds = ((usage_after.ru_utime - usage_before.ru_utime)
+                   + (usage_after.ru_stime - usage_before.ru_stime))
+
+    latencies = sorted(s * 1000 for s in metrics.REGISTRY.samples("end_to_end"))
+    snapshot = metrics.REGISTRY.snapshot()
+    return {
+        "frames": frames,
+        "elapsed_s": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "stages": snapshot["stages"],
+        "cpu_percent": cpu_seconds / elapsed * 100 if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "events": {
+            "mqtt_messages": len(mqtt_stub.published),
+            "violations": sum(len(json.loads(payload)["outputs"]) for _, payload in mqtt_stub.published),
+            "webex_notifications": notifier_stub.notified,
+            "artifacts_written": writer.written,
+        },
+        "clips": clip_stats,
+    }
+
+
+# ------------------------------------------------------------------
+# 기준 결과와 비교: 처리량/지연/메모리 변화율과 이벤트 수 일치 여부
+# ------------------------------------------------------------------
+def compare(result, baseline, tolerance):
+    rows = [
+        ("fps", result["fps"], baseline["fps"], True),
+        ("latency p50 ms", result["latency_ms"]["p50"], baseline["latency_ms"]["p50"], False),
+        ("latency p95 ms", result["latency_ms"]["p95"], baseline["latency_ms"]["p95"], False),
+        ("cpu %", result["cpu_percent"], baseline["cpu_percent"], False),
+        ("peak rss MB", result["peak_rss_mb"], baseline["peak_rss_mb"], False),
+    ]
+    regressions = []
+    print(f"{'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    print("-" * 48)
+    for name, current, base, higher_is_better in rows:
+        change = (current - base) / base if base else 0.0
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<16} {base:>10.1f} {current:>10.1f} {change * 100:>+7.1f}%{flag}")
+        if name == "fps" and regressed:
+            regressions.append(name)
+    for name, count in result["events"].items():
+        base = baseline["events"].get(name)
+        if base != count:
+            print(f"{name:<16} {base!s:>10} {count:>10}  EVENTS DIFFER")
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=os.path.join(base_dir, "../test_assets/example_video.mp4"),
+                        help="영상 파일 또는 영상 폴더")
+    parser.add_argument("--backend", default=os.environ.get("DETECTION_BACKEND", "pytorch"))
+    parser.add_argument("--infer-fps", type=float, default=virtual_detection.INFER_FPS,
+                        help="스트림별 추론 비율 (0이면 모든 프레임)")
+    parser.add_argument("--async-postprocess", action="store_true",
+                        help="겹침 검사를 실제 워커 풀에서 실행 (이벤트 수가 실행마다 달라질 수 있음)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: benchmarks/results/)")
+    parser.add_argument("--baseline", default=None, help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="허용 FPS 하락 비율")
+    args = parser.parse_args()
+
+    video_paths = collect_inputs(args.input)
+    if not video_paths:
+        raise SystemExit(f"No video files found in {args.input}")
+
+    result = run_replay(video_paths, args.backend, args.infer_fps or None, args.async_postprocess)
+    result["meta"] = {
+        "timestamp": datetime.now().isoformat(),
+        "inputs": [os.path.basename(p) for p in video_paths],
+        "backend": args.backend,
+        "infer_fps": args.infer_fps or None,
+        "async_postprocess": args.async_postprocess,
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+    output = args.output or os.path.join(base_dir, "results",
+                                         f"replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    latency = result["latency_ms"]
+    print(f"\n{result['frames']} frames in {result['elapsed_s']:.2f}s → {result['fps']:.1f} FPS")
+    print(f"latency ms: p50={latency['p50']:.1f} p95={latency['p95']:.1f} p99={latency['p99']:.1f} "
+          f"max={latency['max']:.1f}")
+    print(f"cpu: {result['cpu_percent']:.0f}%  peak rss: {result['peak_rss_mb']:.0f} MB")
+    print(f"events: {result['events']}")
+    print(f"saved: {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+감지 진입점 시작 시간 벤치마크: 콜드 import → 모델 로드(+워밍업) → 첫 실제 프레임 추론
+
+매 실행마다 새 파이썬 프로세스를 띄워 import 캐시 없이 측정하고, 실행별 중앙값을 출력한다.
+워밍업 유무를 함께 측정해 첫 프레임 지연이 워밍업 단계로 옮겨졌는지 확인한다.
+
+사용법:
+    python3 benchmark_startup.py [--video PATH] [--runs 5] [--backend pytorch]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+detection_dir = os.path.join(base_dir, "..", "virtual_detection")
+
+# 자식 프로세스에서 실행되는 측정 코드 (결과는 마지막 줄에 JSON으로 출력)
+_CHILD = r"""
+import sys, json, time
+t0 = time.perf_counter()
+sys.path.insert(0, {detection_dir!r})
+import virtual_detection
+t_import = time.perf_counter()
+heavy = [m for m in ("django", "torch", "ultralytics", "paho", "tkinter") if m in sys.modules]
+
+import cv2
+cap = cv2.VideoCapture({video!r})
+ok, frame = cap.read()
+cap.release()
+if not ok:
+    raise SystemExit("cannot read a frame from {video}")
+
+virtual_detection.WARMUP_RUNS = {warmup_runs}
+runtime = virtual_detection.DetectionRuntime(backend={backend!r})
+model = runtime.model
+t_model = time.perf_counter()
+model([frame], verbose=False)
+t_first = time.perf_counter()
+model([frame], verbose=False)
+t_second = time.perf_counter()
+print(json.dumps({{
+    "import_s": t_import - t0,
+    "model_ready_s": t_model - t_import,
+    "first_infer_s": t_first - t_model,
+    "steady_infer_s": t_second - t_first,
+    "cold_to_first_infer_s": t_first - t0,
+    "heavy_modules_after_import": heavy,
+}}))
+"""
+
+
+def run_child(video, backend, warmup_runs):
+    code = _CHILD.format(detection_dir=detection_dir, video=video, backend=backend, warmup_runs=warmup_runs)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", default=os.path.join(base_dir, "../test_assets/example_video.mp4"))
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    keys = ("import_s", "model_ready_s", "first_infer_s", "steady_infer_s", "cold_to_first_infer_s")
+    print(f"{'warmup':>7} " + " ".join(f"{k:>22}" for k in keys))
+    print("-" * (8 + 23 * len(keys)))
+    for warmup_runs in (0, 1):
+        samples = [run_child(args.video, args.backend, warmup_runs) for _ in range(args.runs)]
+        medians = {k: statistics.median(s[k] for s in samples) for k in keys}
+        print(f"{warmup_runs:>7} " + " ".join(f"{medians[k] * 1000:>19.1f} ms" for k in keys))
+        heavy = samples[0]["heavy_modules_after_import"]
+        if heavy:
+            print(f"        warning: heavy modules loaded at import time: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "virtual_detection"))
+import artifact_writer
+from artifact_writer import ArtifactWriter
+
+
+def test_on_done_runs_when_encoding_fails(tmp_path, monkeypatch):
+    """JPEG 인코딩이 실패해도 on_done(None, records)가 호출되어 알림이 사라지지 않음"""
+    monkeypatch.setattr(artifact_writer.cv2, "imencode", lambda *args, **kwargs: (False, None))
+    writer = ArtifactWriter(str(tmp_path / "images"), str(tmp_path / "json"), workers=1)
+    records = [{"camera": "cam0", "object_id": 1008}]
+    calls = []
+    done = threading.Event()
+
+    def on_done(image_path, done_records):
+        calls.append((image_path, done_records))
+        done.set()
+
+    assert writer.submit(np.zeros((8, 8, 3), dtype=np.uint8), records, on_done=on_done)
+    assert done.wait(5)
+    writer.close()
+
+    assert calls == [(None, records)]
+    stats = writer.stats()
+    assert stats["errors"] == 1 and stats["written"] == 0
+    assert os.listdir(tmp_path / "images") == []
+
+
+def test_callback_failure_is_not_a_write_error(tmp_path):
+    """on_done에서 난 예외는 쓰기 오류(errors)로 세지 않음"""
+    writer = ArtifactWriter(str(tmp_path / "images"), str(tmp_path / "json"), workers=1)
+
+    def on_done(image_path, records):
+        raise RuntimeError("notifier down")
+
+    writer.submit(np.zeros((8, 8, 3), dtype=np.uint8), [{"camera": "cam0"}], on_done=on_done)
+    writer.close()
+
+    stats = writer.stats()
+    assert stats["written"] == 1 and stats["errors"] == 0
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "virtual_detection"))
+from batch_inference import BatchInferenceEngine
+
+
+class ScriptedGate:
+    """should_infer 결과를 미리 정해 둔 모션 게이트"""
+
+    def __init__(self, decisions, last_results=None):
+        self.decisions = list(decisions)
+        self.last_results = last_results
+
+    def should_infer(self, frame, now=None):
+        return self.decisions.pop(0)
+
+
+class FakeStream:
+    def __init__(self, name, motion_gate=None):
+        self.name = name
+        self.motion_gate = motion_gate
+        self.rois = None
+
+
+class FakeModel:
+    """프레임의 첫 픽셀 값을 결과로 돌려주는 모델"""
+
+    def __call__(self, frames, verbose=False):
+        return [f"result-{int(frame[0, 0, 0])}" for frame in frames]
+
+
+def frame(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def test_skipped_frame_reuses_earlier_frame_of_same_stream_in_batch():
+    """같은 배치에서 앞 프레임을 추론했다면 뒤의 건너뛴 프레임은 이전 배치 결과가 아니라 그 결과를 재사용"""
+    gate = ScriptedGate([True, False], last_results="stale")
+    stream = FakeStream("cam0", gate)
+    engine = BatchInferenceEngine(FakeModel())
+
+    results = engine.infer_gated([stream, stream], [frame(1), frame(2)], [0.0, 0.1])
+
+    assert results == ["result-1", "result-1"]
+    assert gate.last_results == "result-1"
+    assert engine.frames_inferred == 1
+
+
+def test_skipped_frame_without_earlier_inference_uses_last_results():
+    gate = ScriptedGate([False, True], last_results="previous")
+    stream = FakeStream("cam0", gate)
+    other = FakeStream("cam1")
+    engine = BatchInferenceEngine(FakeModel())
+
+    results = engine.infer_gated([stream, other, stream], [frame(1), frame(2), frame(3)], [0.0, 0.0, 0.1])
+
+    assert results == ["previous", "result-2", "result-3"]
+    assert gate.last_results == "result-3"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import itertools
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import metrics
+
+
+def atomic_write(path, data):
+    """임시 파일에 쓴 뒤 rename → 읽는 쪽이 반쯤 쓰인 파일을 보지 않음"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# ------------------------------------------------------------------
+# 결과물 저장 단계: JPEG 인코딩 워커 풀 + 원자적 쓰기 + 롤링 JSONL 매니페스트
+# ------------------------------------------------------------------
+class ArtifactWriter:
+    """
+    submit()은 작업만 넘기고 바로 반환하므로 추론 루프를 막지 않는다.
+    감지 기록은 탐지마다 JSON 파일을 만들지 않고 매니페스트(JSONL)에 한 줄씩 추가하며,
+    매니페스트가 manifest_max_bytes를 넘으면 새 파일로 넘어간다.
+    """
+
+    def __init__(self, image_folder, manifest_folder, workers=2, jpeg_quality=90,
+                 max_pending=64, manifest_max_bytes=16 * 1024 * 1024):
+        self.image_folder = image_folder
+        self.manifest_folder = manifest_folder
+        self.jpeg_quality = jpeg_quality
+        self.manifest_max_bytes = manifest_max_bytes
+        os.makedirs(image_folder, exist_ok=True)
+        os.makedirs(manifest_folder, exist_ok=True)
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._manifest_lock = threading.Lock()
+        self._manifest_file = None
+        self.manifest_path = None
+        self._seq = itertools.count()  # 같은 마이크로초에 저장돼도 파일명이 겹치지 않도록
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit(self, image, records, prefix="frame", on_done=None):
+        """
+        image(BGR)와 records(dict 리스트)를 비동기로 저장. 대기열이 가득 차면 이미지는 버리고 False.
+        대기열이 가득 차거나 쓰기에 실패해도 on_done(None, records)는 호출하므로 알림은 이미지 없이 나간다.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.dropped += 1
+            camera = records[0].get("camera", "unknown") if records else "unknown"
+            print(f"[ArtifactWriter] queue full, image dropped ({camera}, {len(records)} records)")
+            if on_done is not None:
+                on_done(None, records)
+            return False
+        future = self._pool.submit(self._write, image, records, prefix, on_done)
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+    def _write(self, image, records, prefix, on_done):
+        camera = records[0].get("camera", "unknown") if records else "unknown"
+        start = time.perf_counter()
+        try:
+            timestamp_str = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            image_path = os.path.join(self.image_folder, f"{prefix}_{timestamp_str}_{next(self._seq)}.jpg")
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+            atomic_write(image_path, encoded.tobytes())
+            self._append_manifest([dict(record, image=image_path) for record in records])
+            metrics.observe("disk_write", camera, time.perf_counter() - start)
+            with self._stats_lock:
+                self.written += 1
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            print(f"[ArtifactWriter] write failed: {e}")
+            image_path = None  # 저장에 실패해도 알림은 이미지 없이 나가야 함
+
+        # 콜백 실패는 쓰기 오류가 아니므로 errors에 세지 않음
+        if on_done is not None:
+            try:
+                on_done(image_path, records)
+            except Exception as e:
+                print(f"[ArtifactWriter] on_done callback failed: {e}")
+
+    def _append_manifest(self, records):
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._manifest_lock:
+            if self._manifest_file is None or self._manifest_file.tell() >= self.manifest_max_bytes:
+                self._rotate_manifest()
+            self._manifest_file.write(lines)
+            self._manifest_file.flush()
+
+    def _rotate_manifest(self):
+        if self._manifest_file is not None:
+            self._manifest_file.close()
+        name = f"detections_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl"
+        self.manifest_path = os.path.join(self.manifest_folder, name)
+        self._manifest_file = open(self.manifest_path, "a", encoding="utf-8")
+
+    def close(self):
+        """대기 중인 쓰기를 모두 마친 뒤 매니페스트를 닫음"""
+        self._pool.shutdown(wait=True)
+        with self._manifest_lock:
+            if self._manifest_file is not None:
+                self._manifest_file.close()
+                self._manifest_file = None
+
+    def stats(self):
+        with self._stats_lock:
+            return {"written": self.written, "dropped": self.dropped, "errors": self.errors,
+                    "manifest": self.manifest_path}
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import time
+import cv2
+import metrics
+import frame_pool
+from roi_inference import plan_regions, infer_regions
+
+
+# ------------------------------------------------------------------
+# 비디오 스트림: 프레임 소스 + 스트림별 결과 처리 콜백
+# ------------------------------------------------------------------
+class VideoStream:
+    """
+    하나의 카메라/영상 소스. 추론 결과는 on_result(frame, results, timestamp)로 돌려받는다.
+    infer_fps를 지정하면 소스 타임스탬프 기준으로 그 비율만큼만 프레임을 디코딩하고,
+    나머지 프레임은 grab()만 해서 디코딩 비용 없이 건너뛴다.
+    read()가 돌려주는 프레임은 frame_pool 버퍼이며 호출자가 다 쓴 뒤 release()해야 재사용된다.
+    """
+
+    def __init__(self, name, video_path, on_result, motion_gate=None, infer_fps=None, rois=None):
+        self.name = name
+        self.video_path = video_path
+        self.on_result = on_result
+        self.motion_gate = motion_gate  # None이면 모든 프레임을 추론
+        self.infer_fps = infer_fps      # None이면 캡처되는 모든 프레임을 추론
+        self.rois = rois                # 0~1 비율 관심 영역 목록, None이면 전체 프레임
+        self.cap = cv2.VideoCapture(video_path)
+        self.finished = not self.cap.isOpened()
+        self.capture_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frames_grabbed = 0
+        self.frame_count = 0  # 실제로 디코딩(retrieve)한 프레임 수
+        self._next_due = 0.0
+        self._frame_shape = None  # 첫 프레임 이후에는 같은 크기의 풀 버퍼에 바로 디코딩
+        if self.finished:
+            print(f"Failed to open video: {video_path}")
+
+    def _source_timestamp(self):
+        """벽시계가 아닌 소스 기준 시각(초). 백엔드가 위치를 주지 않으면 프레임 번호로 계산"""
+        ts = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if ts <= 0 and self.frames_grabbed > 1:
+            ts = (self.frames_grabbed - 1) / self.capture_fps
+        return ts
+
+    def read(self):
+        """다음 추론 대상 프레임을 (frame, timestamp)로 반환. 스트림이 끝나면 None"""
+        while True:
+            if not self.cap.grab():
+                self.finished = True
+                return None
+            self.frames_grabbed += 1
+            ts = self._source_timestamp()
+            if self.infer_fps and ts + 1e-6 < self._next_due:
+                continue  # 추론하지 않을 프레임은 디코딩하지 않음
+            buffer = frame_pool.acquire(self._frame_shape) if self._frame_shape else None
+            ret, frame = self.cap.retrieve(buffer)
+            if not ret:
+                frame_pool.release(buffer)
+                self.finished = True
+                return None
+            if buffer is None or frame.ctypes.data != buffer.ctypes.data:
+                # 첫 프레임이거나 해상도가 바뀌어 OpenCV가 새로 할당한 경우 → 그 배열을 풀 버퍼로 사용
+                frame_pool.release(buffer)
+                self._frame_shape = frame.shape
+                frame_pool.adopt(frame)
+            if self.infer_fps:
+                interval = 1.0 / self.infer_fps
+                self._next_due += interval
+                if self._next_due <= ts:  # 처리 지연 등으로 뒤처지면 현재 시각 기준으로 재설정
+                    self._next_due = ts + interval
+            self.frame_count += 1
+            return frame, ts
+
+    def release(self):
+        self.cap.release()
+
+
+# ------------------------------------------------------------------
+# 배치 추론 엔진: 틱마다 N개 스트림의 프레임을 모아 YOLO 한 번 호출
+# ------------------------------------------------------------------
+class BatchInferenceEngine:
+    def __init__(self, model, max_batch=16, tile_size=None, tile_overlap=0.2, nms_iou=0.5):
+        self.model = model
+        self.max_batch = max_batch
+        # ROI가 있는 스트림 또는 tile_size 지정 시 영역별 crop/타일 단위로 추론 후 NMS 병합
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.nms_iou = nms_iou
+        self.streams = []
+        self._offset = 0  # 스트림 수 > max_batch 일 때 라운드로빈 시작 위치
+        self.ticks = 0
+        self.frames_inferred = 0
+
+    def add_stream(self, stream):
+        self.streams.append(stream)
+        return stream
+
+    def active_streams(self):
+        return [s for s in self.streams if not s.finished]
+
+    def _select_streams(self):
+        active = self.active_streams()
+        if len(active) <= self.max_batch:
+            return active
+        start = self._offset % len(active)
+        self._offset = start + self.max_batch
+        return (active[start:] + active[:start])[:self.max_batch]
+
+    def tick(self):
+        """스트림별로 한 프레임씩 모아 배치 추론 후 각 스트림으로 결과 전달.
+        처리한 프레임 수를 반환 (0이면 모든 스트림 종료)."""
+        batch_streams = []
+        batch_frames = []
+        batch_timestamps = []
+        for stream in self._select_streams():
+            with metrics.timer("decode", stream.name):
+                item = stream.read()
+            if item is None:
+                continue
+            frame, ts = item
+            batch_streams.append(stream)
+            batch_frames.append(frame)
+            batch_timestamps.append(ts)
+
+        if not batch_frames:
+            return 0
+
+        results = self.infer_gated(batch_streams, batch_frames, batch_timestamps)
+        for stream, frame, ts, r in zip(batch_streams, batch_frames, batch_timestamps, results):
+            stream.on_result(frame, [r], ts)
+            frame_pool.release(frame)  # 디코드 참조 반환 (on_result에서 retain한 소비자는 계속 사용)
+        return len(batch_frames)
+
+    def infer_batch(self, streams, frames):
+        """프레임 리스트를 한 번에 추론. 반환값은 frames와 같은 순서의 Results 리스트"""
+        start = time.perf_counter()
+        if self.tile_size or any(stream.rois for stream in streams):
+            regions = [plan_regions(frame.shape, stream.rois, self.tile_size, self.tile_overlap)
+                       for stream, frame in zip(streams, frames)]
+            results = infer_regions(self.model, frames, regions, self.nms_iou)
+        else:
+            # ultralytics는 리스트 입력 시 이미지별 Results 리스트를 반환
+            results = self.model(frames, verbose=False)
+        # 배치 지연 시간은 배치에 포함된 모든 카메라가 겪은 추론 지연으로 기록
+        elapsed = time.perf_counter() - start
+        for stream in streams:
+            metrics.observe("inference", stream.name, elapsed)
+        self.ticks += 1
+        self.frames_inferred += len(frames)
+        return results
+
+    def infer_gated(self, streams, frames, timestamps):
+        """
+        모션 게이트가 변화 없음으로 판단한 프레임은 이전 결과를 재사용하고 나머지만 배치 추론.
+        같은 배치 안에서 앞서 추론하기로 한 프레임이 있으면 last_results가 아니라 그 프레임의 결과를 재사용한다.
+        """
+        results = [None] * len(frames)
+        infer_idx = []
+        reuse_idx = {}     # 건너뛴 프레임 → 같은 배치에서 먼저 추론할 같은 스트림 프레임
+        latest_infer = {}  # id(stream) → 이 배치에서 가장 최근에 추론하기로 한 프레임
+        for i, (stream, frame, ts) in enumerate(zip(streams, frames, timestamps)):
+            gate = stream.motion_gate
+            if gate is None or gate.should_infer(frame, now=ts):
+                infer_idx.append(i)
+                latest_infer[id(stream)] = i
+            elif id(stream) in latest_infer:
+                reuse_idx[i] = latest_infer[id(stream)]
+            else:
+                results[i] = gate.last_results
+
+        if infer_idx:
+            inferred = self.infer_batch([streams[i] for i in infer_idx],
+                                        [frames[i] for i in infer_idx])
+            for i, r in zip(infer_idx, inferred):
+                results[i] = r
+                if streams[i].motion_gate is not None:
+                    streams[i].motion_gate.last_results = r
+            for i, src in reuse_idx.items():
+                results[i] = results[src]
+        return results
+
+    def run(self, should_stop=lambda: False):
+        start = time.time()
+        while not should_stop():
+            if self.tick() == 0:
+                break
+        for stream in self.streams:
+            stream.release()
+        elapsed = time.time() - start
+        return self.frames_inferred, elapsed
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import numpy as np
+import cv2
+
+# 클래스 인덱스 (모델 기준)
+BLOCK_CLASS = 0  # 점자 블록
+KB_CLASS = 1     # 킥보드
+
+# 클래스별 박스 색상 (BGR)
+BOX_COLORS = {KB_CLASS: (0, 255, 0), BLOCK_CLASS: (255, 0, 0)}
+DEFAULT_BOX_COLOR = (0, 255, 255)
+
+
+# ------------------------------------------------------------------
+# 겹침(Overlap) 판별 도우미 함수 (단일 박스 쌍)
+# ------------------------------------------------------------------
+def boxes_overlap(box1, box2):
+    x1_max = max(box1[0], box2[0])
+    y1_max = max(box1[1], box2[1])
+    x2_min = min(box1[2], box2[2])
+    y2_min = min(box1[3], box2[3])
+    return x1_max < x2_min and y1_max < y2_min
+
+
+def _to_numpy(values):
+    """torch 텐서(Results.boxes)와 NumPy 배열(ROI 병합 결과) 모두 처리"""
+    return values.cpu().numpy() if hasattr(values, "cpu") else np.asarray(values)
+
+
+# ------------------------------------------------------------------
+# YOLO 결과 → NumPy 배열 (박스마다 .item()을 호출하지 않고 한 번에 추출)
+# ------------------------------------------------------------------
+def extract_boxes(results):
+    """반환: (cls int[N], conf float[N], xyxy int[N, 4])"""
+    cls_list, conf_list, xyxy_list = [], [], []
+    for r in results:
+        boxes = r.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        cls_list.append(_to_numpy(boxes.cls))
+        conf_list.append(_to_numpy(boxes.conf))
+        xyxy_list.append(_to_numpy(boxes.xyxy))
+    if not cls_list:
+        return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32),
+                np.empty((0, 4), dtype=np.int64))
+    cls = np.concatenate(cls_list).astype(np.int64)
+    conf = np.concatenate(conf_list).astype(np.float32)
+    # int(x.item())와 동일하게 소수점 이하 버림
+    xyxy = np.concatenate(xyxy_list).astype(np.int64)
+    return cls, conf, xyxy
+
+
+def overlap_matrix(boxes_a, boxes_b):
+    """boxes_a[K, 4] × boxes_b[B, 4] 의 겹침 여부를 브로드캐스트로 한 번에 계산 → bool[K, B]"""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    x1_max = np.maximum(a[..., 0], b[..., 0])
+    y1_max = np.maximum(a[..., 1], b[..., 1])
+    x2_min = np.minimum(a[..., 2], b[..., 2])
+    y2_min = np.minimum(a[..., 3], b[..., 3])
+    return (x1_max < x2_min) & (y1_max < y2_min)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """boxes_a[K, 4] × boxes_b[B, 4] 의 IoU 행렬 → float[K, B]"""
+    a = boxes_a[:, None, :].astype(np.float64)
+    b = boxes_b[None, :, :].astype(np.float64)
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+# ------------------------------------------------------------------
+# 추출된 배열로 박스/레이블 그리기
+# ------------------------------------------------------------------
+def draw_boxes(im, cls, conf, xyxy, names):
+    for c, score, (x1, y1, x2, y2) in zip(cls.tolist(), conf.tolist(), xyxy.tolist()):
+        color = BOX_COLORS.get(c, DEFAULT_BOX_COLOR)
+        cv2.rectangle(im, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(im, f"{names[c]}:{score:.2f}", (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return im
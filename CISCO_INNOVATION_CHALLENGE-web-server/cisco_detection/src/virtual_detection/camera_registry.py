@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import time
+import threading
+from collections import namedtuple
+
+# 감지 루프에서 사용하는 카메라 설정 (위경도, 방위각, 화각, 고정 거리, ROI, 지면 보정점)
+CameraInfo = namedtuple("CameraInfo", ["serial", "lat", "lng", "heading", "fov", "distance", "rois",
+                                       "calibration"])
+
+
+# ------------------------------------------------------------------
+# 카메라 레지스트리: serial별 설정을 한 번 로드해 모든 감지 스레드가 공유
+# ------------------------------------------------------------------
+class CameraRegistry:
+    """
+    loader(serial)는 dict(lat, lng, heading, fov, rois, ...) 또는 None(미등록)을 반환한다.
+    값이 None인 항목은 defaults로 채운다.
+    TTL이 지난 항목은 기존 값을 그대로 돌려주면서 백그라운드 스레드에서 다시 로드하므로
+    감지 경로(get)는 캐시에 있는 serial에 대해 DB에 접근하지 않는다.
+    변경 알림은 받지 않으므로 (Camera를 수정하는 웹 서버는 별도 프로세스) 수정 사항은 TTL 재로드로만 반영된다.
+    """
+
+    def __init__(self, loader, defaults, ttl=60.0, on_refresh_done=None):
+        self.loader = loader
+        self.defaults = defaults
+        self.ttl = ttl
+        self.on_refresh_done = on_refresh_done  # 백그라운드 로드 후 정리 작업 (예: DB 연결 닫기)
+        self._cache = {}  # serial -> (CameraInfo, loaded_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _load(self, serial):
+        row = self.loader(serial) or {}
+        values = {key: row.get(key) if row.get(key) is not None else default
+                  for key, default in self.defaults.items()}
+        info = CameraInfo(serial=serial, **values)
+        with self._lock:
+            self._cache[serial] = (info, time.time())
+        return info
+
+    def _refresh_in_background(self, serial):
+        try:
+            self._load(serial)
+        except Exception as e:
+            print(f"[CameraRegistry] refresh failed for {serial}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(serial)
+            if self.on_refresh_done:
+                self.on_refresh_done()
+
+    def get(self, serial):
+        with self._lock:
+            entry = self._cache.get(serial)
+            if entry is not None:
+                info, loaded_at = entry
+                if time.time() - loaded_at >= self.ttl and serial not in self._refreshing:
+                    self._refreshing.add(serial)
+                    threading.Thread(target=self._refresh_in_background,
+                                     args=(serial,), daemon=True).start()
+                return info
+        # 처음 보는 serial만 동기 로드 (preload로 시작 시점에 미리 채워두는 것을 권장)
+        return self._load(serial)
+
+    def preload(self, serials):
+        for serial in serials:
+            self._load(serial)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import os
+import time
+import itertools
+import threading
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import metrics
+from box_utils import draw_boxes
+
+
+# ------------------------------------------------------------------
+# 스트림별 최근 N초 프레임 링 버퍼 (축소 + JPEG 압축 상태로 보관)
+# ------------------------------------------------------------------
+class ClipBuffer:
+    """
+    fps 간격으로 들어온 프레임만 prepare()로 width로 축소·주석한 사본을 만들고,
+    append()에서 JPEG로 압축해 저장한다 (압축은 감지 스레드가 아니라 ClipRecorder의 압축 워커에서).
+    seconds보다 오래됐거나 전체 크기가 max_bytes를 넘으면 오래된 프레임부터 버린다.
+    """
+
+    def __init__(self, seconds=10.0, max_bytes=8 * 1024 * 1024, fps=5.0, width=640, jpeg_quality=60):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.interval = 1.0 / fps if fps else 0.0
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+        self._frames = deque()  # (timestamp, jpeg bytes)
+        self._lock = threading.Lock()
+        self._last_ts = None
+        self.bytes = 0
+        self.evicted_by_size = 0  # max_bytes 때문에 seconds보다 일찍 버린 프레임 수
+
+    def due(self, timestamp):
+        # 1ms 여유: 소스 타임스탬프의 부동소수점 오차로 프레임을 하나씩 건너뛰지 않도록
+        return (self._last_ts is None or timestamp < self._last_ts
+                or timestamp - self._last_ts >= self.interval - 1e-3)
+
+    def prepare(self, timestamp, frame, boxes=None, names=None):
+        """frame(BGR)을 축소하고 박스를 그린 사본 반환 (원본 버퍼는 바로 재사용 가능). fps 간격 안이면 None"""
+        if not self.due(timestamp):
+            return None
+        self._last_ts = timestamp
+        height, width = frame.shape[:2]
+        scale = self.width / width if self.width and width > self.width else 1.0
+        # 원본 버퍼는 건드리지 않도록 축소본(또는 사본)에 박스를 그림
+        if scale < 1.0:
+            image = cv2.resize(frame, (self.width, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+        else:
+            image = frame.copy()
+        if boxes is not None and len(boxes[0]):
+            cls, conf, xyxy = boxes
+            image = draw_boxes(image, cls, conf, (np.asarray(xyxy) * scale).astype(np.int64), names)
+        return image
+
+    def append(self, timestamp, image):
+        """prepare()가 만든 이미지를 JPEG로 압축해 추가. 압축에 실패하면 False"""
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return False
+        data = buf.tobytes()
+        with self._lock:
+            self._frames.append((timestamp, data))
+            self.bytes += len(data)
+            while self._frames and self._frames[0][0] < timestamp - self.seconds:
+                self.bytes -= len(self._frames.popleft()[1])
+            while self.bytes > self.max_bytes and len(self._frames) > 1:
+                self.bytes -= len(self._frames.popleft()[1])
+                self.evicted_by_size += 1
+        return True
+
+    def frames_between(self, start, end):
+        with self._lock:
+            return [(ts, data) for ts, data in self._frames if start <= ts <= end]
+
+    def stats(self):
+        with self._lock:
+            span = self._frames[-1][0] - self._frames[0][0] if self._frames else 0.0
+            return {"frames": len(self._frames), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "seconds": span, "evicted_by_size": self.evicted_by_size}
+
+
+# ------------------------------------------------------------------
+# 위반 전후 클립 저장: 이벤트 시각 기준 pre/post 초 구간을 백그라운드에서 동영상으로 기록
+# ------------------------------------------------------------------
+class ClipRecorder:
+    """
+    push(name, timestamp, frame, boxes, names)는 감지 스레드에서 매 결과마다 호출한다.
+    감지 스레드에서는 축소·주석만 하고 JPEG 압축은 압축 워커(스레드 1개, 순서 유지)에서 한다.
+    압축 대기 프레임이 max_pending_frames개를 넘으면 새 프레임은 버퍼에 넣지 않고 버린다(frames_dropped).
+    capture(name, event_ts)는 클립 경로를 바로 돌려주고(감지 기록에 첨부),
+    같은 스트림에 event_ts + post_seconds 이후 프레임이 들어오면 해당 구간을 인코더 워커에 넘긴다.
+    클립 파일은 완성된 뒤 rename되므로 경로가 보이면 항상 완전한 파일이다.
+    """
+
+    def __init__(self, folder, pre_seconds=5.0, post_seconds=5.0, fps=5.0, width=640, jpeg_quality=60,
+                 max_bytes_per_stream=8 * 1024 * 1024, max_pending=8, max_pending_frames=32, codec="mp4v"):
+        self.folder = folder
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.codec = codec
+        self.max_pending = max_pending
+        self._buffer_args = dict(seconds=pre_seconds + post_seconds, max_bytes=max_bytes_per_stream,
+                                 fps=fps, width=width, jpeg_quality=jpeg_quality)
+        os.makedirs(folder, exist_ok=True)
+        self._buffers = {}
+        self._pending = []  # (name, start, end, path)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip")
+        self._compress_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-jpeg")
+        self._compress_slots = threading.BoundedSemaphore(max_pending_frames)
+        self._futures = set()
+        self._seq = itertools.count()
+        self.written = 0
+        self.dropped = 0
+        self.frames_dropped = 0
+        self.errors = 0
+
+    def _buffer(self, name):
+        with self._lock:
+            buffer = self._buffers.get(name)
+            if buffer is None:
+                buffer = self._buffers[name] = ClipBuffer(**self._buffer_args)
+            return buffer
+
+    def push(self, name, timestamp, frame, boxes=None, names=None):
+        buffer = self._buffer(name)
+        if buffer.due(timestamp):
+            if self._compress_slots.acquire(blocking=False):
+                with metrics.timer("clip_buffer", name):
+                    image = buffer.prepare(timestamp, frame, boxes, names)
+                future = self._compress_pool.submit(self._compress, name, buffer, timestamp, image)
+                future.add_done_callback(lambda _: self._compress_slots.release())
+            else:
+                with self._lock:
+                    self.frames_dropped += 1
+        with self._lock:
+            ready = [clip for clip in self._pending if clip[0] == name and clip[2] <= timestamp]
+            if ready:
+                self._pending = [clip for clip in self._pending if clip not in ready]
+        for clip in ready:
+            self._finalize(buffer, *clip)
+
+    def capture(self, name, event_ts):
+        """event_ts 전후 구간 클립을 예약하고 완성될 파일 경로 반환. 대기 클립이 너무 많으면 None"""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return None
+            timestamp_str = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            safe_name = os.path.splitext(os.path.basename(name))[0]
+            path = os.path.join(self.folder, f"clip_{safe_name}_{timestamp_str}_{next(self._seq)}.mp4")
+            self._pending.append((name, event_ts - self.pre_seconds, event_ts + self.post_seconds, path))
+            return path
+
+    def _compress(self, name, buffer, timestamp, image):
+        start = time.perf_counter()
+        if not buffer.append(timestamp, image):
+            with self._lock:
+                self.errors += 1
+        metrics.observe("clip_compress", name, time.perf_counter() - start)
+
+    def _track(self, future):
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+
+    def _finalize(self, buffer, name, start, end, path):
+        # 압축 워커는 하나라 제출 순서대로 실행됨 → 이 작업이 돌 때는 그 전에 들어온 프레임이 모두 버퍼에 있음
+        self._track(self._compress_pool.submit(self._submit_encode, buffer, name, start, end, path))
+
+    def _submit_encode(self, buffer, name, start, end, path):
+        frames = buffer.frames_between(start, end)
+        self._track(self._pool.submit(self._encode, name, frames, path))
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _encode(self, name, frames, path):
+        if not frames:
+            with self._lock:
+                self.errors += 1
+            print(f"[ClipRecorder] no buffered frames for {os.path.basename(path)}")
+            return
+        start = time.perf_counter()
+        tmp_path = f"{path[:-4]}.tmp.mp4"
+        writer = None
+        try:
+            # 실제 프레임 간격으로 재생 속도를 맞춤 (소스가 fps보다 느린 경우)
+            span = frames[-1][0] - frames[0][0]
+            fps = (len(frames) - 1) / span if span > 0 else self.fps
+            for _, data in frames:
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if writer is None:
+                    height, width = image.shape[:2]
+                    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*self.codec), fps, (width, height))
+                    if not writer.isOpened():
+                        raise RuntimeError(f"cannot open video writer ({self.codec})")
+                writer.write(image)
+            writer.release()
+            writer = None
+            os.replace(tmp_path, path)
+            metrics.observe("clip_write", name, time.perf_counter() - start)
+            with self._lock:
+                self.written += 1
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"[ClipRecorder] write failed: {e}")
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def flush(self):
+        """스트림 종료 시 남은 예약 클립을 버퍼에 있는 프레임만으로 마무리하고 인코딩 완료까지 대기"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for clip in pending:
+            self._finalize(self._buffer(clip[0]), *clip)
+        # 압축 워커에서 실행되는 예약 작업이 인코딩 작업을 새로 추가하므로 남은 작업이 없을 때까지 반복
+        while True:
+            with self._lock:
+                futures = [future for future in self._futures if not future.done()]
+            if not futures:
+                break
+            for future in futures:
+                future.result()
+
+    def close(self):
+        self.flush()
+        self._compress_pool.shutdown(wait=True)
+        self._pool.shutdown(wait=True)
+
+    def buffer_bytes(self):
+        with self._lock:
+            buffers = list(self._buffers.values())
+        return sum(buffer.bytes for buffer in buffers)
+
+    def stats(self):
+        with self._lock:
+            buffers = dict(self._buffers)
+            pending = len(self._pending)
+        return {"written": self.written, "dropped": self.dropped, "frames_dropped": self.frames_dropped,
+                "errors": self.errors, "pending": pending,
+                "buffer_bytes": sum(buffer.bytes for buffer in buffers.values()),
+                "streams": {name: buffer.stats() for name, buffer in buffers.items()}}
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import weakref
+import threading
+import numpy as np
+from box_utils import draw_boxes
+
+
+# ------------------------------------------------------------------
+# 참조 카운트 프레임 버퍼 풀: 디코드 → 추론 → 후처리/화면/저장 단계가 같은 버퍼를 복사 없이 공유
+# ------------------------------------------------------------------
+class FramePool:
+    """
+    acquire()로 받은 배열은 참조 수 1로 시작한다. 프레임을 넘겨받아 나중에 쓰는 쪽은 retain(),
+    다 쓴 쪽은 release()를 호출하고, 참조 수가 0이 되면 배열은 같은 크기의 다음 프레임에 재사용된다.
+    풀에서 나오지 않은 배열에 대한 retain/release는 아무 일도 하지 않는다.
+    release 없이 버려진 배열은 GC될 때 추적 목록에서만 빠진다 (재사용되지 않을 뿐 누수 없음).
+    """
+
+    def __init__(self, max_free_per_shape=8):
+        self.max_free_per_shape = max_free_per_shape
+        self._free = {}  # (shape, dtype) -> 재사용 대기 배열 목록
+        self._refs = {}  # id(array) -> 참조 수 (사용 중인 배열)
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(shape, dtype):
+        return tuple(shape), np.dtype(dtype).str
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            free = self._free.get(self._key(shape, dtype))
+            if free:
+                array = free.pop()
+                self._refs[id(array)] = 1
+                self.reused += 1
+                return array
+        return self.adopt(np.empty(shape, dtype=dtype))
+
+    def adopt(self, array):
+        """외부에서 할당된 배열(예: 첫 디코딩 결과)을 참조 수 1로 풀 관리 대상에 추가"""
+        with self._lock:
+            self._refs[id(array)] = 1
+            self.allocated += 1
+        weakref.finalize(array, self._forget, id(array))
+        return array
+
+    def _forget(self, array_id):
+        with self._lock:
+            self._refs.pop(array_id, None)
+
+    def retain(self, array):
+        with self._lock:
+            if id(array) in self._refs:
+                self._refs[id(array)] += 1
+        return array
+
+    def release(self, array):
+        if array is None:
+            return
+        with self._lock:
+            refs = self._refs.get(id(array))
+            if refs is None:
+                return
+            if refs > 1:
+                self._refs[id(array)] = refs - 1
+                return
+            del self._refs[id(array)]
+            free = self._free.setdefault(self._key(array.shape, array.dtype), [])
+            if len(free) < self.max_free_per_shape:
+                free.append(array)
+
+    def refcount(self, array):
+        with self._lock:
+            return self._refs.get(id(array), 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "allocated": self.allocated,
+                "reused": self.reused,
+                "in_use": len(self._refs),
+                "free": sum(len(v) for v in self._free.values()),
+            }
+
+
+# 프로세스 전역 풀 (모든 스트림이 공유, 해상도별로 버퍼를 따로 관리)
+FRAMES = FramePool()
+acquire = FRAMES.acquire
+adopt = FRAMES.adopt
+retain = FRAMES.retain
+release = FRAMES.release
+
+
+# ------------------------------------------------------------------
+# 지연 주석 프레임: 박스는 실제로 이미지가 필요한 소비자(화면/녹화/알림)가 render()할 때만 그림
+# ------------------------------------------------------------------
+class AnnotatedFrame:
+    """
+    풀 버퍼에 대한 참조를 하나 가진다. 소비자는 render()로 이미지를 얻고 다 쓰면 release()를 호출한다.
+    다른 단계가 같은 버퍼를 쓰지 않으면(참조 수 1) 버퍼 위에 바로 그리고, 아니면 사본에 그린다.
+    render() 결과는 release() 전까지만 유효하다.
+    timestamp는 프레임의 소스(디코딩) 시각(초)이며, 모르면 None.
+    """
+
+    def __init__(self, frame, cls=None, conf=None, xyxy=None, names=None, timestamp=None):
+        self.frame = retain(frame)
+        self.boxes = (cls, conf, xyxy)
+        self.names = names
+        self.timestamp = timestamp
+        self._image = None
+
+    def render(self):
+        if self._image is None:
+            cls, conf, xyxy = self.boxes
+            if cls is None or not len(cls):
+                self._image = self.frame
+            else:
+                image = self.frame if FRAMES.refcount(self.frame) <= 1 else self.frame.copy()
+                self._image = draw_boxes(image, cls, conf, xyxy, self.names)
+        return self._image
+
+    def release(self):
+        frame, self.frame, self._image = self.frame, None, None
+        release(frame)
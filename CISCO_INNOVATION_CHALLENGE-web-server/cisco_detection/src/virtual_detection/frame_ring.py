@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# 슬롯 헤더 (int64): [version, height, width, channels, 박스 수]
+_HEADER_FIELDS = 5
+# 슬롯 박스 행 (float64): [x1, y1, x2, y2, conf, cls]
+_BOX_FIELDS = 6
+
+
+# ------------------------------------------------------------------
+# 공유 메모리 링 버퍼: 프로세스 간 프레임 전달 (pickle/복사 없이 슬롯에 직접 기록)
+# ------------------------------------------------------------------
+class FrameRing:
+    """
+    생산자(감지 워커 프로세스) 1개 → 소비자(렌더러/레코더) 1개.
+    메모리 구성: [쓰기 카운터 int64] [슬롯 헤더 int64 × slots × 5] [타임스탬프 float64 × slots]
+    [박스 float64 × slots × max_boxes × 6] [프레임 데이터]
+    프레임은 박스를 그리지 않은 원본이고 박스 배열을 함께 기록한다 (그리기는 실제로 표시하는 소비자가 함).
+    생산자는 카운터 % slots 슬롯에 덮어쓰므로 소비자가 느리면 오래된 프레임은 건너뛴다(skipped).
+    슬롯마다 version을 쓰기 시작 시 홀수, 완료 시 짝수로 올려(seqlock) 쓰는 도중의 프레임은 읽지 않는다.
+    """
+
+    def __init__(self, name, slots, slot_bytes, max_boxes=256, create=False):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.max_boxes = max_boxes
+        size = 8 + slots * _HEADER_FIELDS * 8 + slots * 8 + slots * max_boxes * _BOX_FIELDS * 8 + slots * slot_bytes
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self._shm.name
+        buf = self._shm.buf
+        offset = 0
+        self._counter = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8
+        self._header = np.ndarray((slots, _HEADER_FIELDS), dtype=np.int64, buffer=buf, offset=offset)
+        offset += slots * _HEADER_FIELDS * 8
+        self._timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += slots * 8
+        self._boxes = np.ndarray((slots, max_boxes, _BOX_FIELDS), dtype=np.float64, buffer=buf, offset=offset)
+        offset += slots * max_boxes * _BOX_FIELDS * 8
+        self._data = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=buf, offset=offset)
+        if create:
+            self._counter[0] = 0
+            self._header[:] = 0
+        self._last_read = int(self._counter[0])
+        self.written = 0
+        self.oversize = 0  # 슬롯보다 커서 버린 프레임 수 (생산자 측)
+        self.skipped = 0   # 읽기 전에 덮어써져 놓친 프레임 수 (소비자 측)
+
+    @classmethod
+    def create(cls, name, max_shape, slots=4, max_boxes=256):
+        """max_shape(height, width, channels) 크기 프레임, 프레임당 max_boxes개 박스까지 담을 수 있는 링 생성"""
+        slot_bytes = int(np.prod(max_shape))
+        return cls(name, slots, slot_bytes, max_boxes=max_boxes, create=True)
+
+    def spec(self):
+        """다른 프로세스에서 FrameRing(**spec)으로 연결하기 위한 인자"""
+        return {"name": self.name, "slots": self.slots, "slot_bytes": self.slot_bytes, "max_boxes": self.max_boxes}
+
+    def write(self, frame, timestamp=0.0, boxes=None):
+        """
+        uint8 프레임과 박스 (cls, conf, xyxy)를 다음 슬롯에 기록. 슬롯보다 크면 버리고 False.
+        박스가 max_boxes개를 넘으면 앞의 max_boxes개만 기록
+        """
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            self.oversize += 1
+            return False
+        seq = int(self._counter[0])
+        slot = seq % self.slots
+        header = self._header[slot]
+        shape = frame.shape if frame.ndim == 3 else frame.shape + (1,)
+        cls, conf, xyxy = boxes if boxes is not None else (None, None, None)
+        count = 0 if cls is None else min(len(cls), self.max_boxes)
+        header[0] += 1  # 홀수: 쓰는 중
+        self._data[slot, :frame.nbytes] = np.ascontiguousarray(frame).reshape(-1)
+        if count:
+            rows = self._boxes[slot, :count]
+            rows[:, :4] = xyxy[:count]
+            rows[:, 4] = conf[:count]
+            rows[:, 5] = cls[:count]
+        header[1:4] = shape
+        header[4] = count
+        self._timestamps[slot] = timestamp
+        header[0] += 1  # 짝수: 완료
+        self._counter[0] = seq + 1
+        self.written += 1
+        return True
+
+    def _read_slot(self, seq, attempts=3, retry_delay=0.001):
+        slot = seq % self.slots
+        header = self._header[slot]
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(retry_delay)  # 생산자가 쓰는 중이면 잠깐 양보한 뒤 다시 읽음 (바쁜 대기 방지)
+            version = int(header[0])
+            if version % 2:
+                continue
+            height, width, channels, count = (int(v) for v in header[1:])
+            frame = self._data[slot, :height * width * channels].reshape(height, width, channels).copy()
+            rows = self._boxes[slot, :count].copy()
+            timestamp = float(self._timestamps[slot])
+            if int(header[0]) == version:
+                boxes = (rows[:, 5].astype(np.int64), rows[:, 4], rows[:, :4].astype(np.int64))
+                return frame, timestamp, boxes
+        return None
+
+    def read_latest(self):
+        """
+        마지막으로 읽은 뒤 새 프레임이 있으면 가장 최근 프레임 (frame, timestamp, (cls, conf, xyxy)),
+        없으면 None (렌더러용)
+        """
+        counter = int(self._counter[0])
+        if counter <= self._last_read:
+            self._last_read = min(self._last_read, counter)
+            return None
+        self.skipped += counter - self._last_read - 1
+        self._last_read = counter
+        return self._read_slot(counter - 1)
+
+    def read_new(self):
+        """마지막으로 읽은 뒤 기록된 프레임을 순서대로 반환 (레코더용, 이미 덮어써진 프레임은 skipped)"""
+        counter = int(self._counter[0])
+        first = max(self._last_read, counter - self.slots + 1)
+        self.skipped += max(0, first - self._last_read)
+        items = []
+        for seq in range(first, counter):
+            item = self._read_slot(seq)
+            if item is not None:
+                items.append(item)
+        self._last_read = max(self._last_read, counter)
+        return items
+
+    def close(self):
+        # numpy 뷰를 먼저 놓아야 공유 메모리를 닫을 수 있음
+        self._counter = self._header = self._timestamps = self._boxes = self._data = None
+        self._shm.close()
+
+    def unlink(self):
+        """생성한 프로세스에서 한 번만 호출"""
+        self._shm.unlink()
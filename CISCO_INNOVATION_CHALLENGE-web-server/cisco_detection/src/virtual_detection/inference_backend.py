@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+추론 백엔드 선택 (GPU 없는 엣지 장비용 CPU 최적화)
+
+    pytorch  : models/model.pt 를 그대로 사용 (기본값)
+    onnx     : ONNX 로 내보낸 모델을 ONNX Runtime 으로 실행
+    openvino : OpenVINO IR (FP32)
+    int8     : OpenVINO IR + 학습 후 INT8 양자화 (보정 데이터 필요)
+
+int8 보정 데이터는 INT8_CALIBRATION_DATA(데이터셋 yaml)로 지정하고, 지정하지 않으면
+test_assets 영상에서 고르게 뽑은 프레임으로 보정용 데이터셋을 만든다 (이 모델의 kb/block 장면).
+
+내보낸 모델은 .pt 옆에 저장되며 .pt 보다 최신이면 다시 내보내지 않는다.
+onnxruntime / openvino 패키지는 해당 백엔드를 쓸 때만 필요하다.
+ultralytics(torch 포함)는 실제로 모델을 로드/내보낼 때 import 한다.
+"""
+import os
+import json
+import time
+import numpy as np
+
+BACKENDS = ("pytorch", "onnx", "openvino", "int8")
+
+# INT8 양자화 보정용 데이터셋 yaml (환경 변수로 교체 가능). 비어 있으면 CALIBRATION_VIDEO 프레임 사용
+INT8_CALIBRATION_DATA = os.environ.get("INT8_CALIBRATION_DATA")
+CALIBRATION_VIDEO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../test_assets/example_video.mp4")
+CALIBRATION_FRAMES = 64
+
+
+def exported_path(model_path, backend):
+    """백엔드별 내보내기 결과 경로 (ultralytics 명명 규칙)"""
+    stem, _ = os.path.splitext(model_path)
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    if backend == "int8":
+        return stem + "_int8_openvino_model"
+    return model_path
+
+
+def _is_fresh(path, model_path):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_path)
+
+
+def build_calibration_data(model_path, names, video_path=CALIBRATION_VIDEO, num_frames=CALIBRATION_FRAMES):
+    """영상에서 프레임을 고르게 뽑아 보정용 데이터셋(images/ + yaml)을 만들고 yaml 경로를 반환"""
+    import cv2
+
+    stem, _ = os.path.splitext(model_path)
+    root = stem + "_int8_calibration"
+    yaml_path = os.path.join(root, "calibration.yaml")
+    if _is_fresh(yaml_path, model_path):
+        return yaml_path
+
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if not cap.isOpened() or total <= 0:
+        cap.release()
+        raise FileNotFoundError(f"INT8 calibration needs frames: cannot read {video_path} "
+                                "(set INT8_CALIBRATION_DATA to a dataset yaml)")
+    image_dir = os.path.join(root, "images")
+    os.makedirs(image_dir, exist_ok=True)
+    saved = 0
+    for index in np.linspace(0, total - 1, min(num_frames, total)).astype(int).tolist():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if ret:
+            cv2.imwrite(os.path.join(image_dir, f"frame_{index:06d}.jpg"), frame)
+            saved += 1
+    cap.release()
+    if not saved:
+        raise FileNotFoundError(f"INT8 calibration needs frames: no frame decoded from {video_path}")
+
+    # 라벨 없이 이미지만 사용 (보정은 활성값 범위만 측정). 클래스 이름은 모델과 동일하게 기록
+    lines = [f"path: {json.dumps(os.path.abspath(root))}", "train: images", "val: images", "names:"]
+    lines += [f"  {class_id}: {json.dumps(name)}" for class_id, name in sorted(names.items())]
+    with open(yaml_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"[Backend] INT8 calibration set: {saved} frames from {os.path.basename(video_path)}")
+    return yaml_path
+
+
+def export_model(model_path, backend, imgsz=640):
+    """필요할 때만 내보내기를 수행하고 결과 경로를 반환 (디스크 캐시)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', choose one of {BACKENDS}")
+    if backend == "pytorch":
+        return model_path
+
+    path = exported_path(model_path, backend)
+    if _is_fresh(path, model_path):
+        return path
+
+    from ultralytics import YOLO
+
+    print(f"[Backend] exporting {os.path.basename(model_path)} → {backend} (cached for next runs)")
+    model = YOLO(model_path)
+    # 배치 추론 엔진이 여러 프레임을 한 번에 넣으므로 dynamic 입력으로 내보냄
+    if backend == "onnx":
+        path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    elif backend == "openvino":
+        path = model.export(format="openvino", imgsz=imgsz, dynamic=True)
+    else:
+        data = INT8_CALIBRATION_DATA or build_calibration_data(model_path, model.names)
+        path = model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=True, data=data)
+    return str(path)
+
+
+def load_model(model_path, backend="pytorch"):
+    """선택한 백엔드로 YOLO 모델 로드. 반환 객체는 model(frames) 호출 방식이 동일하다"""
+    from ultralytics import YOLO
+
+    path = export_model(model_path, backend)
+    if backend == "pytorch":
+        return YOLO(path)
+    return YOLO(path, task="detect")
+
+
+def warmup_model(model, imgsz=640, runs=1):
+    """더미 프레임으로 추론해 첫 실제 프레임에서 생기는 초기화 지연(그래프 준비, 메모리 할당)을 미리 치름.
+    걸린 시간(초)을 반환"""
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(runs):
+        model([dummy], verbose=False)
+    return time.perf_counter() - start
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# ------------------------------------------------------------------
+# 지연 시간 히스토그램: 최근 window개 표본으로 p50/p95/p99 계산 + 누적 count/sum
+# ------------------------------------------------------------------
+class LatencyHistogram:
+    def __init__(self, window=2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        samples = sorted(self._samples)
+        result = {"count": self.count, "mean_ms": self.total / self.count * 1000 if self.count else 0.0}
+        for q in QUANTILES:
+            value = samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+            result[f"p{int(q * 100)}_ms"] = value * 1000
+        return result
+
+
+# ------------------------------------------------------------------
+# 메트릭 저장소: (단계, 카메라)별 히스토그램, 카운터, 게이지(큐 깊이 등 콜백)
+# ------------------------------------------------------------------
+class MetricsRegistry:
+    def __init__(self, window=2048):
+        self.window = window
+        self._histograms = {}  # (stage, camera) -> LatencyHistogram
+        self._counters = {}    # (name, camera) -> int
+        self._gauges = {}      # name -> callable
+        self._lock = threading.Lock()
+
+    def observe(self, stage, camera, seconds):
+        with self._lock:
+            hist = self._histograms.get((stage, camera))
+            if hist is None:
+                hist = self._histograms[(stage, camera)] = LatencyHistogram(self.window)
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, camera):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, camera, time.perf_counter() - start)
+
+    def samples(self, stage, camera=None):
+        """단계의 최근 표본(초) 목록. camera가 None이면 모든 카메라 표본을 합침"""
+        with self._lock:
+            return [s for (st, cam), hist in self._histograms.items()
+                    if st == stage and camera in (None, cam) for s in hist._samples]
+
+    def inc(self, name, camera, amount=1):
+        with self._lock:
+            self._counters[(name, camera)] = self._counters.get((name, camera), 0) + amount
+
+    def register_gauge(self, name, fn):
+        """fn()은 호출 시점의 값(큐 깊이, 누적 드롭 수 등)을 반환"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {key: hist.summary() for key, hist in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        stages = {}
+        for (stage, camera), summary in sorted(histograms.items()):
+            stages.setdefault(stage, {})[camera] = summary
+        counter_out = {}
+        for (name, camera), value in sorted(counters.items()):
+            counter_out.setdefault(name, {})[camera] = value
+        gauge_out = {}
+        for name, fn in sorted(gauges.items()):
+            try:
+                gauge_out[name] = fn()
+            except Exception as e:
+                gauge_out[name] = f"error: {e}"
+        return {"timestamp": time.time(), "stages": stages, "counters": counter_out, "gauges": gauge_out}
+
+    def prometheus_text(self):
+        snap = self.snapshot()
+        lines = []
+        for stage, cameras in snap["stages"].items():
+            for camera, summary in cameras.items():
+                labels = f'stage="{stage}",camera="{camera}"'
+                for q in QUANTILES:
+                    value = summary[f"p{int(q * 100)}_ms"] / 1000
+                    lines.append(f'detection_stage_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+                lines.append(f"detection_stage_seconds_count{{{labels}}} {summary['count']}")
+        for name, cameras in snap["counters"].items():
+            for camera, value in cameras.items():
+                lines.append(f'detection_{name}_total{{camera="{camera}"}} {value}')
+        for name, value in snap["gauges"].items():
+            if isinstance(value, (int, float)):
+                lines.append(f"detection_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self):
+        snap = self.snapshot()
+        lines = []
+        for stage, cameras in snap["stages"].items():
+            for camera, s in cameras.items():
+                lines.append(f"{stage:<16} {camera:<24} n={s['count']:<7} p50={s['p50_ms']:.1f}ms "
+                             f"p95={s['p95_ms']:.1f}ms p99={s['p99_ms']:.1f}ms")
+        for name, cameras in snap["counters"].items():
+            for camera, value in cameras.items():
+                lines.append(f"{name:<16} {camera:<24} {value}")
+        if snap["gauges"]:
+            lines.append("gauges: " + ", ".join(f"{k}={v}" for k, v in snap["gauges"].items()))
+        return lines
+
+
+# 프로세스 전역 기본 저장소 (감지 루프의 모든 단계가 여기에 기록)
+REGISTRY = MetricsRegistry()
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+inc = REGISTRY.inc
+register_gauge = REGISTRY.register_gauge
+
+
+# ------------------------------------------------------------------
+# 로컬 HTTP 엔드포인트 (/metrics: Prometheus 텍스트, /metrics.json: JSON)
+# ------------------------------------------------------------------
+def start_http_server(port=9716, host="127.0.0.1", registry=REGISTRY):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.prometheus_text().encode()
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body = json.dumps(registry.snapshot(), indent=2).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[Metrics] serving http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def start_summary_logger(interval=60.0, registry=REGISTRY):
+    """interval초마다 단계별 지연 시간/카운터/게이지 요약을 출력"""
+    def _loop():
+        while True:
+            time.sleep(interval)
+            print("[Metrics] ---- summary ----")
+            for line in registry.summary_lines():
+                print(f"[Metrics] {line}")
+
+    thread = threading.Thread(target=_loop, daemon=True)
+    thread.start()
+    return thread
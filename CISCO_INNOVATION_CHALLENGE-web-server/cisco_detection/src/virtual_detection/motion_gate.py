@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import time
+import cv2
+
+
+# ------------------------------------------------------------------
+# 모션 게이트: 축소한 프레임의 차영상으로 장면 변화가 없으면 YOLO 추론을 건너뜀
+# ------------------------------------------------------------------
+class MotionGate:
+    """
+    마지막으로 추론한 프레임(기준 프레임)과 현재 프레임을 작은 흑백 이미지로 줄여 비교한다.
+    바뀐 픽셀 비율이 changed_ratio 미만이면 이전 결과(last_results)를 재사용하고,
+    max_staleness 초가 지나면 변화가 없어도 강제로 다시 추론한다.
+    """
+
+    def __init__(self, scale_width=64, pixel_threshold=25, changed_ratio=0.01, max_staleness=5.0):
+        self.scale_width = scale_width
+        self.pixel_threshold = pixel_threshold
+        self.changed_ratio = changed_ratio
+        self.max_staleness = max_staleness
+        self.reference = None
+        self.reference_time = 0.0
+        self.last_results = None
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        scale_height = max(1, int(height * self.scale_width / width))
+        small = cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+
+    def should_infer(self, frame, now=None):
+        """True면 이 프레임을 추론해야 함 (기준 프레임 갱신), False면 last_results 재사용"""
+        now = time.time() if now is None else now
+        small = self._small_gray(frame)
+
+        changed = True
+        if self.reference is not None and self.last_results is not None \
+                and now - self.reference_time < self.max_staleness:
+            diff = cv2.absdiff(small, self.reference)
+            _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+            changed = cv2.countNonZero(mask) >= self.changed_ratio * mask.size
+
+        if changed:
+            self.reference = small
+            self.reference_time = now
+            self.frames_inferred += 1
+        else:
+            self.frames_skipped += 1
+        return changed
+
+    def stats(self):
+        total = self.frames_inferred + self.frames_skipped
+        return {
+            "frames_inferred": self.frames_inferred,
+            "frames_skipped": self.frames_skipped,
+            "skip_ratio": self.frames_skipped / total if total else 0.0,
+        }
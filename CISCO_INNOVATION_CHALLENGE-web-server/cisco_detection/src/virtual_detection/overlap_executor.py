@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import time
+import threading
+from collections import OrderedDict
+import metrics
+
+
+# ------------------------------------------------------------------
+# 고정 크기 워커 풀 + 키(스트림)별 최신 작업만 남기는 대기열
+# ------------------------------------------------------------------
+class CoalescingExecutor:
+    """
+    submit(key, *args)로 들어온 작업을 workers개의 스레드가 처리한다.
+    - 같은 key의 작업이 아직 대기 중이면 새 인자로 교체 (coalesced)
+    - 대기 중인 key 수가 max_pending에 도달하면 새 작업은 버림 (dropped)
+    교체되거나 버려진 작업의 인자는 on_discard(args)로 넘겨 정리할 수 있다 (예: 프레임 버퍼 반환).
+    느린 디스크/DB/MQTT 때문에 작업이 밀려도 스레드와 프레임 사본이 무한히 쌓이지 않는다.
+    """
+
+    def __init__(self, fn, workers=2, max_pending=8, name="executor", on_discard=None):
+        # name은 메트릭 단계 이름으로도 사용 (key별 실행 시간 / coalesced / dropped 기록)
+        self.fn = fn
+        self.on_discard = on_discard
+        self.max_pending = max_pending
+        self.name = name
+        self._pending = OrderedDict()  # key -> args (먼저 들어온 key부터 처리)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.submitted = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._workers:
+            t.start()
+
+    def submit(self, key, *args):
+        discarded = None
+        with self._cond:
+            if self._closed:
+                discarded, accepted = args, False
+            else:
+                self.submitted += 1
+                if key in self._pending:
+                    discarded = self._pending[key]
+                    self._pending[key] = args  # 대기 순서는 유지하고 내용만 최신으로 교체
+                    self.coalesced += 1
+                    metrics.inc(f"{self.name}_coalesced", key)
+                    accepted = True
+                elif len(self._pending) >= self.max_pending:
+                    discarded, accepted = args, False
+                    self.dropped += 1
+                    metrics.inc(f"{self.name}_dropped", key)
+                else:
+                    self._pending[key] = args
+                    self._cond.notify()
+                    accepted = True
+        if discarded is not None and self.on_discard is not None:
+            self.on_discard(discarded)
+        return accepted
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                key, args = self._pending.popitem(last=False)
+            start = time.perf_counter()
+            try:
+                self.fn(*args)
+            except Exception as e:
+                with self._cond:
+                    self.errors += 1
+                print(f"[{self.name}] task failed: {e}")
+            metrics.observe(self.name, key, time.perf_counter() - start)
+            with self._cond:
+                self.executed += 1
+
+    def shutdown(self, wait=True):
+        """대기 중인 작업을 마저 처리한 뒤 워커 종료"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._workers:
+                t.join()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "submitted": self.submitted,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "pending": len(self._pending),
+            }
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import time
+import queue
+import threading
+import metrics
+import frame_pool
+
+# 큐가 가득 찼을 때의 처리 방식
+DROP_OLDEST = "drop_oldest"  # 가장 오래된 항목을 버리고 새 항목을 넣음 (실시간 카메라/화면용)
+BLOCK = "block"              # 자리가 날 때까지 생산자를 대기시킴 (영상 파일 재생용)
+
+
+# ------------------------------------------------------------------
+# 크기 제한 큐: queue.Queue와 동일한 인터페이스 + 드롭 정책
+# ------------------------------------------------------------------
+class BoundedQueue(queue.Queue):
+    """on_drop(item): DROP_OLDEST 정책으로 버려지는 항목 정리 (예: 프레임 버퍼 반환)"""
+
+    def __init__(self, maxsize, policy=BLOCK, on_drop=None):
+        if maxsize <= 0:
+            raise ValueError("BoundedQueue requires maxsize > 0")
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item, block=True, timeout=None):
+        if self.policy == BLOCK:
+            return super().put(item, block, timeout)
+        dropped = None
+        with self.mutex:
+            if self._qsize() >= self.maxsize:
+                dropped = self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+
+    def drain(self):
+        """남은 항목을 모두 꺼내 on_drop으로 정리 (종료 시)"""
+        while True:
+            try:
+                item = self.get_nowait()
+            except queue.Empty:
+                return
+            if self.on_drop is not None:
+                self.on_drop(item)
+
+
+def put_until(q, item, should_stop, poll=0.1):
+    """BLOCK 정책 큐에서도 종료 요청 시 빠져나올 수 있도록 타임아웃 단위로 대기"""
+    while not should_stop():
+        try:
+            q.put(item, timeout=poll)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _release_frame(item):
+    frame_pool.release(item[1])
+
+
+# ------------------------------------------------------------------
+# 디코드 → 추론 → 후처리 파이프라인
+#   decode (스트림별 스레드) → frame_queue → infer (배치) → result_queue → postprocess
+#   decode 스레드가 추론보다 앞서 프레임을 미리 읽어 두므로(prefetch) 디코딩과 추론이 겹쳐 실행됨
+# ------------------------------------------------------------------
+class DetectionPipeline:
+    def __init__(self, engine,
+                 frame_queue_size=32, frame_policy=BLOCK,
+                 result_queue_size=32, result_policy=BLOCK):
+        self.engine = engine
+        # 큐 항목의 두 번째 값은 frame_pool 버퍼 → 버려지면 풀로 반환
+        self.frame_queue = BoundedQueue(frame_queue_size, frame_policy, on_drop=_release_frame)
+        self.result_queue = BoundedQueue(result_queue_size, result_policy, on_drop=_release_frame)
+        self._stop = threading.Event()
+        self._infer_done = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _stopped(self):
+        return self._stop.is_set()
+
+    def _decode_loop(self, stream):
+        while not self._stopped():
+            with metrics.timer("decode", stream.name):
+                item = stream.read()
+            if item is None:
+                break
+            frame, ts = item
+            decoded_at = time.perf_counter()
+            if not put_until(self.frame_queue, (stream, frame, ts, decoded_at), self._stopped):
+                frame_pool.release(frame)
+                break
+        stream.finished = True
+
+    def _infer_loop(self):
+        max_batch = self.engine.max_batch
+        while not self._stopped():
+            try:
+                items = [self.frame_queue.get(timeout=0.1)]
+            except queue.Empty:
+                # finished는 마지막 put 이후에 세팅되므로, 확인 후 큐가 비어 있으면 종료
+                if not self.engine.active_streams() and self.frame_queue.empty():
+                    break
+                continue
+            while len(items) < max_batch:
+                try:
+                    items.append(self.frame_queue.get_nowait())
+                except queue.Empty:
+                    break
+            streams, frames, timestamps, decoded_at = (list(x) for x in zip(*items))
+            results = self.engine.infer_gated(streams, frames, timestamps)
+            for i, (stream, frame, ts, r, t0) in enumerate(zip(streams, frames, timestamps, results, decoded_at)):
+                if not put_until(self.result_queue, (stream, frame, ts, [r], t0), self._stopped):
+                    for unsent in frames[i:]:
+                        frame_pool.release(unsent)
+                    break
+        self._infer_done.set()
+
+    def _postprocess_loop(self):
+        while not self._stopped():
+            try:
+                stream, frame, ts, results, decoded_at = self.result_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._infer_done.is_set() and self.result_queue.empty():
+                    break
+                continue
+            stream.on_result(frame, results, ts)
+            frame_pool.release(frame)  # 디코드 참조 반환 (on_result에서 retain한 소비자는 계속 사용)
+            # 디코드 완료부터 후처리 완료까지 (큐 대기 시간 포함)
+            metrics.observe("end_to_end", stream.name, time.perf_counter() - decoded_at)
+
+    def run(self, should_stop=lambda: False):
+        start = time.time()
+        threads = [threading.Thread(target=self._decode_loop, args=(s,), daemon=True)
+                   for s in self.engine.streams]
+        threads.append(threading.Thread(target=self._infer_loop, daemon=True))
+        post_thread = threading.Thread(target=self._postprocess_loop, daemon=True)
+        threads.append(post_thread)
+        for t in threads:
+            t.start()
+
+        while post_thread.is_alive():
+            if should_stop():
+                self.stop()
+            post_thread.join(timeout=0.1)
+        self.stop()
+        for t in threads:
+            t.join()
+        self.frame_queue.drain()
+        self.result_queue.drain()
+        for stream in self.engine.streams:
+            stream.release()
+        return self.engine.frames_inferred, time.time() - start
+
+    def stats(self):
+        return {
+            "frame_queue_depth": self.frame_queue.qsize(),
+            "frame_queue_dropped": self.frame_queue.dropped,
+            "result_queue_depth": self.result_queue.qsize(),
+            "result_queue_dropped": self.result_queue.dropped,
+        }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+import html
+import time
+import threading
+from urllib.parse import quote, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import metrics
+
+_BOUNDARY = "frame"
+
+
+class _PreviewChannel:
+    """카메라 하나의 미리보기 상태: 인코딩 대기 프레임 1장 + 마지막 JPEG"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.clients = 0
+        self.pending = None   # 아직 인코딩하지 않은 최신 AnnotatedFrame
+        self.jpeg = None
+        self.seq = 0          # jpeg가 갱신될 때마다 증가
+        self.last_publish = 0.0
+
+
+# ------------------------------------------------------------------
+# 헤드리스 미리보기: 카메라별 MJPEG(multipart/x-mixed-replace) HTTP 스트림
+# ------------------------------------------------------------------
+class PreviewHub:
+    """
+    publish(name, annotated)는 DetectionStream의 display 콜백으로 쓰인다.
+    해당 카메라를 보는 클라이언트가 없으면 박스를 그리거나 인코딩하지 않고 바로 버퍼를 반환하고,
+    있으면 fps 간격마다 최신 프레임 하나만 넘겨 둔다.
+    JPEG 인코딩(축소 포함)은 감지 스레드가 아니라 클라이언트 스레드에서 프레임당 한 번만 수행하고,
+    같은 카메라를 보는 다른 클라이언트는 결과를 공유한다.
+    """
+
+    def __init__(self, fps=5.0, width=640, jpeg_quality=70):
+        self.interval = 1.0 / fps if fps else 0.0
+        self.width = width  # 미리보기 가로 크기 (None이면 원본, 세로는 비율 유지)
+        self.jpeg_quality = jpeg_quality
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.encoded = 0
+        self.skipped = 0  # 클라이언트가 없거나 fps 간격 안이라 인코딩하지 않은 프레임 수
+
+    def _channel(self, name):
+        with self._lock:
+            return self._channels.setdefault(name, _PreviewChannel())
+
+    def names(self):
+        with self._lock:
+            return sorted(self._channels)
+
+    def clients(self):
+        with self._lock:
+            channels = list(self._channels.values())
+        return sum(channel.clients for channel in channels)
+
+    def publish(self, name, annotated):
+        channel = self._channel(name)
+        now = time.monotonic()
+        with channel.cond:
+            if not channel.clients or now - channel.last_publish < self.interval:
+                self.skipped += 1
+                replaced = annotated
+            else:
+                replaced, channel.pending = channel.pending, annotated
+                channel.last_publish = now
+                channel.cond.notify_all()
+        if replaced is not None:
+            replaced.release()
+
+    def _encode(self, name, annotated):
+        with metrics.timer("preview_encode", name):
+            image = annotated.render()
+            height, width = image.shape[:2]
+            if self.width and width > self.width:
+                size = (self.width, max(1, round(height * self.width / width)))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        annotated.release()
+        return buf.tobytes() if ok else None
+
+    def wait_frame(self, name, last_seq, timeout=5.0):
+        """last_seq 이후의 새 JPEG를 기다려 (jpeg, seq) 반환. 시간 안에 없으면 (None, last_seq)"""
+        channel = self._channel(name)
+        deadline = time.monotonic() + timeout
+        with channel.cond:
+            while channel.seq <= last_seq and channel.pending is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, last_seq
+                channel.cond.wait(remaining)
+            if channel.seq > last_seq:
+                return channel.jpeg, channel.seq
+            annotated, channel.pending = channel.pending, None
+        jpeg = self._encode(name, annotated)
+        with channel.cond:
+            if jpeg is not None:
+                channel.jpeg = jpeg
+                channel.seq += 1
+                self.encoded += 1
+            channel.cond.notify_all()
+            return channel.jpeg, channel.seq
+
+    def attach(self, name):
+        channel = self._channel(name)
+        with channel.cond:
+            channel.clients += 1
+
+    def detach(self, name):
+        channel = self._channel(name)
+        with channel.cond:
+            channel.clients -= 1
+            annotated = channel.pending if not channel.clients else None
+            if annotated is not None:
+                channel.pending = None
+        if annotated is not None:
+            annotated.release()
+
+    def stats(self):
+        return {"cameras": len(self.names()), "clients": self.clients(),
+                "encoded": self.encoded, "skipped": self.skipped}
+
+
+def start_preview_server(hub, port=8081, host="127.0.0.1"):
+    """
+    GET /                : 카메라 목록 (각 카메라 스트림을 img 태그로 표시)
+    GET /stream/<name>   : MJPEG 스트림
+    GET /snapshot/<name> : 다음 미리보기 프레임 JPEG 한 장
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/":
+                self._index()
+            elif self.path.startswith("/stream/"):
+                self._stream(unquote(self.path[len("/stream/"):]))
+            elif self.path.startswith("/snapshot/"):
+                self._snapshot(unquote(self.path[len("/snapshot/"):]))
+            else:
+                self.send_error(404)
+
+        def _index(self):
+            # 카메라 이름(파일명)이 그대로 HTML에 들어가지 않도록 본문은 escape, 경로는 percent-encoding
+            items = "".join(f'<h3>{html.escape(name)}</h3><img src="/stream/{html.escape(quote(name))}">'
+                            for name in hub.names())
+            body = f"<html><body>{items or 'no cameras yet'}</body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _snapshot(self, name):
+            hub.attach(name)
+            try:
+                jpeg, _ = hub.wait_frame(name, 0)
+            finally:
+                hub.detach(name)
+            if jpeg is None:
+                self.send_error(503, "no frame available")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(jpeg)))
+            self.end_headers()
+            self.wfile.write(jpeg)
+
+        def _stream(self, name):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            hub.attach(name)
+            seq = 0
+            try:
+                while True:
+                    jpeg, seq = hub.wait_frame(name, seq)
+                    if jpeg is None:
+                        continue
+                    self.wfile.write(f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                     f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                    self.wfile.write(jpeg)
+                    self.wfile.write(b"\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 클라이언트 연결 종료
+            finally:
+                hub.detach(name)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[Preview] serving http://{host}:{server.server_port}/")
+    return server
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+import numpy as np
+from box_utils import extract_boxes, iou_matrix
+
+
+# ------------------------------------------------------------------
+# 관심 영역(ROI) / 타일 계획
+# ------------------------------------------------------------------
+def rois_to_pixels(rois, width, height):
+    """0~1 비율 ROI 목록을 프레임 픽셀 좌표로 변환 (프레임 밖은 잘라냄)"""
+    regions = []
+    for x1, y1, x2, y2 in rois:
+        px1 = int(np.clip(x1, 0, 1) * width)
+        py1 = int(np.clip(y1, 0, 1) * height)
+        px2 = int(np.clip(x2, 0, 1) * width)
+        py2 = int(np.clip(y2, 0, 1) * height)
+        if px2 > px1 and py2 > py1:
+            regions.append((px1, py1, px2, py2))
+    return regions
+
+
+def _tile_starts(start, end, tile, step):
+    if end - start <= tile:
+        return [start]
+    starts = list(range(start, end - tile, step))
+    starts.append(end - tile)  # 마지막 타일은 끝에 맞춤
+    return starts
+
+
+def tile_region(region, tile_size, overlap=0.2):
+    """tile_size보다 큰 영역을 overlap 비율만큼 겹치는 정사각 타일로 분할"""
+    x1, y1, x2, y2 = region
+    step = max(1, int(tile_size * (1 - overlap)))
+    return [(tx, ty, min(tx + tile_size, x2), min(ty + tile_size, y2))
+            for ty in _tile_starts(y1, y2, tile_size, step)
+            for tx in _tile_starts(x1, x2, tile_size, step)]
+
+
+def plan_regions(frame_shape, rois=None, tile_size=None, overlap=0.2):
+    """프레임 하나에서 추론할 픽셀 영역 목록. ROI가 없으면 전체 프레임, 큰 영역은 타일로 분할"""
+    height, width = frame_shape[:2]
+    regions = rois_to_pixels(rois, width, height) if rois else [(0, 0, width, height)]
+    if not tile_size:
+        return regions
+    planned = []
+    for region in regions:
+        planned.extend(tile_region(region, tile_size, overlap))
+    return planned
+
+
+# ------------------------------------------------------------------
+# 영역별 결과를 프레임 좌표로 되돌려 합친 결과 (Results.boxes와 같은 필드 이름)
+# ------------------------------------------------------------------
+class MergedBoxes:
+    def __init__(self, cls, conf, xyxy):
+        self.cls = cls
+        self.conf = conf
+        self.xyxy = xyxy
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class MergedResult:
+    def __init__(self, cls, conf, xyxy):
+        self.boxes = MergedBoxes(cls, conf, xyxy)
+
+
+def nms(cls, conf, xyxy, iou_threshold=0.5):
+    """클래스별 NMS. 남길 인덱스 배열 반환 (점수 높은 순)"""
+    order = np.argsort(-conf)
+    if len(order) == 0:
+        return order
+    iou = iou_matrix(xyxy, xyxy)
+    same_class = cls[:, None] == cls[None, :]
+    suppressed = np.zeros(len(order), dtype=bool)
+    keep = []
+    for i in order.tolist():
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= same_class[i] & (iou[i] > iou_threshold)
+    return np.array(keep, dtype=np.int64)
+
+
+def infer_regions(model, frames, regions_per_frame, iou_threshold=0.5):
+    """모든 프레임의 영역 crop을 한 번에 추론한 뒤 프레임별로 좌표 복원 + NMS 병합"""
+    crops, owners = [], []
+    for frame_idx, (frame, regions) in enumerate(zip(frames, regions_per_frame)):
+        for x1, y1, x2, y2 in regions:
+            crops.append(np.ascontiguousarray(frame[y1:y2, x1:x2]))
+            owners.append((frame_idx, x1, y1))
+
+    per_frame = [([], [], []) for _ in frames]
+    if crops:
+        for (frame_idx, ox, oy), r in zip(owners, model(crops, verbose=False)):
+            cls, conf, xyxy = extract_boxes([r])
+            if not len(cls):
+                continue
+            per_frame[frame_idx][0].append(cls)
+            per_frame[frame_idx][1].append(conf)
+            per_frame[frame_idx][2].append(xyxy + np.array([ox, oy, ox, oy]))
+
+    merged = []
+    for cls_list, conf_list, xyxy_list in per_frame:
+        if not cls_list:
+            merged.append(MergedResult(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32),
+                                       np.empty((0, 4), dtype=np.int64)))
+            continue
+        cls, conf, xyxy = np.concatenate(cls_list), np.concatenate(conf_list), np.concatenate(xyxy_list)
+        keep = nms(cls, conf, xyxy, iou_threshold)
+        merged.append(MergedResult(cls[keep], conf[keep], xyxy[keep]))
+    return merged
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import os
+import time
+import queue
+import multiprocessing as mp
+import cv2
+from frame_ring import FrameRing
+
+# 해상도를 알 수 없는 소스에 대비한 링 슬롯 크기 (height, width, channels)
+DEFAULT_FRAME_SHAPE = (1080, 1920, 3)
+
+
+def probe_frame_shape(video_path, default=DEFAULT_FRAME_SHAPE):
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    return (height, width, 3) if width and height else default
+
+
+def assign_shards(video_paths, num_workers):
+    """카메라를 워커 수만큼 라운드로빈으로 나눔"""
+    shards = [[] for _ in range(num_workers)]
+    for i, path in enumerate(video_paths):
+        shards[i % num_workers].append(path)
+    return [shard for shard in shards if shard]
+
+
+def _worker_main(shard_id, video_paths, ring_specs, camera_serial, torch_threads, stop_event, names_queue):
+    # torch/OpenMP가 코어 수만큼 스레드를 만들지 않도록 import 전에 스레드 수 고정
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+    cv2.setNumThreads(1)
+
+    import virtual_detection
+
+    # 저장 알림 팝업(Tk)은 메인 프로세스에만 있으므로 워커에서는 끔
+    virtual_detection.POPUP_ENABLED = False
+    # 추론/후처리 메트릭은 워커 프로세스에 쌓이므로 워커마다 엔드포인트를 따로 염
+    if virtual_detection.METRICS_PORT is not None:
+        virtual_detection.start_metrics_server(virtual_detection.METRICS_PORT + 1 + shard_id)
+    rings = {name: FrameRing(**spec) for name, spec in ring_specs.items()}
+
+    names_sent = False
+
+    def to_ring(name, annotated):
+        # 박스는 그리지 않고 원본 프레임과 박스 배열만 기록 (표시하는 쪽에서 실제로 필요할 때만 그림)
+        # 라벨 이름은 감독자가 모델을 로드하지 않아도 되도록 처음 한 번만 보냄
+        nonlocal names_sent
+        if not names_sent and annotated.names is not None:
+            names_queue.put(dict(annotated.names))
+            names_sent = True
+        # 링에는 기록 시각이 아니라 프레임의 소스(디코딩) 시각을 남김
+        timestamp = annotated.timestamp if annotated.timestamp is not None else time.time()
+        rings[name].write(annotated.frame, timestamp, boxes=annotated.boxes)
+        annotated.release()
+
+    print(f"[Shard {shard_id}] pid={os.getpid()} torch_threads={torch_threads} "
+          f"streams={', '.join(rings)}")
+    try:
+        virtual_detection.run_streams(video_paths, camera_serial, display=to_ring,
+                                      should_stop=stop_event.is_set)
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+# ------------------------------------------------------------------
+# 샤드 감독자: 카메라 스트림을 워커 프로세스에 분산, 공유 메모리로 프레임 수집, 비정상 종료 시 재시작
+# ------------------------------------------------------------------
+class ShardSupervisor:
+    """
+    각 워커 프로세스는 자기 몫의 카메라에 대해 디코드/추론/후처리 파이프라인을 그대로 실행하고,
+    표시용 원본 프레임과 박스 배열만 스트림별 FrameRing(공유 메모리)에 기록한다. 감독자는 링에서
+    최신 프레임을 읽어 on_frame(name, frame, timestamp, (cls, conf, xyxy))으로 넘기고 (렌더러/레코더),
+    박스 라벨 이름은 names(워커가 보내기 전까지는 빈 dict)에 둔다.
+    워커가 0이 아닌 코드로 종료되면 지수 백오프 후 같은 카메라 구성으로 다시 띄운다.
+    """
+
+    def __init__(self, video_paths, camera_serial="test", num_workers=None, torch_threads=None,
+                 ring_slots=4, max_restarts=5, restart_backoff=2.0):
+        cpu_count = os.cpu_count() or 1
+        self.camera_serial = camera_serial
+        self.shards = assign_shards(video_paths, max(1, min(num_workers or cpu_count, len(video_paths))))
+        self.num_workers = len(self.shards)
+        # 워커 수 × 워커당 스레드 수가 코어 수를 넘지 않도록 기본값 계산
+        self.torch_threads = torch_threads or max(1, cpu_count // self.num_workers)
+        self.ring_slots = ring_slots
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self._ctx = mp.get_context("spawn")  # 부모의 스레드/torch 상태를 물려받지 않도록 spawn 사용
+        self._stop = self._ctx.Event()
+        self._names_queue = self._ctx.Queue()
+        self.names = {}
+        self.rings = {}
+        self._procs = {}
+        self._restart_at = {}
+        self._done = set()
+        self.restarts = [0] * self.num_workers
+
+    def _spawn(self, shard_id):
+        paths = self.shards[shard_id]
+        specs = {os.path.basename(p): self.rings[os.path.basename(p)].spec() for p in paths}
+        proc = self._ctx.Process(target=_worker_main, name=f"detect-shard-{shard_id}", daemon=True,
+                                 args=(shard_id, paths, specs, self.camera_serial, self.torch_threads,
+                                       self._stop, self._names_queue))
+        proc.start()
+        self._procs[shard_id] = proc
+
+    def start(self):
+        for shard in self.shards:
+            for path in shard:
+                name = os.path.basename(path)
+                self.rings[name] = FrameRing.create(f"vd_{os.getpid()}_{len(self.rings)}",
+                                                    probe_frame_shape(path), slots=self.ring_slots)
+        for shard_id in range(self.num_workers):
+            self._spawn(shard_id)
+        print(f"[Supervisor] {self.num_workers} workers × {self.torch_threads} torch threads, "
+              f"{len(self.rings)} streams")
+
+    def _check_workers(self, now):
+        for shard_id, proc in self._procs.items():
+            if shard_id in self._done or proc.is_alive():
+                continue
+            if shard_id in self._restart_at:
+                if now >= self._restart_at[shard_id]:
+                    del self._restart_at[shard_id]
+                    self._spawn(shard_id)
+                continue
+            if proc.exitcode == 0 or self._stop.is_set():
+                self._done.add(shard_id)
+                continue
+            if self.restarts[shard_id] >= self.max_restarts:
+                print(f"[Supervisor] shard {shard_id} crashed {self.restarts[shard_id]} times, giving up")
+                self._done.add(shard_id)
+                continue
+            self.restarts[shard_id] += 1
+            delay = self.restart_backoff * 2 ** (self.restarts[shard_id] - 1)
+            print(f"[Supervisor] shard {shard_id} exited with code {proc.exitcode}, "
+                  f"restarting in {delay:.0f}s")
+            self._restart_at[shard_id] = now + delay
+
+    def run(self, on_frame, should_stop=lambda: False, poll=0.01):
+        """모든 워커가 정상 종료하거나 should_stop()이 True가 될 때까지 프레임 수집"""
+        self.start()
+        try:
+            while len(self._done) < self.num_workers and not should_stop():
+                try:
+                    self.names = self._names_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                for name, ring in self.rings.items():
+                    item = ring.read_latest()
+                    if item is not None:
+                        on_frame(name, *item)
+                self._check_workers(time.monotonic())
+                time.sleep(poll)
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+        for proc in self._procs.values():
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        for ring in self.rings.values():
+            ring.close()
+            ring.unlink()
+        self.rings = {}
+
+    def stats(self):
+        return {
+            "workers": self.num_workers,
+            "torch_threads": self.torch_threads,
+            "restarts": list(self.restarts),
+            "exit_codes": {shard_id: proc.exitcode for shard_id, proc in self._procs.items()},
+        }
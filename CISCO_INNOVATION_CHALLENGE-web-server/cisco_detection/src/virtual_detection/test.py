@@ -5,7 +5,7 @@ import time
 import math
 import requests
 import threading
-import subprocess
+import sys
 from datetime import datetime, timezone
 
 # 설정
@@ -29,6 +29,16 @@ image_folder = os.path.join(output_folder, "images")
 os.makedirs(json_folder, exist_ok=True)
 os.makedirs(image_folder, exist_ok=True)
 
+# Webex 알림은 프로세스 내 notifier 워커가 전송 (저장소 루트의 cisco_common 패키지)
+sys.path.append(os.path.join(base_dir, "..", "..", "..", ".."))
+from cisco_common.webex_notifier import WebexNotifier
+webex_creds_path = os.path.join(base_dir, "../../assets/webex_api_key.json")
+try:
+    notifier = WebexNotifier(creds_path=webex_creds_path)
+except (FileNotFoundError, ValueError) as e:
+    print(f"[Webex] notifier disabled: {e}")
+    notifier = None
+
 last_detection_time = 0  # 최근 감지 시간 저장용 (중복 방지)
 
 # snapshot 다운로드 함수
@@ -46,8 +56,8 @@ def download_snapshot(image_url, image_path, json_path, save_data, max_attempts=
             print(f"[✅ 저장 완료] 이미지: {image_path}")
             print(f"[✅ 저장 완료] JSON: {json_path}")
 
-            detection_upload_path = os.path.join(base_dir, "../cisco_apis/detection_upload.py")
-            subprocess.Popen(["python3", detection_upload_path, image_path, json_path])
+            if notifier is not None:
+                notifier.notify(save_data, image_path)
             return
         else:
             print(f"❗ 다운로드 실패(status: {res.status_code}) → {delay}초 후 재시도")
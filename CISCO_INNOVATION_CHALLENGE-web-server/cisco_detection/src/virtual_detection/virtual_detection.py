@@ -1,64 +1,83 @@
 #!/usr/bin/env python3
 import os
 import sys
-import django
 import json
 import time
 import threading
-import math
 import cv2
-import subprocess
+import numpy as np
 import queue
+import itertools
+from collections import namedtuple
 from glob import glob
 from datetime import datetime
-import tkinter as tk
-from PIL import Image, ImageTk
-from ultralytics import YOLO
-import paho.mqtt.client as mqtt  # MQTT 전송을 위한 import
+from batch_inference import BatchInferenceEngine, VideoStream
+from pipeline import DetectionPipeline, BoundedQueue, BLOCK, DROP_OLDEST
+from motion_gate import MotionGate
+from camera_registry import CameraRegistry
+from overlap_executor import CoalescingExecutor
+from artifact_writer import ArtifactWriter
+import metrics
+from box_utils import (boxes_overlap, extract_boxes, overlap_matrix, iou_matrix,
+                       draw_boxes, KB_CLASS, BLOCK_CLASS)
+import frame_pool
+from frame_pool import AnnotatedFrame
+from clip_recorder import ClipRecorder
 
-# ------------------------------------------------------------------
-# Django 환경 설정 (Camera 모델 사용을 위함)
-# ------------------------------------------------------------------
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'cisco_be'))
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cisco_be.settings")
-django.setup()
-from cisco_be_launch.models import Camera  # Django 모델
+# 위경도 변환(geo)과 WebexNotifier는 감지 프로젝트와 함께 쓰는 저장소 루트의 cisco_common 패키지에 있음
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+from cisco_common.geo import CameraProjector
 
-# ------------------------------------------------------------------
-# MQTT 클라이언트 설정 (발행)
-# ------------------------------------------------------------------
-MQTT_BROKER = "localhost"
-MQTT_PORT = 1883
-mqtt_client = mqtt.Client()
-mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-mqtt_client.loop_start()  # 백그라운드 스레드에서 이벤트 처리
+# Django / MQTT / YOLO(torch) / tkinter 는 import 시점이 아니라 DetectionRuntime이 처음 사용할 때 로드
+# → boxes_overlap, geo 변환 같은 유틸만 필요한 도구는 이 모듈을 가볍게 import 가능
 
-# ------------------------------------------------------------------
-# 기본 경로, 모델 로드, 출력 폴더 설정
-# ------------------------------------------------------------------
 base_dir = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(base_dir, "../../models/model.pt")
-model = YOLO(model_path)
-
-print("[MODEL INFORMATION]")
-print("-" * 30)
-print(f"Number of classes: {len(model.names)}")
-print("Class names:")
-for class_id, name in model.names.items():
-    print(f"    [{class_id}] {name}")
-
 output_folder = os.path.join(base_dir, "../../output/")
 json_folder = os.path.join(output_folder, "json")
 image_folder = os.path.join(output_folder, "images")
-os.makedirs(json_folder, exist_ok=True)
-os.makedirs(image_folder, exist_ok=True)
+clip_folder = os.path.join(output_folder, "clips")
+
+MQTT_BROKER = "localhost"
+MQTT_PORT = 1883
+
+# 이미지/감지 기록 저장 단계 (JPEG 인코딩 워커 풀 + 롤링 매니페스트)
+JPEG_QUALITY = 90
+ARTIFACT_WORKERS = 2
+
+# 위반 전후 클립: 스트림별로 최근 (PRE + POST)초를 CLIP_FPS, 가로 CLIP_WIDTH(px) JPEG로 메모리에 보관
+# 스트림당 버퍼 한도는 CLIP_MAX_BYTES_PER_STREAM (넘으면 오래된 프레임부터 버림)
+CLIP_ENABLED = True
+CLIP_PRE_SECONDS = 5.0
+CLIP_POST_SECONDS = 5.0
+CLIP_FPS = 5.0
+CLIP_WIDTH = 640
+CLIP_JPEG_QUALITY = 60
+CLIP_MAX_BYTES_PER_STREAM = 8 * 1024 * 1024
+
+# 모델 워밍업: 첫 실제 프레임 전에 더미 추론을 몇 번 수행할지
+WARMUP_RUNS = 1
 
 # ------------------------------------------------------------------
 # Tkinter 및 디스플레이 큐 (메인 스레드 GUI 업데이트)
 # ------------------------------------------------------------------
+# 화면이 처리 속도를 못 따라가면 오래된 프레임부터 버려 메모리 사용량을 고정
+DISPLAY_QUEUE_SIZE = 4
 gui_queue = queue.Queue()
-display_queue = queue.Queue()
+# 항목은 (name, AnnotatedFrame). 화면에 못 그리고 버려진 프레임은 버퍼를 풀로 반환
+display_queue = BoundedQueue(DISPLAY_QUEUE_SIZE, DROP_OLDEST, on_drop=lambda item: item[1].release())
 quit_flag = False  # 전역 종료 플래그
+POPUP_ENABLED = True  # 저장된 감지 이미지를 Tk 팝업으로 표시 (샤드 워커 프로세스/헤드리스에서는 끔)
+
+# 헤드리스 모드: Tk/cv2.imshow 없이 실행 (화면 없는 서버용)
+# 미리보기는 PREVIEW_PORT의 MJPEG HTTP 스트림으로 제공 (None이면 미리보기 없음)
+# 클라이언트가 연결된 카메라만 PREVIEW_FPS 간격으로 가로 PREVIEW_WIDTH(px)로 축소해 인코딩
+HEADLESS = False
+PREVIEW_PORT = None
+PREVIEW_HOST = "127.0.0.1"
+PREVIEW_FPS = 5.0
+PREVIEW_WIDTH = 640
+PREVIEW_JPEG_QUALITY = 70
 
 # ------------------------------------------------------------------
 # 상수 (원래 하드코딩된 카메라 값, 필요시 기본값으로 사용)
@@ -69,10 +88,289 @@ CAMERA_HEADING = 90
 CAMERA_FOV = 60
 FIXED_DISTANCE = 10.0
 
+# 스트림별 추론 비율 (캡처 FPS와 별개, None이면 모든 프레임 추론)
+# 나머지 프레임은 grab만 하고 디코딩하지 않음
+INFER_FPS = 10
+
+# 한 번의 YOLO 호출에 묶을 최대 스트림 수
+MAX_BATCH = 16
+
+# 고해상도 프레임 타일 추론: 영역이 TILE_SIZE(px)보다 크면 겹치는 타일로 나눠 추론 (None이면 사용 안 함)
+# 카메라별 관심 영역(ROI)은 Camera.rois에서 읽음
+TILE_SIZE = None
+TILE_OVERLAP = 0.2
+
+# 파이프라인 단계 간 큐 크기 및 드롭 정책 (BLOCK 또는 DROP_OLDEST)
+FRAME_QUEUE_SIZE = 32
+FRAME_QUEUE_POLICY = BLOCK
+RESULT_QUEUE_SIZE = 32
+RESULT_QUEUE_POLICY = BLOCK
+
+# 메트릭: 로컬 HTTP 엔드포인트 포트 (None이면 사용 안 함) 및 요약 로그 주기 (초)
+# 9100은 node_exporter 기본 포트라 피함. 환경 변수 METRICS_PORT(빈 값이면 사용 안 함) 또는 --metrics-port로 변경
+# 샤드 워커는 각자 METRICS_PORT + 1 + shard_id 에서 자기 파이프라인 메트릭을 제공
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9716") or 0) or None
+METRICS_LOG_INTERVAL = 60.0
+
+# 멀티 프로세스 샤딩: 워커 프로세스 수 (0이면 현재 프로세스에서 모든 스트림 처리)
+# 워커당 torch 스레드 수 (None이면 코어 수 / 워커 수), 스트림별 공유 메모리 링 슬롯 수,
+# 비정상 종료한 워커의 최대 재시작 횟수
+SHARD_WORKERS = 0
+TORCH_THREADS_PER_WORKER = None
+SHARD_RING_SLOTS = 4
+SHARD_MAX_RESTARTS = 5
+
+# 겹침 검사 워커 풀 크기와 대기열 한도 (스트림별로 최신 프레임 하나만 대기)
+OVERLAP_WORKERS = 2
+OVERLAP_MAX_PENDING = 16
+
+# 같은 킥보드(트랙)에 대해 위반 알림을 다시 보내기까지의 최소 간격 (초)
+REALERT_INTERVAL = 300.0
+
+# 카메라 설정 캐시 유효 시간 (초). 만료 시 백그라운드에서 DB 재조회
+# (감지기는 웹 서버와 다른 프로세스이므로 웹에서 바꾼 Camera 설정은 최대 이 시간 뒤에 반영됨)
+CAMERA_REGISTRY_TTL = 60.0
+
+# 모션 게이트: 장면 변화가 없으면 추론을 건너뛰고 이전 결과 재사용 (False면 매 프레임 추론)
+MOTION_GATE_ENABLED = True
+MOTION_MAX_STALENESS = 5.0  # 변화가 없어도 이 시간(초)이 지나면 강제로 재추론
+
+# ------------------------------------------------------------------
+# 카메라 레지스트리 로더: serial별 Camera 설정 (Django 설정 이후에만 호출됨)
+# ------------------------------------------------------------------
+def load_camera(serial):
+    from cisco_be_launch.models import Camera
+
+    try:
+        cam_obj = Camera.objects.get(serial=serial)
+    except Camera.DoesNotExist:
+        return None
+    return {"lat": cam_obj.lat, "lng": cam_obj.lng, "heading": cam_obj.heading, "fov": cam_obj.fov,
+            "rois": cam_obj.rois, "calibration": cam_obj.calibration}
+
+
+def default_camera_settings():
+    """DB에 Camera가 없거나 값이 비어 있을 때 사용할 기본 설정"""
+    return {
+        "lat": DEFAULT_CAMERA_LAT,
+        "lng": DEFAULT_CAMERA_LNG,
+        "heading": CAMERA_HEADING,
+        "fov": CAMERA_FOV,
+        "distance": FIXED_DISTANCE,
+        "rois": None,
+        "calibration": None,
+    }
+
+
+# 카메라별 화면 → 위경도 격자 (레지스트리가 설정을 다시 읽어 CameraInfo가 바뀔 때만 재계산)
+_projectors = {}  # serial -> (CameraInfo, CameraProjector)
+
+
+def projector_for(cam):
+    entry = _projectors.get(cam.serial)
+    if entry is None or entry[0] is not cam:
+        try:
+            projector = CameraProjector(cam.lat, cam.lng, cam.heading, cam.fov, cam.distance,
+                                        calibration=cam.calibration)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            print(f"[Geo] invalid calibration for {cam.serial}, using heading/FOV projection: {e}")
+            projector = CameraProjector(cam.lat, cam.lng, cam.heading, cam.fov, cam.distance)
+        entry = _projectors[cam.serial] = (cam, projector)
+    return entry[1]
+
+
+_MISSING = object()
+
+
+# ------------------------------------------------------------------
+# 감지 런타임: 무거운 리소스를 처음 사용할 때 한 번만 생성 (스레드 안전)
+# ------------------------------------------------------------------
+class DetectionRuntime:
+    """
+    model / mqtt_client / camera_registry / artifact_writer / clip_recorder / notifier / overlap_executor 는
+    처음 접근할 때 생성된다. start()는 감지 시작 전에 모두 준비하며, 모델 로드+워밍업을
+    별도 스레드에서 돌리는 동안 Django 설정과 MQTT 연결을 진행한다.
+    생성에 걸린 시간은 timings(초)에 기록된다.
+    """
+
+    def __init__(self, backend=None):
+        # 추론 백엔드: pytorch / onnx / openvino / int8 (기본값은 환경 변수 DETECTION_BACKEND)
+        self.backend = backend or os.environ.get("DETECTION_BACKEND", "pytorch")
+        self.timings = {}
+        self._resources = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def provide(self, name, value):
+        """리소스를 미리 만들어 넣음 (벤치마크/재생 시 MQTT·DB·Webex 대신 스텁 사용)"""
+        self._resources[name] = value
+
+    def _lazy(self, name, factory):
+        value = self._resources.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            value = self._resources.get(name, _MISSING)
+            if value is _MISSING:
+                start = time.perf_counter()
+                value = factory()
+                self.timings[name] = time.perf_counter() - start
+                self._resources[name] = value
+            return value
+
+    # ---- 모델 ----
+    @property
+    def model(self):
+        return self._lazy("model", self._load_model)
+
+    def _load_model(self):
+        from inference_backend import load_model, warmup_model, BACKENDS
+
+        if self.backend not in BACKENDS:
+            raise SystemExit(f"DETECTION_BACKEND must be one of {BACKENDS}, got '{self.backend}'")
+        model = load_model(model_path, self.backend)
+        print("[MODEL INFORMATION]")
+        print("-" * 30)
+        print(f"Backend: {self.backend}")
+        print(f"Number of classes: {len(model.names)}")
+        print("Class names:")
+        for class_id, name in model.names.items():
+            print(f"    [{class_id}] {name}")
+        warmup = warmup_model(model, runs=WARMUP_RUNS)
+        print(f"[MODEL] warmup inference: {warmup * 1000:.0f} ms")
+        return model
+
+    # ---- Django (Camera 모델 사용을 위함) ----
+    def setup_django(self):
+        return self._lazy("django", self._setup_django)
+
+    @staticmethod
+    def _setup_django():
+        import django
+
+        sys.path.append(os.path.join(base_dir, '..', 'cisco_be'))
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cisco_be.settings")
+        django.setup()
+        return True
+
+    @property
+    def camera_registry(self):
+        return self._lazy("camera_registry", self._create_camera_registry)
+
+    def _create_camera_registry(self):
+        self.setup_django()
+        from django.db import close_old_connections
+
+        # serial별 Camera 설정을 한 번 로드해 모든 감지 스레드가 공유
+        return CameraRegistry(
+            load_camera,
+            defaults=default_camera_settings(),
+            ttl=CAMERA_REGISTRY_TTL,
+            on_refresh_done=close_old_connections,  # 백그라운드 스레드의 DB 연결 정리
+        )
+
+    # ---- MQTT 클라이언트 (발행) ----
+    @property
+    def mqtt_client(self):
+        return self._lazy("mqtt_client", self._connect_mqtt)
+
+    @staticmethod
+    def _connect_mqtt():
+        import paho.mqtt.client as mqtt
+
+        client = mqtt.Client()
+        client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        client.loop_start()  # 백그라운드 스레드에서 이벤트 처리
+        return client
+
+    # ---- 결과 저장 / Webex 알림 / 겹침 검사 워커 ----
+    @property
+    def artifact_writer(self):
+        return self._lazy("artifact_writer", lambda: ArtifactWriter(
+            image_folder, json_folder, workers=ARTIFACT_WORKERS, jpeg_quality=JPEG_QUALITY))
+
+    @property
+    def clip_recorder(self):
+        # CLIP_ENABLED가 False면 None (클립 없이 정지 이미지만 저장)
+        return self._lazy("clip_recorder", lambda: ClipRecorder(
+            clip_folder, pre_seconds=CLIP_PRE_SECONDS, post_seconds=CLIP_POST_SECONDS, fps=CLIP_FPS,
+            width=CLIP_WIDTH, jpeg_quality=CLIP_JPEG_QUALITY,
+            max_bytes_per_stream=CLIP_MAX_BYTES_PER_STREAM) if CLIP_ENABLED else None)
+
+    @property
+    def notifier(self):
+        return self._lazy("notifier", self._create_notifier)
+
+    @staticmethod
+    def _create_notifier():
+        # 프로세스 내 워커 + keep-alive 세션 (설정이 없으면 알림 없이 동작)
+        from cisco_common.webex_notifier import WebexNotifier
+
+        try:
+            return WebexNotifier(creds_path=os.path.join(base_dir, "../../assets/webex_api_key.json"))
+        except (FileNotFoundError, ValueError) as e:
+            print(f"[Webex] notifier disabled: {e}")
+            return None
+
+    @property
+    def overlap_executor(self):
+        # 겹침 검사는 고정 크기 워커 풀에서 처리 (1초마다 스레드를 새로 만들지 않음)
+        # 합쳐지거나 버려진 작업의 프레임 버퍼는 풀로 반환
+        return self._lazy("overlap_executor", lambda: CoalescingExecutor(
+            save_if_overlap, workers=OVERLAP_WORKERS, max_pending=OVERLAP_MAX_PENDING, name="postprocess",
+            on_discard=lambda args: frame_pool.release(args[1])))
+
+    def prepare(self, *names):
+        """이름으로 지정한 리소스를 미리 생성 (이미 있으면 그대로) → 리소스 목록"""
+        return [getattr(self, name) for name in names]
+
+    def start(self):
+        """첫 프레임 전에 모든 리소스를 준비. 모델 로드/워밍업과 나머지 초기화를 병렬로 진행"""
+        start = time.perf_counter()
+        model_error = []
+
+        def load_model():
+            try:
+                self.prepare("model")
+            except BaseException as e:  # 잘못된 백엔드의 SystemExit 포함
+                model_error.append(e)
+
+        model_thread = threading.Thread(target=load_model, daemon=True)
+        model_thread.start()
+        self.prepare("camera_registry", "mqtt_client", "artifact_writer", "clip_recorder", "notifier",
+                     "overlap_executor")
+        model_thread.join()
+        if model_error:
+            # 로드 스레드의 예외를 그대로 다시 발생 (메인 스레드에서 모델을 다시 로드하지 않음)
+            raise model_error[0]
+        self.timings["start"] = time.perf_counter() - start
+        print("[Startup] " + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in self.timings.items()))
+        return self
+
+    def close(self):
+        """
+        만들어진 워커만 대기 작업을 마저 처리한 뒤 종료 (없는 리소스를 새로 만들지 않음).
+        겹침 검사 → 클립 → 이미지/매니페스트 → Webex 순서: 앞 단계가 뒤 단계에 작업을 넘기기 때문.
+        벤치마크 스텁처럼 종료 메서드가 없는 리소스는 건너뜀
+        """
+        for name, method in (("overlap_executor", "shutdown"), ("clip_recorder", "close"),
+                             ("artifact_writer", "close"), ("notifier", "close")):
+            close = getattr(self._resources.get(name), method, None)
+            if close is not None:
+                close()
+
+
+runtime = DetectionRuntime()
+
 # ------------------------------------------------------------------
 # Tkinter 큐 처리 함수
 # ------------------------------------------------------------------
 def process_queue(root):
+    import tkinter as tk
+    from PIL import Image, ImageTk
+
     try:
         while True:
             image, window_title, duration = gui_queue.get_nowait()
@@ -93,8 +391,9 @@ def process_display_queue():
     global quit_flag
     try:
         while not display_queue.empty():
-            frame = display_queue.get_nowait()
-            cv2.imshow("Detection", frame)
+            name, annotated = display_queue.get_nowait()
+            cv2.imshow(f"Detection - {name}", annotated.render())  # 화면에 보여줄 프레임만 박스를 그림
+            annotated.release()
             key = cv2.waitKey(1) & 0xFF
             if key == ord('q'):
                 quit_flag = True
@@ -103,7 +402,8 @@ def process_display_queue():
     root.after(30, process_display_queue)
 
 def show_image_with_tkinter(image, window_title, duration=3000):
-    gui_queue.put((image, window_title, duration))
+    if POPUP_ENABLED:
+        gui_queue.put((image, window_title, duration))
 
 # ------------------------------------------------------------------
 # MQTT 전송 함수: detection 데이터를 JSON으로 발행
@@ -117,90 +417,75 @@ def send_mqtt_detection(lat, lng):
         }]
     }
     topic = "custom_cv/test"  # Camera의 serial이 test임을 가정
-    mqtt_client.publish(topic, json.dumps(detection_payload))
+    runtime.mqtt_client.publish(topic, json.dumps(detection_payload))
     print(f"MQTT 메시지 발행: topic={topic}, payload={detection_payload}")
 
 # ------------------------------------------------------------------
 # 겹침(Overlap) 검사 및 저장, MQTT 전송 함수 (수정됨)
 # ------------------------------------------------------------------
-def save_if_overlap(results, frame):
-    im = frame.copy()
-    kb_boxes = []
-    block_boxes = []
+def save_if_overlap(boxes, frame, camera_serial="test", tracker=None, timestamp=None, stream_name=None):
+    # frame은 호출자가 retain한 풀 버퍼 (읽기 전용으로 사용하고 끝나면 반환)
+    try:
+        _check_overlap(boxes, frame, camera_serial, tracker, timestamp, stream_name)
+    finally:
+        frame_pool.release(frame)
+
+
+def _check_overlap(boxes, frame, camera_serial, tracker, timestamp, stream_name):
     detections = []  # MQTT로 보낼 detection 데이터
 
-    # 분류: kb (예: 클래스 인덱스 1)와 block (예: 클래스 인덱스 0)
-    for r in results:
-        for box in r.boxes:
-            cls = int(box.cls.item())
-            cls_name = model.names[cls]
-            conf = float(box.conf.item())
-            x1, y1, x2, y2 = [int(x.item()) for x in box.xyxy[0]]
-            if cls == 1:
-                kb_boxes.append((cls, cls_name, conf, (x1, y1, x2, y2)))
-            elif cls == 0:
-                block_boxes.append((x1, y1, x2, y2))
-
-    height, width, _ = im.shape
-
-    # 실질적 좌표 계산 전에, 데이터베이스에서 serial="test"인 Camera 조회
-    try:
-        cam_obj = Camera.objects.get(serial="test")
-        base_lat = cam_obj.lat if cam_obj.lat is not None else DEFAULT_CAMERA_LAT
-        base_lng = cam_obj.lng if cam_obj.lng is not None else DEFAULT_CAMERA_LNG
-    except Camera.DoesNotExist:
-        base_lat = DEFAULT_CAMERA_LAT
-        base_lng = DEFAULT_CAMERA_LNG
-
-    # 키보드와 블록이 겹치는지 검사하고, 겹치면 경도 좌표 계산
-    for kb_cls, kb_cls_name, kb_conf, kb_box in kb_boxes:
-        for block_box in block_boxes:
-            if boxes_overlap(kb_box, block_box):
-                x1, y1, x2, y2 = kb_box
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                relative_offset = (center_x - width / 2) / (width / 2)
-                angle_offset = relative_offset * (CAMERA_FOV / 2)
-                absolute_angle = CAMERA_HEADING + angle_offset
-                dx = FIXED_DISTANCE * math.sin(math.radians(absolute_angle))
-                dy = FIXED_DISTANCE * math.cos(math.radians(absolute_angle))
-                delta_lat = dy / 111320
-                delta_lng = dx / (111320 * math.cos(math.radians(base_lat)))
-                detected_lat = base_lat + delta_lat
-                detected_lng = base_lng + delta_lng
-                # detection 데이터 구성 (여기 object_id는 예시값)
-                detection = {
-                    "object_id": 1008,
-                    "lat": detected_lat,
-                    "lng": detected_lng,
-                    "timestamp": datetime.now().isoformat()
-                }
-                detections.append(detection)
-                # 한 번 겹치면 break; (한 객체 당 한 번 처리)
-                break
-
-    # 모든 박스에 대해 테두리 및 레이블 표시 (화면용)
-    for r in results:
-        for box in r.boxes:
-            cls = int(box.cls.item())
-            cls_name = model.names[cls]
-            conf = float(box.conf.item())
-            x1, y1, x2, y2 = [int(x.item()) for x in box.xyxy[0]]
-            color = (0, 255, 0) if cls == 1 else (255, 0, 0) if cls == 0 else (0, 255, 255)
-            cv2.rectangle(im, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(im, f"{cls_name}:{conf:.2f}", (x1, y1 - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    # 분류: kb (클래스 인덱스 1)와 block (클래스 인덱스 0)
+    cls, conf, xyxy, track_ids = boxes
+    kb_mask = cls == KB_CLASS
+    kb_boxes = xyxy[kb_mask]
+    kb_track_ids = track_ids[kb_mask]
+    block_boxes = xyxy[cls == BLOCK_CLASS]
+
+    height, width, _ = frame.shape
+
+    # 카메라 좌표/방위각/화각은 레지스트리 캐시에서 조회 (DB 접근 없음)
+    cam = runtime.camera_registry.get(camera_serial)
+
+    # 키보드×블록 겹침 행렬을 한 번에 계산 (블록 하나라도 겹치면 해당 키보드는 위반)
+    if len(kb_boxes) and len(block_boxes):
+        hit_idx = np.flatnonzero(overlap_matrix(kb_boxes, block_boxes).any(axis=1))
+        # 박스 발 위치를 카메라별 격자로 한 번에 위경도 변환 (지평선 너머로 계산된 박스는 제외)
+        lats, lngs = projector_for(cam).project_boxes(kb_boxes[hit_idx], width, height)
+        valid = np.isfinite(lats) & np.isfinite(lngs)
+        # 같은 트랙은 처음 겹쳤을 때 한 번, 이후 REALERT_INTERVAL마다만 위반 이벤트 발생
+        # (위치를 계산할 수 없는 박스가 트랙의 알림 간격을 쓰지 않도록 유효한 위치만 검사)
+        now = time.time() if timestamp is None else timestamp
+        detected_at = datetime.now().isoformat()
+        for object_id, detected_lat, detected_lng in zip(kb_track_ids[hit_idx][valid].tolist(),
+                                                         lats[valid].tolist(), lngs[valid].tolist()):
+            if tracker is not None and not tracker.should_alert(object_id, now, REALERT_INTERVAL):
+                continue
+            detections.append({
+                "object_id": object_id,
+                "lat": detected_lat,
+                "lng": detected_lng,
+                "timestamp": detected_at
+            })
 
     # 만약 detection이 발생하면, 파일 저장과 함께 MQTT 전송 진행
     if detections:
+        # 저장/팝업용 주석 이미지는 위반이 있을 때만 만듦 (버퍼는 곧 재사용되므로 사본에 그림)
+        im = draw_boxes(frame.copy(), cls, conf, xyxy, runtime.model.names)
         timestamp_str = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        image_path = os.path.join(image_folder, f"frame_{timestamp_str}.jpg")
-        json_path = os.path.join(json_folder, f"detection_{timestamp_str}.json")
-        cv2.imwrite(image_path, im)
-        with open(json_path, 'w') as f:
-            json.dump(detections, f, indent=2)
-        print(f"[{timestamp_str}] KB-BLOCK overlap detected. Saved image and JSON.")
-        print("Saved JSON data:")
+        records = [dict(det, camera=camera_serial) for det in detections]
+        # 전후 클립은 POST초 뒤 백그라운드에서 완성되지만 경로는 지금 기록에 첨부
+        clip_recorder = runtime.clip_recorder
+        if clip_recorder is not None and stream_name is not None and timestamp is not None:
+            clip_path = clip_recorder.capture(stream_name, timestamp)
+            if clip_path is not None:
+                records = [dict(record, clip=clip_path) for record in records]
+        # 이미지 인코딩/저장과 매니페스트 기록은 writer 워커가 처리하고,
+        # 저장이 끝나면 Webex 알림 워커에 작업을 넘김 (서브프로세스 생성 없음)
+        # 저장 대기열이 가득 차면 이미지는 버려지고 알림만 이미지 없이 나감
+        queued = runtime.artifact_writer.submit(im, records, on_done=_notify_saved_detection)
+        print(f"[{timestamp_str}] KB-BLOCK overlap detected. "
+              f"{'Queued image and manifest record.' if queued else 'Image dropped, notifying without it.'}")
+        print("Detection data:")
         print(json.dumps(detections, indent=2))
         show_image_with_tkinter(im, f"Saved Detection {timestamp_str}", 3000)
         # MQTT 메시지 발행: 여러 detection이 있다면 여기서는 첫 번째 것으로 발행하거나 모두 포함
@@ -210,82 +495,330 @@ def save_if_overlap(results, frame):
             "timestamp": int(datetime.now().timestamp() * 1000),
             "outputs": outputs
         }
-        topic = "custom_cv/test"
-        mqtt_client.publish(topic, json.dumps(mqtt_payload))
+        topic = f"custom_cv/{camera_serial}"
+        with metrics.timer("mqtt_publish", camera_serial):
+            runtime.mqtt_client.publish(topic, json.dumps(mqtt_payload))
         print(f"Published MQTT message to topic {topic}: {mqtt_payload}")
-        # 기존에 external 스크립트를 호출하는 부분이 있다면 필요에 따라 유지 또는 삭제:
-        detection_upload_path = os.path.join(base_dir, "../cisco_apis/detection_upload.py")
-        cmd = ["python3", detection_upload_path, image_path, json_path]
-        subprocess.Popen(cmd)
+
+
+def _notify_saved_detection(image_path, records):
+    # image_path가 None이면 (저장 대기열 가득 참) 텍스트만 전송
+    notifier = runtime.notifier
+    if notifier is not None:
+        with metrics.timer("notifier_handoff", records[0].get("camera", "unknown")):
+            notifier.notify(records, image_path)
 
 # ------------------------------------------------------------------
-# 겹침(Overlap) 판별 도우미 함수
+# IoU/중심점 기반 경량 다중 객체 추적기 (프레임 간 안정적인 object_id 부여)
 # ------------------------------------------------------------------
-def boxes_overlap(box1, box2):
-    x1_max = max(box1[0], box2[0])
-    y1_max = max(box1[1], box2[1])
-    x2_min = min(box1[2], box2[2])
-    y2_min = min(box1[3], box2[3])
-    return x1_max < x2_min and y1_max < y2_min
+TrackedBoxes = namedtuple("TrackedBoxes", ["cls", "conf", "xyxy", "track_ids"])
+
+
+class IoUTracker:
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=50.0, max_age=2.0):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_age = max_age  # 이 시간(초) 동안 매칭되지 않은 트랙은 삭제
+        self._ids = []
+        self._boxes = np.empty((0, 4), dtype=np.int64)
+        self._last_seen = []
+        self._last_alert = {}  # track_id -> 마지막 위반 알림 시각
+        # 트랙 ID는 추적기(스트림)마다 따로 발급 (기록에는 camera가 함께 들어가므로 카메라 안에서만 유일하면 됨)
+        self._next_id = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def update(self, boxes, now):
+        """boxes[N, 4]에 트랙 ID를 부여해 int[N] 배열로 반환"""
+        with self._lock:
+            keep = [i for i, seen in enumerate(self._last_seen) if now - seen <= self.max_age]
+            for i in set(range(len(self._ids))) - set(keep):
+                self._last_alert.pop(self._ids[i], None)
+            ids = [self._ids[i] for i in keep]
+            track_boxes = self._boxes[keep]
+            last_seen = [self._last_seen[i] for i in keep]
+
+            assigned = np.full(len(boxes), -1, dtype=np.int64)
+            if len(boxes) and len(ids):
+                # 1차: IoU가 높은 쌍부터 탐욕적으로 매칭
+                iou = iou_matrix(boxes, track_boxes)
+                used_tracks = set()
+                for flat in np.argsort(-iou, axis=None).tolist():
+                    det, trk = divmod(flat, len(ids))
+                    if iou[det, trk] < self.iou_threshold:
+                        break
+                    if assigned[det] < 0 and trk not in used_tracks:
+                        assigned[det] = trk
+                        used_tracks.add(trk)
+                # 2차: 남은 박스는 가장 가까운 중심점의 트랙과 매칭
+                centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+                track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+                for det in np.flatnonzero(assigned < 0).tolist():
+                    dist = np.linalg.norm(track_centers - centers[det], axis=1)
+                    dist[list(used_tracks)] = np.inf
+                    trk = int(np.argmin(dist))
+                    if dist[trk] <= self.max_centroid_distance:
+                        assigned[det] = trk
+                        used_tracks.add(trk)
+
+            result = np.empty(len(boxes), dtype=np.int64)
+            new_boxes = track_boxes.copy()
+            for det, trk in enumerate(assigned.tolist()):
+                if trk >= 0:
+                    result[det] = ids[trk]
+                    new_boxes[trk] = boxes[det]
+                    last_seen[trk] = now
+                else:
+                    result[det] = next(self._next_id)
+                    ids.append(int(result[det]))
+                    new_boxes = np.vstack([new_boxes, boxes[det:det + 1]])
+                    last_seen.append(now)
+            self._ids, self._boxes, self._last_seen = ids, new_boxes, last_seen
+            return result
+
+    def should_alert(self, track_id, now, interval):
+        """트랙이 처음 위반했거나 마지막 알림 후 interval초가 지났으면 True (알림 시각 갱신)"""
+        with self._lock:
+            last = self._last_alert.get(track_id)
+            if last is not None and now - last < interval:
+                return False
+            self._last_alert[track_id] = now
+            return True
+
 
 # ------------------------------------------------------------------
-# 비디오에서 객체 감지 수행 함수
+# 스트림별 감지 상태: 객체 추적 + 1초 주기 겹침 검사 + 화면 표시
 # ------------------------------------------------------------------
+def _display_local(name, annotated):
+    display_queue.put((name, annotated))
+
+
+def _display_discard(name, annotated):
+    # 헤드리스 + 미리보기 없음: 박스를 그리지 않고 버퍼만 반환
+    annotated.release()
+
+
+class DetectionStream:
+    def __init__(self, name, camera_serial="test", display=None):
+        self.name = name
+        self.camera_serial = camera_serial
+        # display(name, AnnotatedFrame): 화면 큐 또는 공유 메모리 링. 소비자가 render() 후 release()
+        self.display = display or _display_local
+        self.last_overlap_check_time = 0.0  # 소스 타임스탬프 기준 (초)
+        self.tracker = IoUTracker()
+
+    def handle_result(self, frame, results, timestamp):
+        # 추적/겹침 검사 주기는 벽시계가 아닌 소스 타임스탬프 기준
+        current_time = timestamp
+        cls, conf, xyxy = extract_boxes(results)
+        # 킥보드 박스만 추적 (블록 등 나머지는 -1)
+        track_ids = np.full(len(cls), -1, dtype=np.int64)
+        kb_mask = cls == KB_CLASS
+        track_ids[kb_mask] = self.tracker.update(xyxy[kb_mask], current_time)
+        boxes = TrackedBoxes(cls, conf, xyxy, track_ids)
+
+        if current_time - self.last_overlap_check_time >= 1.0:
+            # 프레임을 복사하지 않고 참조만 넘김 (save_if_overlap 또는 on_discard가 반환)
+            runtime.overlap_executor.submit(self.name, boxes, frame_pool.retain(frame), self.camera_serial,
+                                            self.tracker, current_time, self.name)
+            self.last_overlap_check_time = current_time
+
+        # 전후 클립용 링 버퍼 (CLIP_FPS 간격 프레임만 축소·압축, 예약된 클립 구간이 끝나면 인코더로 넘김)
+        clip_recorder = runtime.clip_recorder
+        if clip_recorder is not None:
+            clip_recorder.push(self.name, current_time, frame, (cls, conf, xyxy), runtime.model.names)
+
+        # 박스는 소비자가 실제로 이미지를 꺼낼 때 그림
+        self.display(self.name, AnnotatedFrame(frame, cls, conf, xyxy, runtime.model.names, timestamp=current_time))
+
+
+# ------------------------------------------------------------------
+# 큐 깊이 / 드롭 수 게이지 등록 (메트릭 엔드포인트와 주기 요약 로그에 노출)
+# ------------------------------------------------------------------
+def register_pipeline_gauges(pipeline):
+    metrics.register_gauge("frame_queue_depth", pipeline.frame_queue.qsize)
+    metrics.register_gauge("frame_queue_dropped", lambda: pipeline.frame_queue.dropped)
+    metrics.register_gauge("result_queue_depth", pipeline.result_queue.qsize)
+    metrics.register_gauge("result_queue_dropped", lambda: pipeline.result_queue.dropped)
+    metrics.register_gauge("display_queue_depth", display_queue.qsize)
+    metrics.register_gauge("display_queue_dropped", lambda: display_queue.dropped)
+    metrics.register_gauge("postprocess_pending", lambda: runtime.overlap_executor.stats()["pending"])
+    metrics.register_gauge("artifact_dropped", lambda: runtime.artifact_writer.dropped)
+    metrics.register_gauge("frame_pool_allocated", lambda: frame_pool.FRAMES.allocated)
+    metrics.register_gauge("frame_pool_in_use", lambda: frame_pool.FRAMES.stats()["in_use"])
+    clip_recorder = runtime.clip_recorder
+    if clip_recorder is not None:
+        metrics.register_gauge("clip_buffer_bytes", clip_recorder.buffer_bytes)
+        metrics.register_gauge("clip_dropped", lambda: clip_recorder.dropped)
+    notifier = runtime.notifier
+    if notifier is not None:
+        metrics.register_gauge("notifier_pending", notifier.jobs.qsize)
+        metrics.register_gauge("notifier_dropped", lambda: notifier.dropped)
+
+
+# ------------------------------------------------------------------
+# 여러 비디오를 디코드/배치 추론/후처리 파이프라인으로 동시에 처리
+# ------------------------------------------------------------------
+def run_streams(video_paths, camera_serial="test", infer_fps=INFER_FPS, display=None, should_stop=None):
+    # 모델 로드/워밍업, DB·MQTT 연결을 첫 프레임 전에 끝내 첫 추론 지연을 없앰
+    runtime.start()
+    try:
+        camera_registry = runtime.camera_registry
+        camera_registry.preload([camera_serial])
+        rois = camera_registry.get(camera_serial).rois
+        engine = BatchInferenceEngine(runtime.model, max_batch=MAX_BATCH,
+                                      tile_size=TILE_SIZE, tile_overlap=TILE_OVERLAP)
+        for video_path in video_paths:
+            name = os.path.basename(video_path)
+            detection_stream = DetectionStream(name, camera_serial, display)
+            gate = MotionGate(max_staleness=MOTION_MAX_STALENESS) if MOTION_GATE_ENABLED else None
+            engine.add_stream(VideoStream(name, video_path, detection_stream.handle_result,
+                                          motion_gate=gate, infer_fps=infer_fps, rois=rois))
+            if gate is not None:
+                metrics.register_gauge(f"motion_skipped_{name}", lambda g=gate: g.frames_skipped)
+        pipeline = DetectionPipeline(engine,
+                                     frame_queue_size=FRAME_QUEUE_SIZE, frame_policy=FRAME_QUEUE_POLICY,
+                                     result_queue_size=RESULT_QUEUE_SIZE, result_policy=RESULT_QUEUE_POLICY)
+        register_pipeline_gauges(pipeline)
+        frames, elapsed = pipeline.run(should_stop=should_stop or (lambda: quit_flag))
+    finally:
+        # 워커는 데몬 스레드라 그냥 끝나면 대기 중인 저장/클립/알림이 사라짐 (헤드리스 종료, 예외 포함)
+        # 통계는 모두 처리한 뒤의 값을 출력
+        runtime.close()
+    if elapsed > 0:
+        print(f"Processed {frames} frames from {len(video_paths)} streams "
+              f"({frames / elapsed:.1f} FPS aggregate)")
+    print(f"Pipeline stats: {pipeline.stats()}, display dropped: {display_queue.dropped}")
+    print(f"Overlap checks: {runtime.overlap_executor.stats()}")
+    print(f"Artifact writer: {runtime.artifact_writer.stats()}")
+    print(f"Frame pool: {frame_pool.FRAMES.stats()}")
+    if runtime.clip_recorder is not None:
+        print(f"Clip recorder: {runtime.clip_recorder.stats()}")
+    if runtime.notifier is not None:
+        print(f"Webex notifier: {runtime.notifier.stats()}")
+    for stream in engine.streams:
+        if stream.motion_gate is not None:
+            print(f"Motion gate [{stream.name}]: {stream.motion_gate.stats()}")
+    for line in metrics.REGISTRY.summary_lines():
+        print(f"[Metrics] {line}")
+    if display is None:
+        cv2.destroyAllWindows()
+    return frames, elapsed
+
+
+def start_metrics_server(port):
+    """메트릭 엔드포인트 시작. 포트를 이미 쓰고 있으면 경고만 출력하고 감지는 계속"""
+    try:
+        return metrics.start_http_server(port)
+    except OSError as e:
+        print(f"[Metrics] cannot serve on port {port}: {e}")
+        return None
+
+
 def detect_objects_in_video(video_path):
-    global quit_flag
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"Failed to open video: {video_path}")
-        return
-    last_overlap_check_time = time.time()
-    target_fps = 30
-    last_results = []
-    while not quit_flag:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        last_results = model(frame, verbose=False)
-        current_time = time.time()
-        if current_time - last_overlap_check_time >= 1.0:
-            threading.Thread(target=save_if_overlap, args=(last_results, frame.copy())).start()
-            last_overlap_check_time = current_time
-
-        # 프레임에 감지 결과 표시
-        im = frame.copy()
-        for r in last_results:
-            for box in r.boxes:
-                cls = int(box.cls.item())
-                cls_name = model.names[cls]
-                conf = float(box.conf.item())
-                x1, y1, x2, y2 = [int(x.item()) for x in box.xyxy[0]]
-                color = (0, 255, 0) if cls == 1 else (255, 0, 0) if cls == 0 else (0, 255, 255)
-                cv2.rectangle(im, (x1, y1), (x2, y2), color, 2)
-                cv2.putText(im, f"{cls_name}:{conf:.2f}", (x1, y1 - 5),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-        if not display_queue.full():
-            display_queue.put(im)
-    cap.release()
-    cv2.destroyAllWindows()
+    run_streams([video_path])
+
 
 # ------------------------------------------------------------------
-# 테스트 에셋 내의 모든 비디오에 대해 객체 감지 수행
+# 테스트 에셋 내의 모든 비디오를 스트림으로 묶어 객체 감지 수행
 # ------------------------------------------------------------------
-def start_detection():
+def start_detection(display=None):
     test_assets_path = os.path.join(base_dir, "../test_assets/*.mp4")
     video_files = sorted(glob(test_assets_path))
     if not video_files:
         print("No .mp4 files found in test_assets/")
     else:
-        for video_path in video_files:
-            print(f"\nprocessing: {os.path.basename(video_path)}")
-            detect_objects_in_video(video_path)
-            if quit_flag:
-                break
+        print(f"\nprocessing: {', '.join(os.path.basename(p) for p in video_files)}")
+        if SHARD_WORKERS:
+            run_sharded(video_files, num_workers=SHARD_WORKERS, display=display)
+        else:
+            run_streams(video_files, display=display)
+
 
 # ------------------------------------------------------------------
-# 메인: Tkinter 및 객체 감지 시작
+# 멀티 프로세스: 카메라를 워커 프로세스에 나눠 처리하고 표시 프레임은 공유 메모리로 수집
+# ------------------------------------------------------------------
+def run_sharded(video_paths, camera_serial="test", num_workers=None, display=None):
+    from shard_supervisor import ShardSupervisor
+
+    display = display or _display_local
+    supervisor = ShardSupervisor(video_paths, camera_serial, num_workers=num_workers,
+                                 torch_threads=TORCH_THREADS_PER_WORKER, ring_slots=SHARD_RING_SLOTS,
+                                 max_restarts=SHARD_MAX_RESTARTS)
+
+    def on_frame(name, frame, timestamp, boxes):
+        # 워커는 원본 프레임 + 박스만 보내므로 박스는 화면/미리보기가 실제로 표시할 때 render()에서 그림
+        # (라벨 이름을 받기 전의 프레임은 박스 없이 표시)
+        names = supervisor.names
+        if names:
+            display(name, AnnotatedFrame(frame, *boxes, names, timestamp=timestamp))
+        else:
+            display(name, AnnotatedFrame(frame, timestamp=timestamp))
+
+    supervisor.run(on_frame=on_frame, should_stop=lambda: quit_flag)
+    print(f"Supervisor stats: {supervisor.stats()}, display dropped: {display_queue.dropped}")
+
+# ------------------------------------------------------------------
+# 헤드리스 실행: GUI 없이 감지 + (선택) MJPEG 미리보기, Ctrl+C로 종료
+# ------------------------------------------------------------------
+def run_headless():
+    global POPUP_ENABLED, quit_flag
+    POPUP_ENABLED = False
+    display = _display_discard
+    if PREVIEW_PORT is not None:
+        from preview_server import PreviewHub, start_preview_server
+
+        hub = PreviewHub(fps=PREVIEW_FPS, width=PREVIEW_WIDTH, jpeg_quality=PREVIEW_JPEG_QUALITY)
+        start_preview_server(hub, PREVIEW_PORT, PREVIEW_HOST)
+        metrics.register_gauge("preview_clients", hub.clients)
+        display = hub.publish
+    detection_thread = threading.Thread(target=start_detection, args=(display,), daemon=True)
+    detection_thread.start()
+    try:
+        while detection_thread.is_alive():
+            detection_thread.join(0.5)
+    except KeyboardInterrupt:
+        quit_flag = True
+        detection_thread.join()
+
+# ------------------------------------------------------------------
+# 메인: Tkinter 및 객체 감지 시작 (--headless면 GUI 없이 실행)
 # ------------------------------------------------------------------
 if __name__ == "__main__":
+    import argparse
+    from inference_backend import BACKENDS
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="추론 백엔드 (기본값: 환경 변수 DETECTION_BACKEND 또는 pytorch)")
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS,
+                        help="카메라를 나눠 처리할 워커 프로세스 수 (0이면 단일 프로세스)")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="Tk 팝업/cv2 창 없이 실행")
+    parser.add_argument("--preview-port", type=int, default=PREVIEW_PORT,
+                        help="헤드리스 MJPEG 미리보기 포트 (http://host:port/stream/<camera>)")
+    parser.add_argument("--preview-fps", type=float, default=PREVIEW_FPS)
+    parser.add_argument("--preview-width", type=int, default=PREVIEW_WIDTH)
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="메트릭 HTTP 포트 (0이면 사용 안 함, 샤드 워커는 포트 + 1 + 워커 번호)")
+    args = parser.parse_args()
+    if args.backend:
+        runtime.backend = args.backend
+        os.environ["DETECTION_BACKEND"] = args.backend  # 샤드 워커 프로세스도 같은 백엔드 사용
+    SHARD_WORKERS = args.workers
+    PREVIEW_PORT, PREVIEW_FPS, PREVIEW_WIDTH = args.preview_port, args.preview_fps, args.preview_width
+    METRICS_PORT = args.metrics_port or None
+    os.environ["METRICS_PORT"] = str(METRICS_PORT or "")  # 샤드 워커 프로세스도 같은 기준 포트 사용
+
+    if METRICS_PORT is not None:
+        start_metrics_server(METRICS_PORT)
+    metrics.start_summary_logger(METRICS_LOG_INTERVAL)
+
+    if args.headless:
+        run_headless()
+        sys.exit(0)
+
+    import tkinter as tk
+
     root = tk.Tk()
     root.withdraw()  # 메인 창 숨기기
     root.after(100, process_queue, root)
@@ -294,4 +827,4 @@ if __name__ == "__main__":
     detection_thread = threading.Thread(target=start_detection, daemon=True)
     detection_thread.start()
 
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cisco_be_launch', '0005_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='heading',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='camera',
+            name='fov',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
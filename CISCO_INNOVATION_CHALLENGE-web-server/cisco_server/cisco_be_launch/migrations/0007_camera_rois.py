@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cisco_be_launch', '0006_camera_heading_camera_fov'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='rois',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cisco_be_launch', '0007_camera_rois'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='calibration',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -5,6 +5,12 @@ class Camera(models.Model):
     serial = models.CharField(max_length=50, unique=True)
     lat = models.FloatField(null=True, blank=True)
     lng = models.FloatField(null=True, blank=True)
+    heading = models.FloatField(null=True, blank=True)  # 카메라가 바라보는 방위각 (도)
+    fov = models.FloatField(null=True, blank=True)      # 수평 화각 (도)
+    # 관심 영역 목록 [[x1, y1, x2, y2], ...] (프레임 크기 대비 0~1 비율). 비어 있으면 전체 프레임
+    rois = JSONField(null=True, blank=True)
+    # 지면 보정점 [[u, v, lat, lng], ...] (u, v는 0~1 비율 화면 좌표, 4개 이상). 비어 있으면 방위각/화각으로 추정
+    calibration = JSONField(null=True, blank=True)
 
     def __str__(self):
         return self.serial
@@ -1,6 +1,7 @@
 from django.shortcuts import render
+import os
+import sys
 import json
-import math
 import base64
 import io
 from django.http import JsonResponse, HttpResponse
@@ -10,6 +11,11 @@ from datetime import datetime
 from PIL import Image
 from ultralytics import YOLO
 
+# 위경도 계산(destination_point)은 감지 코드와 같은 저장소 루트의 cisco_common.geo 모듈을 사용
+# (감지 코드 폴더가 아니라 저장소 루트만 추가하므로 cisco_common 패키지 이름으로만 import됨)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from cisco_common.geo import destination_point
+
 @csrf_exempt
 def register_user(request):
     if request.method == 'OPTIONS':
@@ -217,22 +223,3 @@ def monitor_page(request):
         'events': events,
     }
     return render(request, 'monitor.html', context)
-
-
-def destination_point(lat, lng, bearing, distance):
-    R = 6371000  # 지구 반지름 (미터)
-    lat1 = math.radians(lat)
-    lng1 = math.radians(lng)
-    bearing_rad = math.radians(bearing)
-    
-    lat2 = math.asin(
-        math.sin(lat1) * math.cos(distance / R) +
-        math.cos(lat1) * math.sin(distance / R) * math.cos(bearing_rad)
-    )
-    
-    lng2 = lng1 + math.atan2(
-        math.sin(bearing_rad) * math.sin(distance / R) * math.cos(lat1),
-        math.cos(distance / R) - math.sin(lat1) * math.sin(lat2)
-    )
-    
-    return math.degrees(lat2), math.degrees(lng2)
\ No newline at end of file
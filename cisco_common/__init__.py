@@ -0,0 +1,2 @@
+# 감지 프로젝트(CISCO_INNOVATION_CHALLENGE-detection)와 웹 서버(CISCO_INNOVATION_CHALLENGE-web-server)가
+# 함께 쓰는 모듈. 저장소 루트를 sys.path에 추가한 뒤 `from cisco_common.<모듈> import ...` 로 사용
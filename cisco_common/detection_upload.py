@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# 단발성 전송용 CLI. 감지 프로세스 내부에서는 cisco_common.webex_notifier.WebexNotifier를 직접 사용한다.
+# 자격 증명 경로는 세 번째 인자 또는 환경 변수 WEBEX_CREDENTIALS 로 지정
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cisco_common.webex_notifier import WebexNotifier, load_credentials
+
+if len(sys.argv) < 3:
+    print("Usage: python3 detection_upload.py <image_path> <json_path> [creds_path]")
+    sys.exit(1)
+
+image_path = sys.argv[1]
+json_path = sys.argv[2]
+creds_path = sys.argv[3] if len(sys.argv) > 3 else os.environ.get("WEBEX_CREDENTIALS")
+
+if not os.path.exists(json_path):
+    print(f"JSON file not found: {json_path}")
+    sys.exit(1)
+with open(json_path, "r") as f:
+    detection_data = json.load(f)
+
+if not creds_path:
+    print("Credentials path not given (argument or WEBEX_CREDENTIALS).")
+    sys.exit(1)
+try:
+    WEBEX_BOT_TOKEN, WEBEX_ROOM_ID = load_credentials(creds_path)
+except (FileNotFoundError, ValueError) as e:
+    print(e)
+    sys.exit(1)
+
+notifier = WebexNotifier(WEBEX_BOT_TOKEN, WEBEX_ROOM_ID, workers=1)
+# 텍스트 전송 결과와 관계없이 이미지도 전송 (기존 CLI 동작)
+if notifier.send_text(detection_data):
+    print("Webex text message sent successfully!")
+else:
+    print("Failed to send Webex text message.")
+if notifier.send_image(image_path):
+    print("Webex image message sent successfully!")
+elif os.path.exists(image_path):
+    print("Failed to send Webex image message.")
+notifier.close()
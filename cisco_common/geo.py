@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+화면 좌표 → 위경도 변환 (두 감지 프로젝트와 서버 views가 함께 사용: from cisco_common.geo import ...)
+
+    보정 없음 : 카메라 방위각/화각으로 박스의 방향을 구하고 고정 거리(distance)만큼 떨어진 지점
+    보정 있음 : 지면 위 기준점 4개 이상([u, v, lat, lng], u/v는 0~1 비율 화면 좌표)으로
+                지면 호모그래피를 구해 박스 발 위치(footpoint)를 실제 지면 좌표로 변환
+
+CameraProjector는 카메라마다 한 번 0~1 화면 격자의 위경도 표를 만들어 두고,
+박스 배열 전체를 격자 보간으로 한 번에 변환한다.
+위경도 계산은 구면(대권) 공식을 사용한다.
+"""
+import numpy as np
+
+EARTH_RADIUS = 6371000.0  # 지구 반지름 (미터)
+
+
+# ------------------------------------------------------------------
+# 구면 좌표 계산 (스칼라/배열 모두 지원)
+# ------------------------------------------------------------------
+def destination_point(lat, lng, bearing, distance):
+    """(lat, lng)에서 방위각 bearing(도)으로 distance(미터)만큼 이동한 지점의 (lat, lng)"""
+    lat1 = np.radians(lat)
+    lng1 = np.radians(lng)
+    bearing_rad = np.radians(bearing)
+    angular = np.asarray(distance, dtype=np.float64) / EARTH_RADIUS
+
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angular) +
+                     np.cos(lat1) * np.sin(angular) * np.cos(bearing_rad))
+    lng2 = lng1 + np.arctan2(np.sin(bearing_rad) * np.sin(angular) * np.cos(lat1),
+                             np.cos(angular) - np.sin(lat1) * np.sin(lat2))
+    lat2, lng2 = np.degrees(lat2), np.degrees(lng2)
+    if np.ndim(lat2) == 0:
+        return float(lat2), float(lng2)
+    return lat2, lng2
+
+
+def bearing_distance(lat1, lng1, lat2, lng2):
+    """destination_point의 역변환: 시작점에서 본 초기 방위각(도)과 대권 거리(미터)"""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dlng = np.radians(np.asarray(lng2, dtype=np.float64) - lng1)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlng / 2) ** 2
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+    bearing = np.degrees(np.arctan2(np.sin(dlng) * np.cos(p2),
+                                    np.cos(p1) * np.sin(p2) - np.sin(p1) * np.cos(p2) * np.cos(dlng)))
+    return bearing, distance
+
+
+# ------------------------------------------------------------------
+# 지면 호모그래피 (화면 0~1 좌표 → 카메라 기준 동/북 미터)
+# ------------------------------------------------------------------
+def _normalize_points(points):
+    """수치 안정성을 위해 중심 0, 평균 거리 √2로 정규화하는 변환 행렬"""
+    center = points.mean(axis=0)
+    scale = np.sqrt(2) / max(np.linalg.norm(points - center, axis=1).mean(), 1e-12)
+    return np.array([[scale, 0, -scale * center[0]],
+                     [0, scale, -scale * center[1]],
+                     [0, 0, 1]])
+
+
+def fit_homography(src, dst):
+    """src[N, 2] → dst[N, 2] 호모그래피 (N >= 4, 정규화 DLT)"""
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    if len(src) < 4 or len(src) != len(dst):
+        raise ValueError("homography calibration needs at least 4 point pairs")
+    t_src, t_dst = _normalize_points(src), _normalize_points(dst)
+    s = (t_src @ np.c_[src, np.ones(len(src))].T).T
+    d = (t_dst @ np.c_[dst, np.ones(len(dst))].T).T
+    rows = []
+    for (x, y, _), (u, v, _) in zip(s, d):
+        rows.append([-x, -y, -1, 0, 0, 0, u * x, u * y, u])
+        rows.append([0, 0, 0, -x, -y, -1, v * x, v * y, v])
+    _, _, vt = np.linalg.svd(np.array(rows))
+    h = np.linalg.inv(t_dst) @ vt[-1].reshape(3, 3) @ t_src
+    h /= h[2, 2]
+    # 기준점에서 동차 좌표 w가 양수가 되도록 부호를 맞춤 (w <= 0 은 지평선 너머)
+    w = (h[2, :2] @ src.T) + h[2, 2]
+    return h if np.median(w) > 0 else -h
+
+
+def apply_homography(h, points):
+    """points[..., 2] 변환. 지평선 너머(w <= 0) 점은 NaN"""
+    points = np.asarray(points, dtype=np.float64)
+    x, y = points[..., 0], points[..., 1]
+    w = h[2, 0] * x + h[2, 1] * y + h[2, 2]
+    valid = w > 1e-12
+    safe_w = np.where(valid, w, 1.0)
+    out_x = np.where(valid, (h[0, 0] * x + h[0, 1] * y + h[0, 2]) / safe_w, np.nan)
+    out_y = np.where(valid, (h[1, 0] * x + h[1, 1] * y + h[1, 2]) / safe_w, np.nan)
+    return np.stack([out_x, out_y], axis=-1)
+
+
+def calibration_homography(cam_lat, cam_lng, calibration):
+    """calibration: [[u, v, lat, lng], ...] → 화면(u, v) → 카메라 기준 (동, 북) 미터 호모그래피"""
+    points = np.asarray(calibration, dtype=np.float64)
+    bearing, distance = bearing_distance(cam_lat, cam_lng, points[:, 2], points[:, 3])
+    ground = np.stack([distance * np.sin(np.radians(bearing)),
+                       distance * np.cos(np.radians(bearing))], axis=1)
+    return fit_homography(points[:, :2], ground)
+
+
+def footpoints(xyxy):
+    """박스 아래쪽 중앙 (지면에 닿는 위치) → float[N, 2]"""
+    xyxy = np.asarray(xyxy, dtype=np.float64)
+    return np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, xyxy[:, 3]], axis=1)
+
+
+# ------------------------------------------------------------------
+# 카메라별 화면 → 위경도 조회 격자
+# ------------------------------------------------------------------
+class CameraProjector:
+    """
+    grid_size × grid_size 격자(0~1 화면 좌표)마다 위경도를 미리 계산해 두고,
+    project()는 이 표를 쌍선형 보간해 점 배열을 한 번에 변환한다.
+    보정점이 없으면 기존 방식(방위각 + 화각 선형 보간 + 고정 거리)으로 격자를 채운다.
+    """
+
+    def __init__(self, lat, lng, heading=90.0, fov=60.0, distance=10.0, calibration=None, grid_size=65):
+        self.grid_size = grid_size
+        self.calibrated = bool(calibration)
+        axis = np.linspace(0.0, 1.0, grid_size)
+        u, v = np.meshgrid(axis, axis)  # [행 = v, 열 = u]
+        if self.calibrated:
+            h = calibration_homography(lat, lng, calibration)
+            ground = apply_homography(h, np.stack([u, v], axis=-1))
+            east, north = ground[..., 0], ground[..., 1]
+            bearing = np.degrees(np.arctan2(east, north))
+            distance_grid = np.hypot(east, north)
+        else:
+            bearing = heading + (u - 0.5) * fov
+            distance_grid = np.full_like(u, distance)
+        self.lat_grid, self.lng_grid = destination_point(lat, lng, bearing, distance_grid)
+
+    def project(self, points, width=1.0, height=1.0):
+        """points[N, 2] (픽셀, width/height로 나눠 0~1로 변환) → (lat[N], lng[N])"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        last = self.grid_size - 1
+        gu = np.clip(points[:, 0] / width, 0.0, 1.0) * last
+        gv = np.clip(points[:, 1] / height, 0.0, 1.0) * last
+        j0 = np.minimum(gu.astype(np.int64), last - 1)
+        i0 = np.minimum(gv.astype(np.int64), last - 1)
+        fu = gu - j0
+        fv = gv - i0
+
+        def _interp(grid):
+            top = grid[i0, j0] * (1 - fu) + grid[i0, j0 + 1] * fu
+            bottom = grid[i0 + 1, j0] * (1 - fu) + grid[i0 + 1, j0 + 1] * fu
+            return top * (1 - fv) + bottom * fv
+
+        return _interp(self.lat_grid), _interp(self.lng_grid)
+
+    def project_boxes(self, xyxy, width, height):
+        """박스 배열의 발 위치를 위경도로 변환 → (lat[N], lng[N]). 지평선 너머는 NaN"""
+        return self.project(footpoints(xyxy), width, height)
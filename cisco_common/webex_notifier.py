@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+WEBEX_MESSAGES_URL = "https://webexapis.com/v1/messages"
+
+# 재시도 대상 상태 코드 (요청 제한 / 서버 오류)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def load_credentials(creds_file_path):
+    """assets/webex_api_key.json 형식 파일 → (bot_token, room_id). 경로는 각 프로젝트의 assets 폴더 기준"""
+    if not os.path.exists(creds_file_path):
+        raise FileNotFoundError(f"Credentials file not found: {creds_file_path}")
+    with open(creds_file_path, "r") as f:
+        creds = json.load(f)
+    bot_token = creds.get("BOT_API_KEY")
+    room_id = creds.get("ROOM_ID")
+    if not bot_token or not room_id:
+        raise ValueError("BOT_API_KEY or ROOM_ID not found in credentials file.")
+    return bot_token, room_id
+
+
+def retry_after_seconds(value):
+    """Retry-After 헤더(초 또는 HTTP 날짜) → 대기 초. 없거나 해석할 수 없으면 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def build_violation_text(detection_data):
+    """detection 리스트(JSON 저장 형식)를 Webex 알림 문구로 변환"""
+    if not (isinstance(detection_data, list) and len(detection_data) > 0):
+        return "킥보드 주차 위반 정보가 없습니다."
+
+    detection = detection_data[0]
+    object_id = detection.get("object_id", "정보 없음")
+    lat = detection.get("lat", "정보 없음")
+    lng = detection.get("lng", "정보 없음")
+    timestamp_str = detection.get("timestamp", "정보 없음")
+
+    lat_formatted = f"{float(lat):.6f}" if lat != "정보 없음" else lat
+    lng_formatted = f"{float(lng):.6f}" if lng != "정보 없음" else lng
+
+    try:
+        dt = datetime.fromisoformat(timestamp_str)
+        timestamp_formatted = dt.strftime("%Y년 %m월 %d일 %H시 %M분 %S초")
+    except Exception:
+        timestamp_formatted = timestamp_str
+
+    return (
+        "킥보드 주차 위반이 발생하였습니다!\n"
+        f"object_id: {object_id}\n"
+        f"위도: {lat_formatted}\n"
+        f"경도: {lng_formatted}\n"
+        f"시간: {timestamp_formatted}"
+    )
+
+
+# ------------------------------------------------------------------
+# Webex 알림 서비스: 작업 큐 + keep-alive 세션 + 동시성 제한 + 백오프 재시도
+# ------------------------------------------------------------------
+class WebexNotifier:
+    """
+    감지 프로세스는 notify()로 작업만 넘기고, 실제 전송은 워커 스레드가 처리한다.
+    bot_token/room_id를 주지 않으면 creds_path(자격 증명 JSON)에서 읽는다.
+    api_url을 바꾸면 로컬 대체 서버로 동작을 확인할 수 있다.
+    """
+
+    def __init__(self, bot_token=None, room_id=None, creds_path=None, api_url=WEBEX_MESSAGES_URL,
+                 workers=2, queue_size=256, max_attempts=4, backoff=1.0, timeout=10.0):
+        if bot_token is None or room_id is None:
+            if creds_path is None:
+                raise ValueError("bot_token/room_id or creds_path is required.")
+            bot_token, room_id = load_credentials(creds_path)
+        self.room_id = room_id
+        self.api_url = api_url
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+
+        # 워커 수만큼 연결을 재사용하는 세션
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {bot_token}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._stats_lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._workers:
+            t.start()
+
+    def notify(self, detections, image_path=None):
+        """위반 알림 작업 등록. 큐가 가득 차면 버리고 False 반환 (감지 루프를 막지 않음)"""
+        try:
+            self.jobs.put_nowait((detections, image_path))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            print("[WebexNotifier] job queue full, notification dropped")
+            return False
+
+    def _post(self, data=None, json_body=None, image_path=None):
+        for attempt in range(self.max_attempts):
+            wait = self.backoff * (2 ** attempt)
+            try:
+                if image_path:
+                    with open(image_path, "rb") as image_file:
+                        res = self.session.post(self.api_url, data=data, files={"files": image_file},
+                                                timeout=self.timeout)
+                else:
+                    res = self.session.post(self.api_url, json=json_body, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"[WebexNotifier] request error ({attempt + 1}/{self.max_attempts}): {e}")
+            else:
+                if res.status_code in (200, 201):
+                    return True
+                if res.status_code not in RETRY_STATUS:
+                    print(f"[WebexNotifier] failed: {res.status_code} - {res.text}")
+                    return False
+                retry_after = retry_after_seconds(res.headers.get("Retry-After"))
+                if retry_after is not None:
+                    wait = max(wait, retry_after)
+                print(f"[WebexNotifier] status {res.status_code} ({attempt + 1}/{self.max_attempts})")
+            if attempt + 1 < self.max_attempts:
+                time.sleep(wait)
+        return False
+
+    def send_text(self, detections):
+        return self._post(json_body={"roomId": self.room_id, "text": build_violation_text(detections)})
+
+    def send_image(self, image_path):
+        if not os.path.exists(image_path):
+            print("Image file not found; image message not sent.")
+            return False
+        return self._post(data={"roomId": self.room_id, "text": "킥보드 주차 위반 이미지 첨부"},
+                          image_path=image_path)
+
+    def send(self, detections, image_path=None):
+        """작업 하나를 동기적으로 전송 (텍스트 → 이미지 순서, 텍스트 전송이 실패하면 이미지는 보내지 않음)"""
+        ok = self.send_text(detections)
+        if ok and image_path:
+            ok = self.send_image(image_path)
+        return ok
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            try:
+                ok = self.send(*job)
+            except Exception as e:
+                print(f"[WebexNotifier] unexpected error: {e}")
+                ok = False
+            with self._stats_lock:
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            self.jobs.task_done()
+
+    def close(self, wait=True):
+        """남은 작업을 모두 처리한 뒤 워커 종료"""
+        for _ in self._workers:
+            self.jobs.put(None)
+        if wait:
+            for t in self._workers:
+                t.join()
+        self.session.close()
+
+    def stats(self):
+        with self._stats_lock:
+            return {"sent": self.sent, "failed": self.failed, "dropped": self.dropped,
+                    "pending": self.jobs.qsize()}
+
+
+# 테스트 코드: 로컬 대체 서버(webexapis.com/v1/messages 흉내)로 전송 확인
+if __name__ == "__main__":
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received = []
+
+    class _FakeWebex(BaseHTTPRequestHandler):
+        fail_first = {"count": 1}
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.fail_first["count"] > 0:
+                # 첫 요청은 429로 응답해 재시도 동작 확인 (Retry-After는 HTTP 날짜 형식)
+                self.fail_first["count"] -= 1
+                self.send_response(429)
+                self.send_header("Retry-After", self.date_time_string())
+                self.end_headers()
+                return
+            received.append((self.headers.get("Authorization"), self.headers.get("Content-Type"), body))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"id": "fake"}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeWebex)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    notifier = WebexNotifier(bot_token="TEST_TOKEN", room_id="TEST_ROOM",
+                             api_url=f"http://127.0.0.1:{server.server_port}/v1/messages", backoff=0.01)
+    for i in range(5):
+        notifier.notify([{"object_id": i, "lat": 37.5, "lng": 127.0, "timestamp": datetime.now().isoformat()}])
+    notifier.close()
+    server.shutdown()
+
+    print(json.dumps(notifier.stats(), indent=2))
+    assert len(received) == 5 and all(auth == "Bearer TEST_TOKEN" for auth, _, _ in received)